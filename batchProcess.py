@@ -0,0 +1,178 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import time as clock
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import frameValidation
+import pointCloud
+import pointsPerson
+
+# Elaborazione di intere cartelle di acquisizioni in un solo processo padre: i file vengono distribuiti su un
+# pool di processi partendo dai più grandi (così l'ultimo file lungo non resta da solo alla fine), ogni
+# risultato viene scritto con un nome temporaneo e rinominato a fine lavoro, i file già aggiornati vengono
+# saltati e alla fine viene scritto un manifest JSON con esito, tempi e linee scartate di ogni file.
+
+# HOW to use this script > python batchProcess.py <cartella|"pattern/*.txt"> [...] --output-dir risultati [--job averages|persons|both]
+#                          [--workers N] [--backend python|numpy] [--force]
+
+JOBS = ('averages', 'persons', 'both')
+INPUT_EXTENSIONS = ('.txt',)
+MANIFEST = 'manifest.json'
+
+def collect_inputs(sources):
+    """File di input da cartelle (tutti i .txt) e pattern glob, senza duplicati."""
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = [os.path.join(source, name) for name in os.listdir(source)
+                       if name.lower().endswith(INPUT_EXTENSIONS)]
+        else:
+            matches = glob.glob(source)
+        files.extend(path for path in sorted(matches) if os.path.isfile(path))
+    return list(dict.fromkeys(os.path.abspath(path) for path in files))
+
+def output_stems(input_files):
+    """Nome degli output di ogni input: il percorso relativo alla cartella comune degli input, senza
+    estensione, così 'giorno1/cap.txt' e 'giorno2/cap.txt' finiscono in sottocartelle diverse.
+
+    ValueError, prima di elaborare qualsiasi file, se due input darebbero gli stessi output
+    (es. 'cap.txt' e 'cap.TXT')."""
+    if not input_files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in input_files])
+    stems = {}
+    owners = {}
+    for input_file in input_files:
+        stem = os.path.splitext(os.path.relpath(os.path.abspath(input_file), root))[0]
+        key = os.path.normcase(stem)
+        if key in owners:
+            raise ValueError(f"Gli input {owners[key]} e {input_file} producono gli stessi file di output ({stem}_*.csv)")
+        owners[key] = input_file
+        stems[input_file] = stem
+    return stems
+
+def output_paths(stem, output_dir, job):
+    outputs = {}
+    if job in ('averages', 'both'):
+        outputs['averages'] = os.path.join(output_dir, f'{stem}_averages.csv')
+    if job in ('persons', 'both'):
+        outputs['persons'] = os.path.join(output_dir, f'{stem}_persons.csv')
+    return outputs
+
+def is_up_to_date(input_file, outputs):
+    """Come make: aggiornato se tutti gli output esistono e sono più recenti dell'input."""
+    source = os.path.getmtime(input_file)
+    return all(os.path.exists(path) and os.path.getmtime(path) >= source for path in outputs.values())
+
+def temporary_path(path):
+    return f'{path}.tmp{os.getpid()}'
+
+def run_job(input_file, outputs, backend='python'):
+    """Eseguito nel processo del pool: elabora un file e restituisce la sua voce del manifest."""
+    start = clock.perf_counter()
+    entry = {'input': input_file, 'bytes': os.path.getsize(input_file), 'outputs': outputs}
+    temporary = {kind: temporary_path(path) for kind, path in outputs.items()}
+    try:
+        if 'averages' in outputs:
+            # Le linee scartate vanno nel manifest invece che sullo stdout dei processi del pool
+            quarantine = frameValidation.Quarantine()
+            if backend == 'numpy':
+                import pointCloudNumpy
+                times, offsets, points = pointCloudNumpy.load_capture(input_file, quarantine=quarantine)
+                averages = pointCloudNumpy.calculate_averages(times, offsets, points)
+            else:
+                averages = pointCloud.stream_averages(input_file, quarantine=quarantine)
+            pointCloud.write_averages(averages, temporary['averages'], 'csv')
+            entry['rejected_lines'] = quarantine.counts
+        if 'persons' in outputs:
+            quarantine = frameValidation.Quarantine()
+            entry['mode'] = pointsPerson.process_txt_to_person_csv(input_file, temporary['persons'], 'auto',
+                                                                   quarantine=quarantine)
+            entry['rejected_person_lines'] = quarantine.counts
+        for kind, path in outputs.items():
+            os.replace(temporary[kind], path)
+        entry['status'] = 'ok'
+    except Exception as error:
+        for path in temporary.values():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        entry['status'] = 'error'
+        entry['error'] = f'{type(error).__name__}: {error}'
+    entry['seconds'] = round(clock.perf_counter() - start, 4)
+    return entry
+
+def run_batch(input_files, output_dir, job='averages', workers=1, backend='python', force=False):
+    """Elabora i file e restituisce il manifest (dizionario); gli output hanno i nomi di `output_stems`."""
+    if job not in JOBS:
+        raise ValueError(f"Job non valido: {job} (ammessi: {', '.join(JOBS)})")
+    stems = output_stems(input_files)
+    os.makedirs(output_dir, exist_ok=True)
+    start = clock.perf_counter()
+    entries = []
+    pending = []
+    for input_file in sorted(input_files, key=os.path.getsize, reverse=True):
+        outputs = output_paths(stems[input_file], output_dir, job)
+        if not force and is_up_to_date(input_file, outputs):
+            entries.append({'input': input_file, 'bytes': os.path.getsize(input_file), 'outputs': outputs,
+                            'status': 'skipped', 'seconds': 0.0})
+        else:
+            for path in outputs.values():
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            pending.append((input_file, outputs))
+
+    if workers <= 1:
+        for input_file, outputs in pending:
+            entries.append(report(run_job(input_file, outputs, backend)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_job, input_file, outputs, backend) for input_file, outputs in pending]
+            for future in as_completed(futures):
+                entries.append(report(future.result()))
+
+    entries.sort(key=lambda entry: entry['input'])
+    return {
+        'job': job,
+        'backend': backend,
+        'workers': workers,
+        'wall_seconds': round(clock.perf_counter() - start, 4),
+        'processed': sum(entry['status'] == 'ok' for entry in entries),
+        'skipped': sum(entry['status'] == 'skipped' for entry in entries),
+        'errors': sum(entry['status'] == 'error' for entry in entries),
+        'files': entries
+    }
+
+def report(entry):
+    detail = entry.get('error') or f"{entry['seconds']:.2f} s"
+    print(f"[{entry['status']}] {os.path.basename(entry['input'])} ({detail})", flush=True)
+    return entry
+
+def save_manifest(manifest, output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    temporary = temporary_path(path)
+    with open(temporary, 'w') as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(temporary, path)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elabora tutte le acquisizioni di una cartella o di un pattern glob con un pool di processi.")
+    parser.add_argument('sources', nargs='+', help='Cartelle o pattern glob dei file TXT SSCOM5')
+    parser.add_argument('--output-dir', required=True, help='Cartella dei CSV di output e del manifest')
+    parser.add_argument('--job', choices=JOBS, default='averages', help='Medie dei punti, persone o entrambi')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Numero di processi (default: numero di CPU)')
+    parser.add_argument('--backend', choices=['python', 'numpy'], default='python', help='Backend per le medie dei punti')
+    parser.add_argument('--force', action='store_true', help='Rielabora anche i file con output già aggiornati')
+    args = parser.parse_args()
+
+    input_files = collect_inputs(args.sources)
+    try:
+        output_stems(input_files)
+    except ValueError as error:
+        parser.error(str(error))
+    manifest = run_batch(input_files, args.output_dir, args.job, args.workers, args.backend, args.force)
+    path = save_manifest(manifest, args.output_dir)
+    print(f"{manifest['processed']} elaborati, {manifest['skipped']} saltati, {manifest['errors']} errori "
+          f"in {manifest['wall_seconds']:.2f} s. Manifest: {path}")
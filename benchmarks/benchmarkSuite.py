@@ -0,0 +1,228 @@
+import argparse
+import builtins
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import captureGenerator
+import stageProfiler
+
+# Suite di benchmark dei decoder su acquisizioni sintetiche: ogni caso gira in un processo nuovo, così il
+# picco di memoria (RSS) misurato è solo il suo. Il processo importa prima questo script (che con
+# captureGenerator importa NumPy) e i moduli dei decoder, quindi la memoria di base viene misurata dopo
+# gli import e il report contiene sia il picco assoluto sia quello in più dovuto al caso.
+# I risultati sono salvati in JSON per confrontare le versioni.
+
+# HOW to use this script > python benchmarks/benchmarkSuite.py [results.json] [--hours 0.25] [--points 30] [--persons 2]
+#                          [--malformed 0.01] [--only nome ...] [--compare baseline.json]
+
+@contextlib.contextmanager
+def legacy_encoding():
+    """Gli script storici aprono i file con l'encoding di default (cp1252 su Windows, dove sono stati scritti);
+    su Linux con locale UTF-8 il prefisso 'IN¡û¡ô' non si decodifica, quindi qui i file di testo si aprono in latin-1."""
+    original = builtins.open
+
+    def open_latin1(file, mode='r', *args, **kwargs):
+        if 'b' not in mode and not args and 'encoding' not in kwargs:
+            kwargs['encoding'] = 'latin-1'
+        return original(file, mode, *args, **kwargs)
+
+    builtins.open = open_latin1
+    try:
+        yield
+    finally:
+        builtins.open = original
+
+# Casi: nome -> (modalità dell'input, funzione(input, cartella temporanea))
+def legacy_process_file(path, workdir):
+    import pointCloud
+    with legacy_encoding():
+        pointCloud.process_file(path)
+
+def legacy_averages(path, workdir):
+    import pointCloud
+    with legacy_encoding():
+        data = pointCloud.process_file(path)
+    pointCloud.calculate_averages(pointCloud.transform_values(pointCloud.remove_fields(data)))
+
+def stream_averages(path, workdir):
+    import pointCloud
+    pointCloud.save_averages_to_csv(pointCloud.stream_averages(path), os.path.join(workdir, 'averages.csv'))
+
+def numpy_averages(path, workdir):
+    import pointCloud
+    import pointCloudNumpy
+    times, offsets, points = pointCloudNumpy.load_capture(path)
+    pointCloud.save_averages_to_csv(pointCloudNumpy.calculate_averages(times, offsets, points),
+                                    os.path.join(workdir, 'averages.csv'))
+
+def capture_from_txt(path, workdir):
+    import captureStore
+    captureStore.write_capture(os.path.join(workdir, 'capture'), captureStore.capture_from_txt(path))
+
+def legacy_persons(mode):
+    """Flusso storico di pointsPerson: linee vuote rimosse, (d2) preprocess, CSV intermedio e conversione."""
+    def run(path, workdir):
+        import pointsPerson
+        intermediate = os.path.join(workdir, 'intermediate.csv')
+        cleaned = os.path.join(workdir, 'cleaned.txt')
+        with legacy_encoding():
+            pointsPerson.remove_empty_lines(path, cleaned)
+            path = cleaned
+            if mode == 'd2':
+                preprocessed = os.path.join(workdir, 'preprocessed.txt')
+                pointsPerson.preprocess_file(path, preprocessed)
+                path = preprocessed
+            pointsPerson.process_txt_to_csv(path, intermediate, mode)
+            pointsPerson.apply_functions_to_csv(intermediate, os.path.join(workdir, 'persons.csv'))
+    return run
+
+def person_csv(mode):
+    def run(path, workdir):
+        import pointsPerson
+        pointsPerson.process_txt_to_person_csv(path, os.path.join(workdir, 'persons.csv'), mode)
+    return run
+
+def person_tracks(path, workdir):
+    import pointsPerson
+    pointsPerson.save_person_tracks_csv(pointsPerson.iter_person_frames(path), os.path.join(workdir, 'persons.csv'))
+
+CASES = {
+    'pointCloud.process_file': ('d2', legacy_process_file),
+    'pointCloud.calculate_averages': ('d2', legacy_averages),
+    'pointCloud.stream_averages': ('d2', stream_averages),
+    'pointCloudNumpy.calculate_averages': ('d2', numpy_averages),
+    'captureStore.capture_from_txt': ('d2', capture_from_txt),
+    'pointsPerson.apply_functions_to_csv[d2]': ('d2', legacy_persons('d2')),
+    'pointsPerson.apply_functions_to_csv[d3]': ('d3', legacy_persons('d3')),
+    'pointsPerson.process_txt_to_person_csv[d2]': ('d2', person_csv('d2')),
+    'pointsPerson.process_txt_to_person_csv[d3]': ('d3', person_csv('d3')),
+    'pointsPerson.save_person_tracks_csv': ('d2', person_tracks),
+}
+
+# Moduli importati prima di misurare la memoria di base (quelli che mancano vengono segnalati dal caso)
+DECODER_MODULES = ('pointCloud', 'pointsPerson', 'frameParser', 'pointCloudNumpy', 'captureStore')
+
+def import_decoders():
+    for module in DECODER_MODULES:
+        with contextlib.suppress(ImportError):
+            importlib.import_module(module)
+
+def run_case(name, path, repeat, queue):
+    """Eseguito nel processo figlio: tempo migliore su `repeat` esecuzioni, RSS dopo gli import e picco di RSS."""
+    _, function = CASES[name]
+    import_decoders()
+    baseline = stageProfiler.peak_rss_mb()
+    try:
+        best = float('inf')
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                function(path, workdir)
+                best = min(best, time.perf_counter() - start)
+        queue.put({'seconds': best, 'baseline_rss_mb': baseline, 'peak_rss_mb': stageProfiler.peak_rss_mb()})
+    except ImportError as error:
+        queue.put({'skipped': f'dipendenza mancante: {error.name}'})
+
+def measure(name, path, repeat):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(name, path, repeat, queue))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        return {'error': f'exit code {process.exitcode}'}
+    return queue.get()
+
+def count_lines(path):
+    with open(path, 'rb') as file:
+        return sum(1 for _ in file)
+
+def run_suite(params, names, repeat=1):
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = {}
+        for mode in sorted({CASES[name][0] for name in names}):
+            path = os.path.join(directory, f'capture_{mode}.txt')
+            captureGenerator.generate_capture(path, mode=mode, **params)
+            inputs[mode] = {'path': path, 'lines': count_lines(path), 'bytes': os.path.getsize(path)}
+
+        results = []
+        for name in names:
+            mode = CASES[name][0]
+            measured = measure(name, inputs[mode]['path'], repeat)
+            result = {'name': name, 'input': mode}
+            if 'seconds' in measured:
+                seconds = measured['seconds']
+                result.update({
+                    'seconds': round(seconds, 4),
+                    'lines_per_s': round(inputs[mode]['lines'] / seconds, 1),
+                    'mb_per_s': round(inputs[mode]['bytes'] / 1e6 / seconds, 3),
+                    'peak_rss_mb': measured['peak_rss_mb'],
+                    'baseline_rss_mb': measured['baseline_rss_mb'],
+                    'case_rss_mb': None if measured['peak_rss_mb'] is None else
+                    round(measured['peak_rss_mb'] - measured['baseline_rss_mb'], 1)
+                })
+            else:
+                result.update(measured)
+            results.append(result)
+            print(format_result(result), flush=True)
+
+    return {
+        'params': params,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'inputs': {mode: {'lines': info['lines'], 'bytes': info['bytes']} for mode, info in inputs.items()},
+        'results': results
+    }
+
+def format_result(result):
+    if 'seconds' not in result:
+        return f"{result['name']:45s} {result.get('skipped') or result.get('error')}"
+    if result['peak_rss_mb'] is None:
+        memory = 'RSS n/d'
+    else:
+        memory = f"{result['case_rss_mb']:8.1f} MB RSS (picco {result['peak_rss_mb']:.1f}, base {result['baseline_rss_mb']:.1f})"
+    return f"{result['name']:45s} {result['lines_per_s']:12.0f} linee/s {result['mb_per_s']:9.2f} MB/s {memory}"
+
+def compare(report, baseline_file):
+    """Stampa il rapporto di velocità rispetto a un report precedente (> 1 = più veloce)."""
+    with open(baseline_file, 'r') as file:
+        baseline = {result['name']: result for result in json.load(file)['results']}
+    for result in report['results']:
+        previous = baseline.get(result['name'])
+        if previous and 'lines_per_s' in previous and 'lines_per_s' in result:
+            print(f"{result['name']:45s} {result['lines_per_s'] / previous['lines_per_s']:6.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Misura linee/s, MB/s e picco di memoria dei decoder su acquisizioni sintetiche.")
+    parser.add_argument('output_json', nargs='?', default='benchmark_results.json', help='Il file JSON con i risultati')
+    parser.add_argument('--hours', type=float, default=0.25, help="Durata dell'acquisizione sintetica in ore")
+    parser.add_argument('--points', type=float, default=30, help='Numero medio di punti per frame')
+    parser.add_argument('--persons', type=int, default=2, help='Numero di persone nella stanza')
+    parser.add_argument('--rate', type=float, default=2.5, help='Frame al secondo')
+    parser.add_argument('--malformed', type=float, default=0.01, help='Frazione di linee malformate')
+    parser.add_argument('--seed', type=int, default=0, help='Seme del generatore casuale')
+    parser.add_argument('--repeat', type=int, default=1, help='Ripetizioni per caso (si tiene la migliore)')
+    parser.add_argument('--only', nargs='+', choices=list(CASES), default=None, help='Esegue solo questi casi')
+    parser.add_argument('--compare', default=None, help='Report JSON precedente con cui confrontare i risultati')
+    args = parser.parse_args()
+
+    params = {'points': args.points, 'persons': args.persons, 'rate': args.rate, 'hours': args.hours,
+              'malformed': args.malformed, 'seed': args.seed}
+    report = run_suite(params, args.only or list(CASES), args.repeat)
+    with open(args.output_json, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f"Risultati salvati in {args.output_json}")
+    if args.compare:
+        compare(report, args.compare)
@@ -0,0 +1,124 @@
+import argparse
+import os
+import struct
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pointCloud
+import pointsPerson
+
+# Generatore di acquisizioni sintetiche nel formato dei file TXT di SSCOM5, in modalità DEBUG 2 (nuvola di
+# punti + persone) o DEBUG 3 (solo persone). Le persone camminano nella stanza, i punti sono distribuiti
+# attorno alle persone più un po' di rumore; una frazione delle linee può essere malformata come nei log
+# reali (eco dei comandi AT, frame troncati, linee vuote).
+
+# HOW to use this script > python benchmarks/captureGenerator.py <output.txt> [--mode d2|d3] [--points 30] [--persons 2]
+#                          [--rate 2.5] [--hours 0.1] [--malformed 0.01] [--seed 0]
+
+IN_PREFIX = 'IN¡û¡ô'.encode('latin-1')
+OUT_PREFIX = 'OUT¡ú¡ó'.encode('latin-1')
+FRAME_HEADER = struct.Struct('<8sIIII')  # magic, LenFrame, CurrentFrame, TLV1, PointL
+ROOM = 4.0  # metà del lato della stanza in metri
+DAY_MS = 24 * 3600 * 1000
+
+def format_time(milliseconds):
+    milliseconds %= DAY_MS
+    seconds, millis = divmod(milliseconds, 1000)
+    return f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{millis:03d}'
+
+def format_line(time, payload, prefix=IN_PREFIX):
+    """Una linea SSCOM5: timestamp, direzione e bytes in esadecimale separati da spazi."""
+    return b'[' + time.encode('ascii') + b']' + prefix + payload.hex(' ').upper().encode('ascii') + b' \n'
+
+def build_frame(frame_number, points, persons, mode='d2'):
+    """Frame binario: header, record dei punti (solo d2) e TLV2 con le persone."""
+    point_bytes = b''.join(pointCloud.POINT_RECORD.pack(*point) for point in points) if mode == 'd2' else b''
+    person_bytes = b''.join(pointsPerson.PERSON_RECORD.pack(*person) for person in persons)
+    length = FRAME_HEADER.size + len(point_bytes) + pointsPerson.TLV_HEADER.size + len(person_bytes)
+    return (FRAME_HEADER.pack(bytes(range(1, 9)), length, frame_number, 1, len(point_bytes)) + point_bytes
+            + pointsPerson.TLV_HEADER.pack(pointsPerson.TLV_PERSONS, len(person_bytes)) + person_bytes)
+
+class Room:
+    """Persone che si muovono a velocità quasi costante e rimbalzano sulle pareti."""
+
+    def __init__(self, persons, rng):
+        self.rng = rng
+        self.ids = np.arange(persons)
+        self.position = np.column_stack([rng.uniform(-ROOM, ROOM, (persons, 2)), rng.uniform(1.0, 1.9, persons)])
+        self.velocity = np.column_stack([rng.uniform(-0.8, 0.8, (persons, 2)), np.zeros(persons)])
+
+    def step(self, dt):
+        self.velocity[:, :2] += self.rng.normal(0, 0.2, self.velocity[:, :2].shape) * dt
+        self.position += self.velocity * dt
+        bounce = np.abs(self.position[:, :2]) > ROOM
+        self.velocity[:, :2][bounce] *= -1
+        self.position[:, :2] = np.clip(self.position[:, :2], -ROOM, ROOM)
+
+    def persons(self):
+        return [(int(i), 1, *p, *v) for i, p, v in zip(self.ids.tolist(), self.position.tolist(), self.velocity.tolist())]
+
+    def points(self, count):
+        """`count` punti: il 90% attorno alle persone, il resto rumore uniforme nella stanza."""
+        rng = self.rng
+        noise = count // 10 if len(self.ids) else count
+        owners = rng.integers(0, max(len(self.ids), 1), count - noise)
+        xyz = np.concatenate([
+            self.position[owners] + rng.normal(0, 0.15, (count - noise, 3)) if len(self.ids) else np.zeros((0, 3)),
+            np.column_stack([rng.uniform(-ROOM, ROOM, (noise, 2)), rng.uniform(0, 2.5, noise)])
+        ])
+        v = rng.integers(0, 256, count)
+        snr = rng.uniform(2, 12, count)
+        power = rng.uniform(10, 60, count)
+        dpk = rng.uniform(0, 5, count)
+        return list(zip(*xyz.T.tolist(), v.tolist(), snr.tolist(), power.tolist(), dpk.tolist()))
+
+def malformed_line(time, payload, rng):
+    """Una linea come quelle che si trovano nei log reali ma che non contengono un frame completo."""
+    kind = rng.integers(0, 3)
+    if kind == 0:
+        return (format_line(time, b'AT+STOP\n', OUT_PREFIX).rstrip(b'\n') + '¡õ'.encode('latin-1') + b'\n'
+                + format_line(time, b'AT+STOP\r\n'))
+    if kind == 1:
+        return format_line(time, payload[:int(rng.integers(1, pointCloud.HEADER_SIZE))])
+    return b'\n'
+
+def generate_capture(output_file, mode='d2', points=30, persons=2, rate=2.5, hours=0.1, malformed=0.0,
+                     seed=0, start='10:00:00.000'):
+    """Scrive un'acquisizione sintetica e restituisce il numero di frame generati."""
+    if mode not in ('d2', 'd3'):
+        raise ValueError(f"Modalità non valida: {mode} (ammesse: d2, d3)")
+    rng = np.random.default_rng(seed)
+    room = Room(persons, rng)
+    frames = int(hours * 3600 * rate)
+    start_ms = round(pointCloud.time_to_seconds(start) * 1000)
+    with open(output_file, 'wb') as file:
+        for frame_number in range(frames):
+            room.step(1 / rate)
+            time = format_time(start_ms + round(frame_number * 1000 / rate))
+            count = int(rng.poisson(points)) if mode == 'd2' else 0
+            payload = build_frame(frame_number, room.points(count), room.persons(), mode)
+            if malformed and rng.random() < malformed:
+                file.write(malformed_line(time, payload, rng))
+            else:
+                file.write(format_line(time, payload))
+    return frames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un file TXT SSCOM5 sintetico in modalità DEBUG 2 o DEBUG 3.")
+    parser.add_argument('output_txt', type=str, help='Il file TXT da generare')
+    parser.add_argument('--mode', choices=['d2', 'd3'], default='d2', help='DEBUG 2 (punti e persone) o DEBUG 3 (solo persone)')
+    parser.add_argument('--points', type=float, default=30, help='Numero medio di punti per frame (solo d2)')
+    parser.add_argument('--persons', type=int, default=2, help='Numero di persone nella stanza')
+    parser.add_argument('--rate', type=float, default=2.5, help='Frame al secondo (AT+TIME=400 -> 2.5)')
+    parser.add_argument('--hours', type=float, default=0.1, help="Durata dell'acquisizione in ore")
+    parser.add_argument('--malformed', type=float, default=0.0, help='Frazione di linee malformate (0-1)')
+    parser.add_argument('--seed', type=int, default=0, help='Seme del generatore casuale')
+    parser.add_argument('--start', default='10:00:00.000', help='Timestamp della prima linea (HH:MM:SS.mmm)')
+    args = parser.parse_args()
+
+    frames = generate_capture(args.output_txt, args.mode, args.points, args.persons, args.rate, args.hours,
+                              args.malformed, args.seed, args.start)
+    print(f"{frames} frame scritti in {args.output_txt} ({os.path.getsize(args.output_txt) / 1e6:.1f} MB)")
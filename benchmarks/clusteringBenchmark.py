@@ -0,0 +1,42 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import clustering
+import pointCloudNumpy
+
+# HOW to use this script > python benchmarks/clusteringBenchmark.py [input.txt] [--repeat N] [--eps 0.3] [--min-samples 3]
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results', 'pointCloud',
+                             '1 - radar generated file.TXT')
+
+def measure(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Misura i frame/secondo del clustering DBSCAN su griglia.")
+    parser.add_argument('input_txt', nargs='?', default=DEFAULT_INPUT, help='Il file TXT SSCOM5 da raggruppare')
+    parser.add_argument('--repeat', type=int, default=10, help='Numero di ripetizioni (si tiene la migliore)')
+    parser.add_argument('--eps', type=float, default=clustering.DEFAULT_EPS, help='Distanza massima tra due punti vicini')
+    parser.add_argument('--min-samples', type=int, default=clustering.DEFAULT_MIN_SAMPLES, help='Vicini minimi per un punto core')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        times, offsets, points = pointCloudNumpy.load_capture(args.input_txt, point_length=True)
+    frames = [points[offsets[i]:offsets[i + 1]] for i in range(len(times))]
+
+    batch = measure(lambda: clustering.cluster_capture(times, offsets, points, args.eps, args.min_samples), args.repeat)
+    single = measure(lambda: [clustering.cluster_frame(frame, args.eps, args.min_samples) for frame in frames], args.repeat)
+    print(f"Frame: {len(times)}, punti: {len(points)}")
+    print(f"cluster_capture (tutta l'acquisizione): {len(times) / batch:12.0f} frame/s")
+    print(f"cluster_frame (un frame alla volta):    {len(times) / single:12.0f} frame/s")
@@ -0,0 +1,50 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pointCloud
+
+# HOW to use this script > python benchmarks/decoderBenchmark.py [input.txt] [--repeat N]
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results', 'pointCloud',
+                             '1 - radar generated file.TXT')
+
+def legacy_decode(lines):
+    """Percorso originale: stringhe esadecimali per byte, poi bytes.fromhex + struct.unpack per coordinata."""
+    data = [mapped for mapped in (pointCloud.mappare(line) for line in lines if line.strip()) if mapped]
+    return pointCloud.transform_values(pointCloud.remove_fields(data))
+
+def binary_decode(raw_lines):
+    """Nuovo percorso: un solo bytes.fromhex per linea e record da 25 bytes spacchettati con struct.Struct."""
+    return [decoded for decoded in (pointCloud.decode_line(line) for line in raw_lines if line.strip()) if decoded]
+
+def measure(function, lines, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(lines)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Misura le linee/secondo del decoder testuale e di quello binario.")
+    parser.add_argument('input_txt', nargs='?', default=DEFAULT_INPUT, help='Il file TXT SSCOM5 da decodificare')
+    parser.add_argument('--repeat', type=int, default=20, help='Numero di ripetizioni (si tiene la migliore)')
+    args = parser.parse_args()
+
+    with open(args.input_txt, 'rb') as f:
+        raw_lines = f.readlines()
+    text_lines = [line.decode('latin-1') for line in raw_lines]
+
+    legacy = measure(legacy_decode, text_lines, args.repeat)
+    binary = measure(binary_decode, raw_lines, args.repeat)
+    print(f"Linee: {len(raw_lines)}")
+    print(f"mappare + transform_values: {legacy:12.0f} linee/s")
+    print(f"decode_line (binario):      {binary:12.0f} linee/s")
+    print(f"Speedup: {binary / legacy:.1f}x")
@@ -0,0 +1,254 @@
+import argparse
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+
+import frameParser
+import pointCloud
+import sessionReplay
+
+# Indice temporale dei file TXT di SSCOM5, salvato accanto al file (<file>.idx): per ogni linea con un frame
+# contiene il tempo, il numero di frame (CurrentFrame) e l'offset in bytes della linea. Una richiesta come
+# "cosa è successo alle 03:12:45" diventa una ricerca binaria nell'indice e una seek nel file, e vengono
+# decodificate solo le linee dell'intervallo.
+# I tempi dell'indice sono millisecondi continui dall'inizio del primo giorno: al passaggio della mezzanotte
+# si aggiunge un giorno, così l'indice resta ordinato anche per le acquisizioni di più giorni.
+# L'indice si aggiorna in modo incrementale: vengono lette solo le linee complete aggiunte dopo l'ultimo
+# aggiornamento (come in `pointCloud.update_averages`).
+
+# HOW to use this script > python captureIndex.py build <input.txt>
+#                          python captureIndex.py time <input.txt> 03:12:45 [03:13:00] [--day N] [--averages-csv medie.csv]
+#                          python captureIndex.py frame <input.txt> <numero>
+
+# Header: magic, bytes del file già indicizzati, hash dell'inizio del file (per riconoscere un file sostituito)
+INDEX_MAGIC = b'MS72IDX1'
+HEADER = struct.Struct('<8sQ16s')
+RECORD = struct.Struct('<qQI')  # tempo continuo (ms), offset della linea, CurrentFrame
+PREFIX_SIZE = 4096
+DAY_MS = sessionReplay.DAY_MS
+
+def index_path(file_path):
+    return file_path + '.idx'
+
+def prefix_hash(file_path, size):
+    with open(file_path, 'rb') as file:
+        return hashlib.blake2b(file.read(min(size, PREFIX_SIZE)), digest_size=16).digest()
+
+def index_entry(line):
+    """(ms dalla mezzanotte, CurrentFrame) di una linea con un frame, None per le altre linee."""
+    parsed = pointCloud.parse_raw_line(line)
+    if parsed is None or len(parsed[2]) < frameParser.TLV_OFFSET:
+        return None
+    try:
+        milliseconds = sessionReplay.time_to_ms(parsed[0])
+    except ValueError:
+        return None
+    return milliseconds, int.from_bytes(parsed[2][12:16], 'little')
+
+def time_span(time):
+    """Millisecondi coperti da un orario oltre al suo inizio: 999 senza millisecondi, altrimenti 0."""
+    return 0 if '.' in time else 999
+
+def read_header(path):
+    try:
+        with open(path, 'rb') as file:
+            data = file.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(data) < HEADER.size or not data.startswith(INDEX_MAGIC):
+        return None
+    return HEADER.unpack(data)
+
+def update_index(file_path):
+    """Crea o aggiorna l'indice di `file_path` e restituisce il numero di linee aggiunte.
+
+    L'indice viene ricostruito da zero se il file è più corto della parte già indicizzata o se il suo
+    inizio è cambiato."""
+    path = index_path(file_path)
+    header = read_header(path)
+    indexed = 0
+    if header is not None:
+        _, indexed, digest = header
+        if os.path.getsize(file_path) < indexed or prefix_hash(file_path, indexed) != digest:
+            header, indexed = None, 0
+    if header is None:
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(INDEX_MAGIC, 0, prefix_hash(file_path, 0)))
+
+    added = 0
+    with open(file_path, 'rb') as source, open(path, 'r+b') as file:
+        # Record scritti da un aggiornamento interrotto prima dell'header: vengono scartati
+        count = (os.fstat(file.fileno()).st_size - HEADER.size) // RECORD.size
+        last = None
+        while count:
+            file.seek(HEADER.size + (count - 1) * RECORD.size)
+            time, offset, _ = RECORD.unpack(file.read(RECORD.size))
+            if offset < indexed:
+                last = time
+                break
+            count -= 1
+        file.truncate(HEADER.size + count * RECORD.size)
+        file.seek(0, os.SEEK_END)
+
+        source.seek(indexed)
+        position = [indexed]
+        for line in pointCloud.iter_new_lines(source, position):
+            entry = index_entry(line)
+            if entry is None:
+                continue
+            last = pointCloud.continuous_time(entry[0], last, DAY_MS)
+            file.write(RECORD.pack(last, position[0] - len(line), entry[1]))
+            added += 1
+        file.flush()
+        file.seek(0)
+        file.write(HEADER.pack(INDEX_MAGIC, position[0], prefix_hash(file_path, position[0])))
+    return added
+
+class _Column:
+    """Vista di un campo dei record, per `bisect` senza caricare l'indice in memoria."""
+
+    def __init__(self, index, field):
+        self.index = index
+        self.field = field
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, position):
+        return self.index.record(position)[self.field]
+
+class CaptureIndex:
+    """Indice aperto in memory-map: ricerca per tempo e per numero di frame."""
+
+    def __init__(self, file_path, update=True):
+        if update:
+            update_index(file_path)
+        self.file_path = file_path
+        header = read_header(index_path(file_path))
+        if header is None:
+            raise ValueError(f"Indice non valido: {index_path(file_path)}")
+        self.indexed = header[1]
+        with open(index_path(file_path), 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = (len(self.data) - HEADER.size) // RECORD.size
+        self.times = _Column(self, 0)
+        self.frames = None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, position):
+        """(tempo continuo, offset, CurrentFrame) della linea `position` dell'indice."""
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        return RECORD.unpack_from(self.data, HEADER.size + position * RECORD.size)
+
+    def resolve(self, time, day=None):
+        """Tempo continuo di 'HH:MM:SS.mmm': il primo istante con quell'ora dall'inizio dell'acquisizione,
+        oppure quello del giorno `day` (0 = il giorno della prima linea). Un orario senza millisecondi
+        resta nel primo giorno se il suo secondo contiene la prima linea."""
+        if not self.count:
+            return 0
+        first = self.record(0)[0]
+        candidate = first // DAY_MS * DAY_MS + sessionReplay.time_to_ms(time)
+        if day is not None:
+            return candidate + day * DAY_MS
+        return candidate + DAY_MS if candidate + time_span(time) < first else candidate
+
+    def time_range(self, start, end=None, day=None):
+        """Posizioni [i, j) delle linee tra `start` e `end` compresi (senza `end`, solo l'istante `start`).
+
+        Un orario senza millisecondi ('03:12:45') vale per tutto il secondo. Un `end` minore di
+        `start` è del giorno dopo."""
+        first = self.resolve(start, day)
+        last = first if end is None else self.resolve(end, day)
+        if last < first:
+            last += DAY_MS
+        last += time_span(start if end is None else end)
+        return bisect.bisect_left(self.times, first), bisect.bisect_right(self.times, last)
+
+    def frame_positions(self, frame):
+        """Posizioni delle linee con CurrentFrame `frame`.
+
+        I numeri di frame non sono ordinati nel file (il contatore riparte a ogni avvio del radar),
+        quindi alla prima richiesta viene costruito in memoria un indice secondario ordinato per
+        (frame, posizione); le richieste successive sono ricerche binarie."""
+        if self.frames is None:
+            records = RECORD.iter_unpack(self.data[HEADER.size:HEADER.size + self.count * RECORD.size])
+            self.frames = sorted((record[2], position) for position, record in enumerate(records))
+        start = bisect.bisect_left(self.frames, (frame, -1))
+        stop = bisect.bisect_left(self.frames, (frame + 1, -1))
+        return [position for _, position in self.frames[start:stop]]
+
+    def lines(self, start, stop):
+        """Linee del file dalla posizione `start` (compresa) alla `stop` (esclusa) dell'indice."""
+        if start >= stop:
+            return
+        begin = self.record(start)[1]
+        end = self.record(stop)[1] if stop < self.count else self.indexed
+        with open(self.file_path, 'rb') as file:
+            file.seek(begin)
+            while file.tell() < end:
+                yield file.readline()
+
+def iter_time_range(file_path, start, end=None, day=None):
+    """Generatore di (time, frame) decodificati (vedi `frameParser.parse_line`) tra due orari."""
+    with CaptureIndex(file_path) as index:
+        for line in index.lines(*index.time_range(start, end, day)):
+            parsed = frameParser.parse_line(line)
+            if parsed:
+                yield parsed
+
+def print_frames(lines):
+    for line in lines:
+        parsed = frameParser.parse_line(line)
+        if parsed:
+            time, frame = parsed
+            print(f"{time} frame {frame['frame']}: {len(frame['points'])} punti, {len(frame['persons'])} persone")
+
+def add_arguments(parser):
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Crea o aggiorna l'indice")
+    build.add_argument('input_txt', help='Il file TXT SSCOM5')
+    by_time = commands.add_parser('time', help='Frame tra due orari')
+    by_time.add_argument('input_txt', help='Il file TXT SSCOM5')
+    by_time.add_argument('start', help='Orario iniziale HH:MM:SS[.mmm] (senza millisecondi: tutto il secondo)')
+    by_time.add_argument('end', nargs='?', default=None, help='Orario finale (default: solo lo stesso istante)')
+    by_time.add_argument('--day', type=int, default=None, help="Giorno dell'acquisizione (0 = il primo)")
+    by_time.add_argument('--averages-csv', default=None, help="Salva le medie dei punti dell'intervallo in questo CSV")
+    by_frame = commands.add_parser('frame', help='Linee con un dato CurrentFrame')
+    by_frame.add_argument('input_txt', help='Il file TXT SSCOM5')
+    by_frame.add_argument('frame', type=int, help='Numero del frame')
+
+def run(args):
+    if args.command == 'build':
+        added = update_index(args.input_txt)
+        print(f"{added} linee aggiunte all'indice {index_path(args.input_txt)}")
+        return
+    with CaptureIndex(args.input_txt) as index:
+        if args.command == 'frame':
+            for position in index.frame_positions(args.frame):
+                print_frames(index.lines(position, position + 1))
+        elif args.averages_csv:
+            lines = index.lines(*index.time_range(args.start, args.end, args.day))
+            frames = (decoded for decoded in map(pointCloud.decode_line, lines) if decoded)
+            pointCloud.save_averages_to_csv(
+                pointCloud.iter_averages(pointCloud.iter_formatted(pointCloud.iter_stripped(frames))), args.averages_csv)
+        else:
+            print_frames(index.lines(*index.time_range(args.start, args.end, args.day)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indice temporale di un file TXT SSCOM5 per leggere solo un intervallo di tempo.")
+    add_arguments(parser)
+    run(parser.parse_args())
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+import pointCloud
+import pointCloudNumpy
+import pointsPerson
+
+# Formato colonnare su disco per le acquisizioni decodificate: una cartella con un file .npy per colonna.
+# I file .npy sono record a larghezza fissa (25 bytes per punto, 32 per persona) e vengono aperti in
+# memory-map, quindi le analisi su un giorno di dati non devono caricarlo tutto in RAM.
+
+# HOW to use this script > python captureStore.py convert <input.txt|input.json> <output.capture>
+#                          python captureStore.py averages <input.capture> <output.csv>
+
+FORMAT_VERSION = 1
+PERSON_DTYPE = pointCloudNumpy.PERSON_DTYPE
+COLUMNS = ('times', 'frames', 'offsets', 'points', 'person_offsets', 'persons')
+FRAMES_PER_BLOCK = 65536
+
+def write_capture(path, capture, source=None, rejected=None):
+    """Salva un'acquisizione (dizionario di array, chiavi in COLUMNS) nella cartella `path`;
+    `rejected` sono i conteggi per motivo delle linee scartate in decodifica (vedi `frameValidation`)."""
+    os.makedirs(path, exist_ok=True)
+    for name in COLUMNS:
+        np.save(os.path.join(path, f'{name}.npy'), capture[name])
+    meta = {'version': FORMAT_VERSION, 'source': source, 'frames': len(capture['times']),
+            'points': len(capture['points']), 'persons': len(capture['persons']), 'rejected': rejected or {}}
+    with open(os.path.join(path, 'meta.json'), 'w') as file:
+        json.dump(meta, file, indent=4)
+
+def open_capture(path):
+    """Apre un'acquisizione salvata; gli array sono in memory-map e in sola lettura."""
+    with open(os.path.join(path, 'meta.json'), 'r') as file:
+        meta = json.load(file)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Versione del formato non supportata: {meta.get('version')}")
+    capture = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+    capture['meta'] = meta
+    return capture
+
+def capture_from_txt(file_path, quarantine=None):
+    """Decodifica un file TXT SSCOM5 con `pointCloudNumpy.decode_capture` (stessi punti di `load_capture`)."""
+    return pointCloudNumpy.decode_capture(file_path, quarantine=quarantine, persons=True)
+
+def capture_from_json(file_path):
+    """Converte un JSON storico: quello di `save_to_json` (stringhe esadecimali) o quello già
+    trasformato da `process_json_file` (x, y, z arrotondati, gli altri campi restano a zero)."""
+    with open(file_path, 'r') as file:
+        data = json.load(file)
+    times, counts, records = [], [], []
+    for entry in data:
+        if entry is None or not isinstance(entry.get('points'), list):
+            continue
+        for point in entry['points']:
+            values = dict((key.rstrip('0123456789'), value) for key, value in point.items())
+            if 'SNR' in values:
+                raw = bytes.fromhex(''.join(values[field] for field in pointCloud.POINT_FIELDS))
+                records.append(pointCloud.POINT_RECORD.unpack(raw))
+            else:
+                records.append((float(values['x']), float(values['y']), float(values['z']), 0, 0.0, 0.0, 0.0))
+        times.append(entry['time'])
+        counts.append(len(entry['points']))
+    return {
+        'times': np.array(times, dtype='U12'),
+        'frames': np.zeros(len(times), dtype=np.uint32),  # il numero di frame non è nei JSON storici
+        'offsets': pointCloudNumpy.counts_to_offsets(counts),
+        'points': np.array(records, dtype=pointCloudNumpy.POINT_DTYPE),
+        'person_offsets': np.zeros(len(times) + 1, dtype=np.int64),
+        'persons': np.zeros(0, dtype=PERSON_DTYPE)
+    }
+
+def iter_blocks(capture, frames_per_block=FRAMES_PER_BLOCK):
+    """Generatore di (times, offsets, points) per blocchi di frame, con offset relativi al blocco."""
+    offsets = capture['offsets']
+    for first in range(0, len(capture['times']), frames_per_block):
+        last = min(first + frames_per_block, len(capture['times']))
+        block_offsets = np.asarray(offsets[first:last + 1])
+        yield (capture['times'][first:last], block_offsets - block_offsets[0],
+               capture['points'][block_offsets[0]:block_offsets[-1]])
+
+def calculate_averages(capture, frames_per_block=FRAMES_PER_BLOCK):
+    """Medie per frame su un'acquisizione in memory-map, un blocco di frame alla volta."""
+    for times, offsets, points in iter_blocks(capture, frames_per_block):
+        yield from pointCloudNumpy.calculate_averages(times, offsets, points)
+
+def iter_person_frames(capture):
+    """Generatore di (time, frame, persons) come `pointsPerson.iter_person_frames`."""
+    offsets = capture['person_offsets']
+    persons = capture['persons']
+    for i, (time, frame) in enumerate(zip(capture['times'].tolist(), capture['frames'].tolist())):
+        records = persons[offsets[i]:offsets[i + 1]].tolist()
+        yield time, frame, [pointsPerson.Person(*record) for record in records]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte e analizza le acquisizioni nel formato colonnare.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='Converte un file TXT SSCOM5 o un JSON storico')
+    convert.add_argument('input_file', help='Il file TXT o JSON di input')
+    convert.add_argument('output_dir', help='La cartella di output (es. acquisizione.capture)')
+    averages = subparsers.add_parser('averages', help='Calcola le medie dei punti e le salva in CSV')
+    averages.add_argument('input_dir', help="La cartella dell'acquisizione")
+    averages.add_argument('output_csv', help='Il file CSV di output')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        if args.input_file.lower().endswith('.json'):
+            capture = capture_from_json(args.input_file)
+        else:
+            capture = capture_from_txt(args.input_file)
+        write_capture(args.output_dir, capture, source=os.path.basename(args.input_file))
+        print(f"Salvati {len(capture['times'])} frame e {len(capture['points'])} punti in {args.output_dir}")
+    else:
+        pointCloud.save_averages_to_csv(calculate_averages(open_capture(args.input_dir)), args.output_csv)
@@ -0,0 +1,173 @@
+import argparse
+import csv
+from itertools import product
+
+import numpy as np
+
+import pointCloudNumpy
+
+# Clustering in stile DBSCAN della nuvola di punti, per separare le riflessioni delle persone dal rumore.
+# I vicini si cercano su una griglia di celle di lato `eps`: ogni punto viene confrontato solo con i punti
+# delle 27 celle adiacenti. Il numero del frame fa parte della chiave della cella, quindi un'intera
+# acquisizione viene raggruppata in un'unica passata vettorizzata senza che i frame si mescolino.
+
+# HOW to use this script > python clustering.py <input.txt> <output.csv> [--eps 0.3] [--min-samples 3]
+
+DEFAULT_EPS = 0.3
+DEFAULT_MIN_SAMPLES = 3
+LIMIT = 10  # stesso box di calculate_averages: i punti fuori da [-10, 10] metri sono scartati
+NOISE = -1
+CLUSTER_FIELDS = ['time', 'cluster', 'count', 'x', 'y', 'z', 'snr_mean', 'snr_min', 'snr_max']
+
+def valid_mask(points, limit=LIMIT):
+    """Punti con coordinate finite e dentro il box [-limit, limit]."""
+    mask = np.ones(len(points), dtype=bool)
+    for axis in ('x', 'y', 'z'):
+        values = points[axis]
+        mask &= np.isfinite(values) & (values >= -limit) & (values <= limit)
+    return mask
+
+def cell_keys(frames, xyz, eps):
+    """Chiave intera della cella di ogni punto e passi della chiave per x, y, z.
+
+    Le celle vengono spostate di uno, così anche le celle vicine di quelle ai bordi hanno una chiave
+    valida e non si confondono con le celle di un'altra riga o di un altro frame."""
+    cells = np.floor(xyz / eps).astype(np.int64)
+    cells -= cells.min(axis=0, initial=0) - 1
+    sizes = cells.max(axis=0, initial=0) + 2
+    strides = np.array([sizes[1] * sizes[2], sizes[2], 1], dtype=np.int64)
+    frame_stride = sizes[0] * strides[0]
+    return frames * frame_stride + cells @ strides, strides
+
+def neighbor_pairs(keys, strides, xyz, eps):
+    """Coppie (i, j) di punti a distanza <= eps, comprese le coppie (i, i)."""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    sources, targets = [], []
+    for offset in product((-1, 0, 1), repeat=3):
+        neighbors = keys + np.dot(offset, strides)
+        low = np.searchsorted(sorted_keys, neighbors, 'left')
+        counts = np.searchsorted(sorted_keys, neighbors, 'right') - low
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        source = np.repeat(np.arange(len(keys)), counts)
+        position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(low, counts)
+        target = order[position]
+        close = ((xyz[source] - xyz[target]) ** 2).sum(axis=1) <= eps * eps
+        sources.append(source[close])
+        targets.append(target[close])
+    if not sources:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(sources), np.concatenate(targets)
+
+def connected_labels(count, sources, targets):
+    """Componenti connesse: ogni nodo prende il minimo indice raggiungibile (propagazione + salti)."""
+    labels = np.arange(count)
+    while True:
+        smallest = np.minimum(labels[sources], labels[targets])
+        updated = labels.copy()
+        np.minimum.at(updated, sources, smallest)
+        np.minimum.at(updated, targets, smallest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+def dbscan(frames, xyz, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES):
+    """DBSCAN per frame: restituisce l'etichetta di ogni punto (NOISE per il rumore).
+
+    Le etichette sono numerate da 0 dentro ogni frame, nell'ordine del primo punto del cluster."""
+    labels = np.full(len(xyz), NOISE, dtype=np.int64)
+    if len(xyz) == 0:
+        return labels
+    keys, strides = cell_keys(frames, xyz, eps)
+    sources, targets = neighbor_pairs(keys, strides, xyz, eps)
+    core = np.bincount(sources, minlength=len(xyz)) >= min_samples
+
+    # Cluster = componenti connesse dei punti core; i punti di bordo prendono il cluster di un core vicino
+    linked = core[sources] & core[targets]
+    roots = connected_labels(len(xyz), sources[linked], targets[linked])
+    labels[core] = roots[core]
+    border = ~core[sources] & core[targets]
+    if border.any():
+        assigned = np.full(len(xyz), len(xyz), dtype=np.int64)
+        np.minimum.at(assigned, sources[border], roots[targets[border]])
+        labels[assigned < len(xyz)] = assigned[assigned < len(xyz)]
+
+    # Rinumerazione 0, 1, 2, ... per frame
+    clustered = labels != NOISE
+    roots, first = np.unique(labels[clustered], return_index=True)
+    frames_of = frames[clustered][first]
+    order = np.lexsort((first, frames_of))
+    frame_starts = np.searchsorted(frames_of[order], frames_of[order], 'left')
+    numbers = np.empty(len(roots), dtype=np.int64)
+    numbers[order] = np.arange(len(roots)) - frame_starts
+    labels[clustered] = numbers[np.searchsorted(roots, labels[clustered])]
+    return labels
+
+def cluster_capture(times, offsets, points, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES, limit=LIMIT):
+    """Raggruppa i punti di un'acquisizione (come restituita da `pointCloudNumpy.load_capture`).
+
+    Restituisce (labels, clusters): l'etichetta di ogni punto (NOISE anche per i punti fuori dal box)
+    e un dizionario di array con frame, cluster, numero di punti, centroide e statistiche SNR."""
+    mask = valid_mask(points, limit)
+    frames = pointCloudNumpy.frame_index(offsets)[mask]
+    kept = points[mask]
+    xyz = np.column_stack([kept[axis].astype(np.float64) for axis in ('x', 'y', 'z')])
+    labels = np.full(len(points), NOISE, dtype=np.int64)
+    labels[mask] = dbscan(frames, xyz, eps, min_samples)
+
+    clustered = labels[mask] != NOISE
+    groups, inverse, counts = np.unique(
+        np.column_stack([frames[clustered], labels[mask][clustered]]), axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    snr = kept['snr'][clustered].astype(np.float64)
+    clusters = {
+        'time': times[groups[:, 0]] if len(groups) else np.zeros(0, dtype=times.dtype),
+        'frame': groups[:, 0],
+        'cluster': groups[:, 1],
+        'count': counts,
+        'snr_min': np.full(len(groups), np.inf),
+        'snr_max': np.full(len(groups), -np.inf)
+    }
+    for axis, column in zip(('x', 'y', 'z'), xyz[clustered].T):
+        clusters[axis] = np.bincount(inverse, weights=column, minlength=len(groups)) / np.maximum(counts, 1)
+    clusters['snr_mean'] = np.bincount(inverse, weights=snr, minlength=len(groups)) / np.maximum(counts, 1)
+    np.minimum.at(clusters['snr_min'], inverse, snr)
+    np.maximum.at(clusters['snr_max'], inverse, snr)
+    return labels, clusters
+
+def cluster_frame(points, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES, limit=LIMIT):
+    """Raggruppa un singolo frame: `points` è un array POINT_DTYPE o una lista di tuple
+    (x, y, z, v, SNR, POW, DPK) come quelle di `pointCloud.decode_points`."""
+    points = np.asarray(points if isinstance(points, np.ndarray) else np.array(points, dtype=pointCloudNumpy.POINT_DTYPE))
+    return cluster_capture(np.array([''], dtype='U12'), np.array([0, len(points)]), points, eps, min_samples, limit)
+
+def iter_cluster_rows(clusters):
+    """Righe del CSV dei cluster, con le coordinate arrotondate a due decimali."""
+    columns = [clusters[field].tolist() for field in CLUSTER_FIELDS]
+    for values in zip(*columns):
+        row = dict(zip(CLUSTER_FIELDS, values))
+        for field in CLUSTER_FIELDS[3:]:
+            row[field] = round(row[field], 2)
+        yield row
+
+def save_clusters_to_csv(clusters, output_file):
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=CLUSTER_FIELDS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(iter_cluster_rows(clusters))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raggruppa i punti di ogni frame in cluster (DBSCAN) e salva centroidi e statistiche SNR.")
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('output_csv', type=str, help='Il file CSV con un cluster per riga')
+    parser.add_argument('--eps', type=float, default=DEFAULT_EPS, help='Distanza massima tra due punti vicini, in metri')
+    parser.add_argument('--min-samples', type=int, default=DEFAULT_MIN_SAMPLES, help='Numero minimo di vicini (compreso il punto) per un punto core')
+    args = parser.parse_args()
+
+    times, offsets, points = pointCloudNumpy.load_capture(args.input_txt, point_length=True)
+    labels, clusters = cluster_capture(times, offsets, points, args.eps, args.min_samples)
+    save_clusters_to_csv(clusters, args.output_csv)
+    print(f"{len(clusters['frame'])} cluster in {len(times)} frame, {int((labels == NOISE).sum())} punti di rumore su {len(points)}")
@@ -0,0 +1,143 @@
+import itertools
+
+# Writer a blocchi per le tabelle di output (medie, persone...): ricevono blocchi di colonne (liste o array
+# NumPy, una per campo) invece di un dizionario per riga, e scrivono ogni blocco con una sola write.
+# I float non vengono arrotondati prima: la precisione è un'opzione del writer (None = tutte le cifre).
+# Formati: 'csv' (sempre disponibile) e 'parquet' (colonnare, richiede pyarrow, importato solo se usato).
+
+# HOW to use this module > with columnWriters.open_writer('medie.parquet', ['time', 'average_x']) as writer:
+#                              writer.write({'time': times, 'average_x': values})
+
+BLOCK_ROWS = 65536
+DELIMITER = ';'
+LINE_TERMINATOR = '\r\n'  # come csv.writer
+
+def format_column(values, precision=None):
+    """Testo delle celle di una colonna: vuoto per None e NaN, float con `precision` decimali.
+
+    Senza `precision` i float sono scritti con tutte le cifre che servono a rileggerli identici
+    (per un array float32, quelle del float32)."""
+    if getattr(values, 'dtype', None) is not None and values.dtype.kind == 'f' and values.dtype.itemsize == 4 \
+            and precision is None:
+        return ['' if value != value else str(value) for value in values]
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+    number = repr if precision is None else f'{{:.{precision}f}}'.format
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append('')
+        elif isinstance(value, float):
+            cells.append('' if value != value else number(value))
+        else:
+            cells.append(str(value))
+    return cells
+
+class CsvWriter:
+    """CSV con separatore ';': intestazione alla creazione, poi un blocco di righe per ogni `write`."""
+
+    def __init__(self, output_file, fields, precision=None):
+        self.fields = list(fields)
+        self.precision = precision
+        self.rows = 0
+        self.file = open(output_file, 'w', newline='')
+        self.file.write(DELIMITER.join(self.fields) + LINE_TERMINATOR)
+
+    def write(self, columns):
+        cells = [format_column(columns[field], self.precision) for field in self.fields]
+        lines = [DELIMITER.join(row) for row in zip(*cells)]
+        if lines:
+            self.file.write(LINE_TERMINATOR.join(lines) + LINE_TERMINATOR)
+        self.rows += len(lines)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ParquetWriter:
+    """File Parquet scritto a row group, uno per blocco. Lo schema è quello del primo blocco; le
+    colonne senza valori di un blocco successivo prendono il tipo dello schema."""
+
+    def __init__(self, output_file, fields, precision=None):
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError("Il formato Parquet richiede pyarrow (pip install pyarrow)") from error
+        self.pa = pyarrow
+        self.compute = pyarrow.compute
+        self.parquet = pyarrow.parquet
+        self.output_file = output_file
+        self.fields = list(fields)
+        self.precision = precision
+        self.rows = 0
+        self.writer = None
+
+    def column(self, field, values):
+        pa = self.pa
+        array = pa.array(values, from_pandas=True)  # NaN -> null, come le celle vuote del CSV
+        if self.writer is not None and pa.types.is_null(array.type):
+            array = pa.nulls(len(array), self.writer.schema.field(field).type)
+        if self.precision is not None and pa.types.is_floating(array.type):
+            array = self.compute.round(array, self.precision)
+        return array
+
+    def write(self, columns):
+        table = self.pa.table({field: self.column(field, columns[field]) for field in self.fields})
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.output_file, table.schema)
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self.writer is None:  # nessun blocco: file con le sole colonne
+            self.write({field: [] for field in self.fields})
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+WRITERS = {
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+}
+
+def resolve_format(output_file, writer_format=None):
+    """Formato esplicito o ricavato dall'estensione del file (.parquet, altrimenti csv)."""
+    if writer_format is None:
+        writer_format = 'parquet' if output_file.lower().endswith(('.parquet', '.pq')) else 'csv'
+    if writer_format not in WRITERS:
+        raise ValueError(f"Formato non valido: {writer_format} (ammessi: {', '.join(WRITERS)})")
+    return writer_format
+
+def open_writer(output_file, fields, writer_format=None, precision=None):
+    return WRITERS[resolve_format(output_file, writer_format)](output_file, fields, precision)
+
+def iter_column_blocks(rows, fields, block_rows=BLOCK_ROWS):
+    """Raggruppa righe-dizionario (es. quelle di `pointCloud.iter_averages`) in blocchi di colonne."""
+    rows = iter(rows)
+    while True:
+        block = list(itertools.islice(rows, block_rows))
+        if not block:
+            return
+        yield {field: [row.get(field) for row in block] for field in fields}
+
+def write_table(columns, output_file, fields=None, writer_format=None, precision=None):
+    """Scrive un'intera tabella (dizionario di colonne) in blocchi da BLOCK_ROWS righe."""
+    fields = list(fields or columns)
+    total = len(columns[fields[0]]) if fields else 0
+    with open_writer(output_file, fields, writer_format, precision) as writer:
+        for start in range(0, total, BLOCK_ROWS):
+            writer.write({field: columns[field][start:start + BLOCK_ROWS] for field in fields})
+    return total
@@ -0,0 +1,167 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time as clock
+
+import captureStore
+import frameValidation
+
+# Cache su disco delle acquisizioni decodificate, nel formato di captureStore.
+# La chiave è l'hash del contenuto del file più la versione del decoder; dimensione e mtime del file
+# servono come percorso veloce per non ricalcolare l'hash a ogni esecuzione.
+# Quando la cache supera `max_bytes` vengono eliminate le voci usate meno di recente, insieme agli hash
+# dei file che non hanno più una voce.
+# Più processi possono usare la stessa cache: l'indice si aggiorna sotto un lock (un file creato in modo
+# esclusivo, che funziona anche su Windows), unendo le modifiche a quelle salvate dagli altri processi, e
+# si scrive in un file temporaneo sostituito con os.replace.
+
+DECODER_VERSION = 2  # da incrementare quando cambia il risultato della decodifica
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+HASH_BLOCK_SIZE = 1024 * 1024
+LOCK_TIMEOUT = 30  # secondi di attesa del lock dell'indice
+LOCK_STALE = 120  # secondi dopo cui il lock di un processo interrotto viene rimosso
+
+def default_cache_dir():
+    return os.environ.get('MS72SF1_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'ms72sf1')
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+@contextlib.contextmanager
+def _locked(path, timeout=LOCK_TIMEOUT):
+    """Lock tra processi: il file `path` esiste finché il lock è preso."""
+    deadline = clock.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if clock.time() - os.path.getmtime(path) > LOCK_STALE:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if clock.monotonic() > deadline:
+                raise TimeoutError(f"Lock della cache non ottenuto: {path}")
+            clock.sleep(0.05)
+    try:
+        yield
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+def _read_index(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'entries': {}, 'files': {}}
+
+class DecodeCache:
+    """Cache LRU delle acquisizioni decodificate, indicizzata per contenuto del file di input."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(self.directory, 'index.json')
+        self.lock_file = os.path.join(self.directory, 'index.lock')
+        os.makedirs(self.directory, exist_ok=True)
+        self.index = _read_index(self.index_file)
+
+    def _merge(self, saved):
+        """Unisce l'indice in memoria a quello salvato da altri processi: per ogni voce vince l'uso più
+        recente, e le voci la cui cartella è stata eliminata da un altro processo vengono scartate."""
+        entries = saved['entries']
+        for key, entry in self.index['entries'].items():
+            if key in entries and entries[key]['last_used'] >= entry['last_used']:
+                continue
+            if os.path.isdir(os.path.join(self.directory, key)):
+                entries[key] = entry
+        files = saved['files']
+        for path, known in self.index['files'].items():
+            if path not in files or files[path]['mtime_ns'] <= known['mtime_ns']:
+                files[path] = known
+        return saved
+
+    def _save_index(self, keep=None):
+        """Salva l'indice unito a quello su disco, dopo aver eliminato le voci in eccesso (tranne `keep`)."""
+        with _locked(self.lock_file):
+            self.index = self._merge(_read_index(self.index_file))
+            self._evict(keep)
+            temporary = f'{self.index_file}.tmp{os.getpid()}'
+            with open(temporary, 'w') as file:
+                json.dump(self.index, file, indent=4)
+            os.replace(temporary, self.index_file)
+
+    def key(self, file_path):
+        """Chiave della cache per il file: se dimensione e mtime non sono cambiati riusa l'hash noto."""
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        known = self.index['files'].get(path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            content_hash = known['hash']
+        else:
+            content_hash = file_hash(file_path)
+            self.index['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash}
+        return f'{content_hash}-v{DECODER_VERSION}'
+
+    def load(self, key):
+        """Restituisce l'acquisizione in cache (in memory-map) o None."""
+        entry = self.index['entries'].get(key)
+        path = os.path.join(self.directory, key)
+        if entry is None or not os.path.isdir(path):
+            return None
+        entry['last_used'] = clock.time()
+        self._save_index(keep=key)
+        return captureStore.open_capture(path)
+
+    def store(self, key, capture, source=None, rejected=None):
+        path = os.path.join(self.directory, key)
+        temporary = f'{path}.tmp{os.getpid()}'
+        captureStore.write_capture(temporary, capture, source=source, rejected=rejected)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temporary, path)
+        self.index['entries'][key] = {'size': _directory_size(path), 'last_used': clock.time(), 'source': source}
+        self._save_index(keep=key)
+
+    def _evict(self, keep=None):
+        entries = self.index['entries']
+        total = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries.pop(key)['size']
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+        # Hash dei file senza più una voce: il prossimo uso del file lo ricalcola
+        files = self.index['files']
+        for path in [path for path, known in files.items() if f"{known['hash']}-v{DECODER_VERSION}" not in entries]:
+            del files[path]
+
+    def get_or_decode(self, file_path, decode=captureStore.capture_from_txt):
+        """Restituisce l'acquisizione decodificata del file, dalla cache se presente.
+
+        `decode(file_path, quarantine)` decodifica il file quando manca dalla cache; le linee scartate
+        vengono salvate con l'acquisizione, così il riepilogo stampato è lo stesso anche dalla cache."""
+        key = self.key(file_path)
+        capture = self.load(key)
+        if capture is None:
+            quarantine = frameValidation.Quarantine()
+            decoded = decode(file_path, quarantine)
+            self.store(key, decoded, source=os.path.basename(file_path), rejected=quarantine.counts)
+            capture = self.load(key)
+        summary = frameValidation.summarize(capture['meta'].get('rejected', {}))
+        if summary:
+            print(summary)
+        return capture
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import csv
+import time as clock
+
+import pointCloud
+import streamIngest
+
+# Bus asyncio per distribuire i frame decodificati a più consumatori (medie, CSV, tracker, dashboard).
+# Ogni consumatore ha la sua coda limitata: con la politica 'drop-oldest' un consumatore lento perde i
+# frame più vecchi invece di rallentare la lettura del radar, con 'block' il publish aspetta.
+
+# HOW to use this script > python frameBus.py <file.txt> <medie.csv> [--maxsize N] [--policy drop-oldest|block] [--windows-csv finestre.csv]
+
+DROP_OLDEST = 'drop-oldest'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, BLOCK)
+_CLOSED = object()
+
+class Subscription:
+    """Coda di un consumatore del bus, con le metriche di ritardo."""
+
+    def __init__(self, name, maxsize, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Politica non valida: {policy} (ammesse: {', '.join(POLICIES)})")
+        self.name = name
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize)
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    async def put(self, item):
+        if self.policy == BLOCK:
+            await self.queue.put(item)
+        else:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def get(self):
+        """Restituisce il prossimo frame, o solleva StopAsyncIteration quando il bus è chiuso."""
+        published_at, frame = await self.queue.get()
+        if frame is _CLOSED:
+            raise StopAsyncIteration
+        self.received += 1
+        self.last_latency = clock.monotonic() - published_at
+        self.max_latency = max(self.max_latency, self.last_latency)
+        return frame
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    def metrics(self):
+        return {
+            'name': self.name,
+            'policy': self.policy,
+            'published': self.published,
+            'received': self.received,
+            'dropped': self.dropped,
+            'lag': self.queue.qsize(),
+            'max_lag': self.max_depth,
+            'last_latency_s': round(self.last_latency, 6),
+            'max_latency_s': round(self.max_latency, 6)
+        }
+
+class FrameBus:
+    """Distribuisce ogni frame pubblicato a tutte le sottoscrizioni."""
+
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe(self, name, maxsize=100, policy=DROP_OLDEST):
+        subscription = Subscription(name, maxsize, policy)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def publish(self, frame):
+        item = (clock.monotonic(), frame)
+        for subscription in self.subscriptions:
+            subscription.published += 1
+            await subscription.put(item)
+
+    async def close(self):
+        """Segnala la fine dello stream; la chiusura non viene mai scartata."""
+        for subscription in self.subscriptions:
+            if subscription.policy == DROP_OLDEST and subscription.queue.full():
+                subscription.queue.get_nowait()
+                subscription.dropped += 1
+            await subscription.queue.put((clock.monotonic(), _CLOSED))
+
+    def metrics(self):
+        return [subscription.metrics() for subscription in self.subscriptions]
+
+async def pump(frames, bus):
+    """Legge i frame da un iteratore bloccante in un thread separato e li pubblica sul bus."""
+    loop = asyncio.get_running_loop()
+    iterator = iter(frames)
+    while True:
+        frame = await loop.run_in_executor(None, next, iterator, _CLOSED)
+        if frame is _CLOSED:
+            break
+        await bus.publish(frame)
+    await bus.close()
+
+async def write_averages(subscription, output_file):
+    """Consumatore: scrive le medie dei punti nel CSV; la scrittura su disco avviene in un thread."""
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=pointCloud.AVERAGE_FIELDS, delimiter=';')
+        writer.writeheader()
+        async for frame in subscription:
+            rows = pointCloud.iter_averages(pointCloud.iter_formatted(pointCloud.iter_stripped([(frame['time'], frame['points'])])))
+            await asyncio.to_thread(writer.writerows, rows)
+
+async def print_persons(subscription):
+    """Consumatore: stampa il numero di persone per frame."""
+    async for frame in subscription:
+        print(f"{frame['time']} frame {frame['frame']}: {len(frame['persons'])} persone")
+
+async def run_log(input_file, output_file, maxsize, policy, windows_file=None):
+    bus = FrameBus()
+    consumers = [
+        write_averages(bus.subscribe('averages_csv', maxsize, policy), output_file),
+        print_persons(bus.subscribe('console', maxsize, policy))
+    ]
+    if windows_file:
+        import slidingWindows
+        consumers.append(slidingWindows.write_windows(bus.subscribe('windows_csv', maxsize, policy),
+                                                      windows_file, slidingWindows.WindowAggregator()))
+    frames = (streamIngest.decode_frame(payload, time) for time, payload in streamIngest.log_frames(input_file))
+    await asyncio.gather(pump(frames, bus), *consumers)
+    return bus.metrics()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distribuisce i frame di un log SSCOM5 a più consumatori tramite un bus asyncio.")
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('output_csv', type=str, help='Il file CSV con le medie dei punti')
+    parser.add_argument('--maxsize', type=int, default=100, help='Lunghezza massima della coda di ogni consumatore')
+    parser.add_argument('--policy', choices=POLICIES, default=DROP_OLDEST, help='Cosa fare quando una coda è piena')
+    parser.add_argument('--windows-csv', default=None, help='Scrive anche le statistiche su finestre scorrevoli (slidingWindows) in questo CSV')
+    args = parser.parse_args()
+
+    for metrics in asyncio.run(run_log(args.input_txt, args.output_csv, args.maxsize, args.policy, args.windows_csv)):
+        print(metrics)
@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import itertools
+
+import frameValidation
+import pointCloud
+import pointsPerson
+
+# Parser unico dei frame MS72SF1 per log DEBUG 2, DEBUG 3 o misti. Dopo magic, LenFrame e CurrentFrame il
+# frame è una sequenza di TLV (tipo e lunghezza da 4 bytes): il primo è TLV1 con i punti (la sua lunghezza
+# è PointL), poi TLV2 con le persone. Il parser salta da un TLV all'altro usando le lunghezze, senza
+# cercare '02 00 00 00' nel testo, e passa ogni blocco al decoder del suo tipo: punti e persone vengono
+# decodificati nella stessa passata. Un frame DEBUG 3 è un frame con TLV1 vuoto (PointL = 0).
+
+# HOW to use this script > python frameParser.py <input.txt> [--averages medie.csv] [--persons persone.csv] [--quarantine scarti.csv]
+
+TLV_POINTS = 1
+TLV_PERSONS = pointsPerson.TLV_PERSONS
+TLV_OFFSET = 16  # il primo TLV (tipo TLV1 e lunghezza PointL) è negli ultimi 8 bytes dell'header
+DEBUG2 = 'd2'
+DEBUG3 = 'd3'
+
+def decode_point_block(block):
+    count = len(block) // pointCloud.POINT_RECORD.size
+    return list(pointCloud.POINT_RECORD.iter_unpack(block[:count * pointCloud.POINT_RECORD.size]))
+
+def decode_person_block(block):
+    count = len(block) // pointsPerson.PERSON_RECORD.size
+    return [pointsPerson.Person(*record) for record in
+            pointsPerson.PERSON_RECORD.iter_unpack(block[:count * pointsPerson.PERSON_RECORD.size])]
+
+# Decoder per tipo di TLV: chiave del risultato e funzione che decodifica il blocco
+DECODERS = {
+    TLV_POINTS: ('points', decode_point_block),
+    TLV_PERSONS: ('persons', decode_person_block),
+}
+
+def frame_end(payload):
+    """Fine del frame secondo LenFrame, senza superare i bytes effettivamente ricevuti."""
+    length = int.from_bytes(payload[8:12], 'little')
+    return min(length, len(payload)) if length >= pointCloud.HEADER_SIZE else len(payload)
+
+def iter_tlvs(payload):
+    """Generatore di (tipo, start, end) dei TLV del frame; un TLV troncato viene limitato alla fine del frame."""
+    end_of_frame = frame_end(payload)
+    offset = TLV_OFFSET
+    while offset + pointsPerson.TLV_HEADER.size <= end_of_frame:
+        tlv, length = pointsPerson.TLV_HEADER.unpack_from(payload, offset)
+        start = offset + pointsPerson.TLV_HEADER.size
+        yield tlv, start, min(start + length, end_of_frame)
+        offset = start + length
+
+def parse_frame(payload):
+    """Decodifica un frame binario in un dizionario con numero di frame, modalità, punti e persone.
+
+    I TLV di tipo sconosciuto vengono saltati grazie alla loro lunghezza."""
+    view = memoryview(payload)
+    frame = {
+        'frame': int.from_bytes(payload[12:16], 'little'),
+        'mode': DEBUG3,
+        'points': [],
+        'persons': []
+    }
+    for tlv, start, end in iter_tlvs(payload):
+        decoder = DECODERS.get(tlv)
+        if decoder is not None:
+            key, decode = decoder
+            frame[key] = decode(view[start:end])
+        if tlv == TLV_POINTS and end > start:
+            frame['mode'] = DEBUG2
+    return frame
+
+def parse_line(line):
+    """(time, frame) per una linea SSCOM5 letta in binario, None se la linea non contiene un frame."""
+    parsed = pointCloud.parse_raw_line(line)
+    if parsed is None or len(parsed[2]) < pointCloud.HEADER_SIZE:
+        return None
+    time, _, payload = parsed
+    return time, parse_frame(payload)
+
+def iter_frames(file_path, quarantine=None, strict=False):
+    """Generatore di (time, frame) per tutte le linee con un frame del file.
+
+    `quarantine` e `strict` come in `frameValidation.iter_valid_frames`."""
+    for time, payload in frameValidation.iter_valid_frames(file_path, quarantine, strict):
+        yield time, parse_frame(payload)
+
+def frame_mode(payload):
+    """DEBUG2 se il TLV1 del frame contiene dei punti, altrimenti DEBUG3 (come `parse_frame`, senza decodificare)."""
+    for tlv, start, end in iter_tlvs(payload):
+        if tlv == TLV_POINTS and end > start:
+            return DEBUG2
+    return DEBUG3
+
+def peek_mode(lines, max_frames=100):
+    """(modalità, linee) per un iterabile di tuple che finiscono con il payload, come quelle di
+    `frameValidation.iter_valid_lines`: 'd2' se tra i primi frame ce n'è uno con dei punti, altrimenti 'd3'.
+
+    Le linee lette per riconoscere la modalità vengono restituite insieme alle altre, così chi legge
+    il file lo legge una volta sola."""
+    lines = iter(lines)
+    head = []
+    mode = DEBUG3
+    for item in lines:
+        head.append(item)
+        if frame_mode(item[-1]) == DEBUG2:
+            mode = DEBUG2
+            break
+        if len(head) >= max_frames:
+            break
+    return mode, itertools.chain(head, lines)
+
+def detect_mode(file_path, max_frames=100):
+    """'d2' se tra i primi frame ce n'è uno con dei punti, altrimenti 'd3'.
+
+    Un frame DEBUG 2 senza punti è identico a un frame DEBUG 3, per questo si guardano più frame.
+    Per decidere durante la lettura principale del file si usa `peek_mode`."""
+    frames = frameValidation.iter_valid_frames(file_path, frameValidation.Quarantine(), strict=False)
+    return peek_mode(frames, max_frames)[0]
+
+def iter_split(frames, person_writer=None):
+    """Scrive le persone di ogni frame con `person_writer` (un `pointsPerson.PersonTrackWriter`) e passa
+    avanti (time, points) per le medie."""
+    for time, frame in frames:
+        if person_writer is not None:
+            person_writer.write(time, frame['frame'], frame['persons'])
+        yield time, frame['points']
+
+def process_file(input_file, averages_file=None, persons_file=None, quarantine=None, strict=False):
+    """Una sola lettura del log per il CSV delle medie dei punti e per quello delle persone (formato lungo).
+
+    Le medie usano solo i punti di TLV1: a differenza di `pointCloud.mappare`, i bytes del TLV2
+    non vengono letti come punti."""
+    with contextlib.ExitStack() as stack:
+        writer = None
+        if persons_file:
+            writer = stack.enter_context(pointsPerson.PersonTrackWriter(persons_file))
+        points = iter_split(iter_frames(input_file, quarantine, strict), writer)
+        if averages_file:
+            pointCloud.save_averages_to_csv(
+                pointCloud.iter_averages(pointCloud.iter_formatted(pointCloud.iter_stripped(points))), averages_file)
+        else:
+            for _ in points:
+                pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decodifica punti e persone di un log DEBUG 2/3 in una sola passata.")
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('--averages', default=None, help='Il file CSV con le medie dei punti per frame')
+    parser.add_argument('--persons', default=None, help='Il file CSV con una riga per persona')
+    parser.add_argument('--quarantine', default=None,
+                        help='Controlla LenFrame e PointL di ogni frame e scrive le linee scartate, con il motivo, in questo CSV')
+    args = parser.parse_args()
+
+    if not args.averages and not args.persons:
+        print(f"Modalità rilevata: {detect_mode(args.input_txt)}")
+    elif args.quarantine:
+        with frameValidation.Quarantine(args.quarantine) as quarantine:
+            process_file(args.input_txt, args.averages, args.persons, quarantine, strict=True)
+        print(quarantine.summary() or 'Nessuna linea scartata')
+    else:
+        process_file(args.input_txt, args.averages, args.persons)
@@ -0,0 +1,119 @@
+import csv
+
+import pointCloud
+import stageProfiler
+
+# Validazione veloce delle linee dei log SSCOM5 prima della decodifica: la lunghezza del frame viene
+# confrontata con LenFrame e PointL dell'header con pochi confronti tra interi, senza eccezioni né print
+# per linea. Le linee scartate vengono contate per motivo e, se richiesto, scritte in un file di
+# quarantena (numero di linea, motivo, testo originale) per poterle esaminare dopo.
+
+# Motivi di scarto
+NO_TIMESTAMP = 'no_timestamp'          # manca la ']' del timestamp
+NO_PAYLOAD = 'no_payload'              # nessun byte esadecimale valido dopo il timestamp
+SHORT_HEADER = 'short_header'          # meno dei 24 bytes dell'header (es. eco dei comandi AT)
+BAD_MAGIC = 'bad_magic'                # non inizia con 01 02 03 04 05 06 07 08
+BAD_LENGTH = 'bad_length'              # LenFrame minore dell'header o maggiore di MAX_FRAME_SIZE
+TRUNCATED = 'truncated'                # meno bytes di quelli dichiarati da LenFrame
+BAD_POINT_LENGTH = 'bad_point_length'  # PointL non multiplo di 25 o oltre la fine del frame
+
+FRAME_MAGIC = bytes(range(1, 9))
+MAX_FRAME_SIZE = 64 * 1024
+QUARANTINE_FIELDS = ['line', 'reason', 'text']
+
+def check_payload(payload, strict=True):
+    """Motivo di scarto del frame, None se è valido.
+
+    Senza `strict` si controlla solo la lunghezza minima dell'header, come i decoder storici."""
+    if len(payload) < pointCloud.HEADER_SIZE:
+        return SHORT_HEADER
+    if not strict:
+        return None
+    if payload[:8] != FRAME_MAGIC:
+        return BAD_MAGIC
+    length = int.from_bytes(payload[8:12], 'little')
+    if length < pointCloud.HEADER_SIZE or length > MAX_FRAME_SIZE:
+        return BAD_LENGTH
+    if len(payload) < length:
+        return TRUNCATED
+    point_length = int.from_bytes(payload[20:24], 'little')
+    if point_length % pointCloud.POINT_RECORD.size or pointCloud.HEADER_SIZE + point_length > length:
+        return BAD_POINT_LENGTH
+    return None
+
+def validate_line(line, strict=True):
+    """(motivo, time, payload) di una linea letta in binario; motivo None se il frame è valido."""
+    parsed = pointCloud.parse_raw_line(line)
+    if parsed is None:
+        return (NO_TIMESTAMP if b']' not in line else NO_PAYLOAD), None, None
+    time, _, payload = parsed
+    return check_payload(payload, strict), time, payload
+
+def summarize(counts):
+    """Riepilogo dei conteggi {motivo: linee} di una `Quarantine` (stringa vuota se non ci sono scarti)."""
+    total = sum(counts.values())
+    if not total:
+        return ''
+    details = ', '.join(f'{reason}: {count}' for reason, count in sorted(counts.items()))
+    return f'{total} linee scartate ({details})'
+
+class Quarantine:
+    """Linee scartate: contatori per motivo e, con `output_file`, le linee stesse in un CSV."""
+
+    def __init__(self, output_file=None):
+        self.counts = {}
+        self.file = open(output_file, 'w', newline='') if output_file else None
+        self.writer = None
+        if self.file:
+            self.writer = csv.writer(self.file, delimiter=';')
+            self.writer.writerow(QUARANTINE_FIELDS)
+
+    def reject(self, number, reason, line):
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        if self.writer:
+            self.writer.writerow([number, reason, line.rstrip(b'\r\n').decode('latin-1')])
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        """Una riga con il totale e i conteggi per motivo (stringa vuota se non ci sono scarti)."""
+        return summarize(self.counts)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_valid_lines(file_path, quarantine=None, strict=True, profiler=stageProfiler.NULL_PROFILER):
+    """Generatore di (line, time, payload) delle linee con un frame valido; le linee vuote vengono
+    ignorate, le altre linee scartate finiscono in `quarantine`.
+
+    Senza `quarantine` il riepilogo degli scarti viene stampato una volta sola alla fine."""
+    summary = quarantine is None
+    if summary:
+        quarantine = Quarantine()
+    with open(file_path, 'rb') as file:
+        for number, line in enumerate(profiler.wrap('read', file, size=len), 1):
+            if not line.strip():
+                continue
+            reason, time, payload = validate_line(line, strict)
+            if reason is None:
+                yield line, time, payload
+                continue
+            quarantine.reject(number, reason, line)
+            profiler.count('skipped_lines')
+    if summary and quarantine.total:
+        print(quarantine.summary())
+
+def iter_valid_frames(file_path, quarantine=None, strict=True, profiler=stageProfiler.NULL_PROFILER):
+    """Generatore di (time, payload) dei frame validi del file (vedi `iter_valid_lines`)."""
+    for _, time, payload in iter_valid_lines(file_path, quarantine, strict, profiler):
+        yield time, payload
@@ -0,0 +1,86 @@
+import importlib
+import os
+import sys
+
+# API importabile del progetto: decoder, medie e writer come funzioni su iterabili/bytes, da chiamare nello
+# stesso processo (es. da un servizio) invece di lanciare gli script. I moduli vengono importati solo al
+# primo accesso al nome, così `import ms72sf1` e la CLI non caricano NumPy o SciPy se non servono.
+# I moduli restano quelli nella radice del repository: la radice viene aggiunta al sys.path (come negli
+# script di scripts/), così il package funziona da qualsiasi cartella, anche tramite un link simbolico.
+
+# HOW to use this package > import ms72sf1; ms72sf1.save_averages_to_csv(ms72sf1.stream_averages('log.txt'), 'medie.csv')
+#                           python -m ms72sf1 <averages|persons|to-json|json-averages|...> --help
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# nome pubblico -> (modulo, attributo)
+_API = {
+    # decodifica dei frame
+    'parse_raw_line': ('pointCloud', 'parse_raw_line'),
+    'decode_points': ('pointCloud', 'decode_points'),
+    'decode_line': ('pointCloud', 'decode_line'),
+    'decode_file': ('pointCloud', 'decode_file'),
+    'time_to_seconds': ('pointCloud', 'time_to_seconds'),
+    'validate_line': ('frameValidation', 'validate_line'),
+    'iter_valid_frames': ('frameValidation', 'iter_valid_frames'),
+    'Quarantine': ('frameValidation', 'Quarantine'),
+    'parse_frame': ('frameParser', 'parse_frame'),
+    'parse_line': ('frameParser', 'parse_line'),
+    'iter_frames': ('frameParser', 'iter_frames'),
+    'detect_mode': ('frameParser', 'detect_mode'),
+    'decode_persons': ('pointsPerson', 'decode_persons'),
+    'iter_person_frames': ('pointsPerson', 'iter_person_frames'),
+    'iter_raw_frames': ('streamIngest', 'iter_raw_frames'),
+    'iter_stream': ('streamIngest', 'iter_stream'),
+    'CaptureIndex': ('captureIndex', 'CaptureIndex'),
+    'update_index': ('captureIndex', 'update_index'),
+    'iter_time_range': ('captureIndex', 'iter_time_range'),
+    'session_frames': ('sessionReplay', 'session_frames'),
+    'replay': ('sessionReplay', 'replay'),
+    'record': ('sessionReplay', 'record'),
+    # medie dei punti
+    'iter_stripped': ('pointCloud', 'iter_stripped'),
+    'iter_formatted': ('pointCloud', 'iter_formatted'),
+    'iter_averages': ('pointCloud', 'iter_averages'),
+    'stream_averages': ('pointCloud', 'stream_averages'),
+    'calculate_averages': ('pointCloud', 'calculate_averages'),
+    'load_capture': ('pointCloudNumpy', 'load_capture'),
+    'calculate_averages_numpy': ('pointCloudNumpy', 'calculate_averages'),
+    'average_columns': ('pointCloudNumpy', 'average_columns'),
+    'reduce_capture': ('pointReduction', 'reduce_capture'),
+    'reduction_report': ('pointReduction', 'reduction_report'),
+    # writer
+    'save_averages_to_csv': ('pointCloud', 'save_averages_to_csv'),
+    'write_averages': ('pointCloud', 'write_averages'),
+    'save_to_json': ('pointCloud', 'save_to_json'),
+    'open_writer': ('columnWriters', 'open_writer'),
+    'write_table': ('columnWriters', 'write_table'),
+    'process_txt_to_person_csv': ('pointsPerson', 'process_txt_to_person_csv'),
+    'save_person_tracks_csv': ('pointsPerson', 'save_person_tracks_csv'),
+    'PersonTrackWriter': ('pointsPerson', 'PersonTrackWriter'),
+    'process_file': ('frameParser', 'process_file'),
+    # analisi
+    'cluster_capture': ('clustering', 'cluster_capture'),
+    'cluster_frame': ('clustering', 'cluster_frame'),
+    'Tracker': ('tracker', 'Tracker'),
+    'WindowAggregator': ('slidingWindows', 'WindowAggregator'),
+    'Grid': ('occupancyHeatmap', 'Grid'),
+    'accumulate_files': ('occupancyHeatmap', 'accumulate_files'),
+    'FrameBus': ('frameBus', 'FrameBus'),
+    'run_batch': ('batchProcess', 'run_batch'),
+}
+
+__all__ = sorted(_API)
+
+def __getattr__(name):
+    if name not in _API:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _API[name]
+    value = getattr(importlib.import_module(module), attribute)
+    globals()[name] = value  # gli accessi successivi non passano più di qui
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_API))
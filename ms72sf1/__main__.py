@@ -0,0 +1,5 @@
+import sys
+
+from ms72sf1.cli import main
+
+sys.exit(main())
@@ -0,0 +1,95 @@
+import argparse
+import importlib
+import json
+import sys
+
+# Una sola riga di comando per gli script del progetto: `python -m ms72sf1 <comando> ...`.
+# Il modulo di un comando viene importato solo quando il comando viene scelto, quindi `--help` e i
+# comandi che non usano NumPy partono senza caricarlo.
+
+# HOW to use this script > python -m ms72sf1 averages <input.txt> <output.csv> [opzioni di pointCloud.py]
+#                          python -m ms72sf1 persons <input.txt> [d2|d3|auto] [opzioni di pointsPerson.py]
+#                          python -m ms72sf1 to-json <input.txt> <output.json>
+#                          python -m ms72sf1 json-averages <input.json> <output.csv>
+#                          python -m ms72sf1 index <build|time|frame> <input.txt> ...
+#                          python -m ms72sf1 reduce <input.txt> [--voxel 0.2] [--min-snr 5] [--step 2] ...
+#                          python -m ms72sf1 session <replay|record|convert> ...
+
+def to_json_arguments(parser):
+    parser.add_argument('input_file', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('output_file', type=str, help='Il file JSON di output con i bytes di ogni frame')
+
+def to_json(args):
+    """Ex scripts/debug2toJSON.py: frame DEBUG 2 con header e punti in esadecimale, in JSON."""
+    import pointCloud
+    pointCloud.save_to_json(pointCloud.process_file_binary(args.input_file), args.output_file)
+
+def json_averages_arguments(parser):
+    parser.add_argument('input_file', type=str, help='Il file JSON di input da elaborare (valori già convertiti)')
+    parser.add_argument('output_file', type=str, help='Il file CSV di output per salvare i risultati')
+
+def json_averages(args):
+    """Ex scripts/averagePointsCloud.py: medie x, y, z per time di un JSON già convertito."""
+    import pointCloud
+    try:
+        with open(args.input_file, 'r') as file:
+            data = json.load(file)
+    except json.JSONDecodeError as e:
+        print(f"Errore nella lettura del file JSON: {e}")
+        return
+    except FileNotFoundError as e:
+        print(f"File non trovato: {e}")
+        return
+    pointCloud.save_averages_to_csv(pointCloud.calculate_averages(data), args.output_file)
+
+# comando -> (modulo con add_arguments/run, descrizione); None = funzioni definite qui sopra
+COMMANDS = {
+    'averages': ('pointCloud', 'Medie delle coordinate dei punti per frame (ex pointCloud.py)'),
+    'persons': ('pointsPerson', 'Coordinate delle persone in CSV (ex pointsPerson.py e scripts/debug3-persons.py)'),
+    'to-json': (None, 'Frame DEBUG 2 in JSON (ex scripts/debug2toJSON.py)'),
+    'json-averages': (None, 'Medie dei punti da un JSON convertito (ex scripts/averagePointsCloud.py)'),
+    'index': ('captureIndex', 'Indice temporale dei file TXT e lettura di un intervallo di tempo'),
+    'reduce': ('pointReduction', 'Riduzione della nuvola di punti con report di compressione ed errore'),
+    'session': ('sessionReplay', 'Registrazione e replay temporizzato delle sessioni (come sessionReplay.py)'),
+}
+
+LOCAL_COMMANDS = {
+    'to-json': (to_json_arguments, to_json),
+    'json-averages': (json_averages_arguments, json_averages),
+}
+
+def usage():
+    lines = ['uso: python -m ms72sf1 <comando> [argomenti]', '', 'comandi:']
+    lines += [f'  {name:15s} {description}' for name, (_, description) in COMMANDS.items()]
+    lines += ['', "'python -m ms72sf1 <comando> --help' mostra gli argomenti di un comando."]
+    return '\n'.join(lines)
+
+def command_functions(name):
+    """(add_arguments, check_arguments, run) del comando, importando il suo modulo solo ora.
+
+    `check_arguments(parser, args)` è facoltativa: i moduli la definiscono per rifiutare le
+    combinazioni di opzioni non supportate."""
+    module, _ = COMMANDS[name]
+    if module is None:
+        add_arguments, run = LOCAL_COMMANDS[name]
+        return add_arguments, None, run
+    module = importlib.import_module(module)
+    return module.add_arguments, getattr(module, 'check_arguments', None), module.run
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    name = argv[0]
+    if name not in COMMANDS:
+        print(f"Comando sconosciuto: {name}\n\n{usage()}", file=sys.stderr)
+        return 2
+    add_arguments, check_arguments, run = command_functions(name)
+    parser = argparse.ArgumentParser(prog=f'python -m ms72sf1 {name}', description=COMMANDS[name][1])
+    add_arguments(parser)
+    args = parser.parse_args(argv[1:])
+    if check_arguments is not None:
+        check_arguments(parser, args)
+    run(args)
+    return 0
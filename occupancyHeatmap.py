@@ -0,0 +1,178 @@
+import argparse
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import pointCloudNumpy
+
+# Mappe di calore cumulative della stanza: quante volte punti e persone cadono in ogni cella di una griglia
+# 2D a risoluzione fissa, più il conteggio di ingressi e uscite delle persone da zone poligonali (letto,
+# porta, scrivania). Le zone vengono trasformate una volta sola in maschere sulla griglia, quindi sapere in
+# quali zone si trova una posizione costa un accesso a un array.
+
+# HOW to use this script > python occupancyHeatmap.py <output_prefix> <input1.txt> [input2.txt ...] [--zones zone.json] [--workers N]
+# zone.json: {"letto": [[x1, y1], [x2, y2], [x3, y3], ...], "porta": [xmin, ymin, xmax, ymax]}  (metri)
+# Vengono scritti <output_prefix>_heatmap.csv (una riga per cella) e <output_prefix>_zones.csv.
+
+DEFAULT_EXTENT = (-5.0, -5.0, 5.0, 5.0)  # xmin, ymin, xmax, ymax in metri
+DEFAULT_RESOLUTION = 0.1
+MAX_ZONES = 63  # una zona per bit di un int64
+
+class Grid:
+    """Griglia regolare sul piano x/y con le zone precompilate in una maschera di bit per cella."""
+
+    def __init__(self, extent=DEFAULT_EXTENT, resolution=DEFAULT_RESOLUTION, zones=None):
+        self.extent = tuple(float(value) for value in extent)
+        self.resolution = float(resolution)
+        xmin, ymin, xmax, ymax = self.extent
+        self.nx = int(np.ceil((xmax - xmin) / self.resolution))
+        self.ny = int(np.ceil((ymax - ymin) / self.resolution))
+        self.zones = dict(zones or {})
+        if len(self.zones) > MAX_ZONES:
+            raise ValueError(f"Troppe zone: {len(self.zones)} (massimo {MAX_ZONES})")
+        self.zone_bits = np.zeros(self.nx * self.ny, dtype=np.int64)
+        centers_x, centers_y = self.centers()
+        for bit, polygon in enumerate(self.zones.values()):
+            inside = point_in_polygon(centers_x, centers_y, polygon)
+            self.zone_bits[inside] |= np.int64(1) << bit
+
+    def centers(self):
+        """Coordinate dei centri delle celle, nell'ordine degli indici piatti (riga = y, colonna = x)."""
+        xmin, ymin, _, _ = self.extent
+        columns = xmin + (np.arange(self.nx) + 0.5) * self.resolution
+        rows = ymin + (np.arange(self.ny) + 0.5) * self.resolution
+        centers_x, centers_y = np.meshgrid(columns, rows)
+        return centers_x.ravel(), centers_y.ravel()
+
+    def cells(self, x, y):
+        """Indice piatto della cella di ogni posizione, -1 per le posizioni fuori dalla griglia o non finite."""
+        xmin, ymin, _, _ = self.extent
+        with np.errstate(invalid='ignore'):
+            column = np.floor((np.asarray(x, dtype=np.float64) - xmin) / self.resolution)
+            row = np.floor((np.asarray(y, dtype=np.float64) - ymin) / self.resolution)
+            inside = (column >= 0) & (column < self.nx) & (row >= 0) & (row < self.ny)
+        return np.where(inside, row * self.nx + column, -1).astype(np.int64)
+
+    def histogram(self, x, y):
+        cells = self.cells(x, y)
+        return np.bincount(cells[cells >= 0], minlength=self.nx * self.ny)
+
+    def zone_mask(self, x, y):
+        """Bit delle zone in cui cade ogni posizione (0 fuori dalla griglia)."""
+        cells = self.cells(x, y)
+        return np.where(cells >= 0, self.zone_bits[np.maximum(cells, 0)], 0)
+
+def point_in_polygon(x, y, polygon):
+    """Ray casting vettorizzato su tutte le posizioni, un lato del poligono alla volta."""
+    polygon = np.asarray(polygon, dtype=np.float64)
+    inside = np.zeros(len(x), dtype=bool)
+    for (x1, y1), (x2, y2) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            intersection = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (x < intersection)
+    return inside
+
+def load_zones(file_path=None):
+    """Zone poligonali {nome: [[x, y], ...]}; una lista di 4 numeri è un rettangolo come in slidingWindows."""
+    if file_path is None:
+        return {}
+    with open(file_path, 'r') as file:
+        zones = json.load(file)
+    polygons = {}
+    for name, shape in zones.items():
+        if len(shape) == 4 and all(isinstance(value, (int, float)) for value in shape):
+            xmin, ymin, xmax, ymax = shape
+            shape = [[xmin, ymin], [xmax, ymin], [xmax, ymax], [xmin, ymax]]
+        if len(shape) < 3:
+            raise ValueError(f"Zona non valida: {name} (servono almeno 3 vertici)")
+        polygons[name] = [[float(x), float(y)] for x, y in shape]
+    return polygons
+
+def empty_result(grid):
+    cells = grid.nx * grid.ny
+    return {'points': np.zeros(cells, dtype=np.int64), 'persons': np.zeros(cells, dtype=np.int64),
+            'entries': np.zeros(len(grid.zones), dtype=np.int64), 'exits': np.zeros(len(grid.zones), dtype=np.int64)}
+
+def zone_counts(bits, count):
+    """Numero di bit accesi per zona in un array di maschere."""
+    return np.array([np.count_nonzero(bits & (np.int64(1) << bit)) for bit in range(count)], dtype=np.int64)
+
+def accumulate_file(input_file, grid):
+    """Mappa di calore di punti e persone di un file, con ingressi e uscite dalle zone per ID persona.
+
+    Il file viene decodificato una volta sola (`pointCloudNumpy.decode_capture` con le persone) e le
+    mappe di calore si calcolano sulle colonne. Una persona che sparisce dal TLV2 mentre è in una zona
+    conta come uscita."""
+    result = empty_result(grid)
+    capture = pointCloudNumpy.decode_capture(input_file, point_length=True, persons=True)
+    points, persons = capture['points'], capture['persons']
+    result['points'] += grid.histogram(points['x'], points['y'])
+    result['persons'] += grid.histogram(persons['x'], persons['y'])
+
+    ids = persons['id'].tolist()
+    bits = grid.zone_mask(persons['x'], persons['y']).tolist()
+    offsets = capture['person_offsets'].tolist()
+    previous = {}
+    for start, end in zip(offsets, offsets[1:]):
+        current = dict(zip(ids[start:end], bits[start:end]))
+        before = np.array([previous.get(key, 0) for key in current], dtype=np.int64)
+        after = np.array(list(current.values()), dtype=np.int64)
+        gone = np.array([mask for key, mask in previous.items() if key not in current], dtype=np.int64)
+        result['entries'] += zone_counts(after & ~before, len(grid.zones))
+        result['exits'] += zone_counts(before & ~after, len(grid.zones)) + zone_counts(gone, len(grid.zones))
+        previous = current
+    return result
+
+def merge(results, grid):
+    total = empty_result(grid)
+    for result in results:
+        for key in total:
+            total[key] += result[key]
+    return total
+
+def accumulate_files(input_files, grid, workers=1):
+    """Mappa di calore complessiva di più file; con workers > 1 i file sono elaborati in parallelo."""
+    if workers <= 1:
+        return merge((accumulate_file(path, grid) for path in input_files), grid)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge(executor.map(accumulate_file, input_files, [grid] * len(input_files)), grid)
+
+def save_heatmap_csv(result, grid, output_file):
+    """Una riga per cella non vuota: centro della cella e conteggi."""
+    centers_x, centers_y = grid.centers()
+    occupied = np.flatnonzero((result['points'] > 0) | (result['persons'] > 0))
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(['x', 'y', 'points', 'persons'])
+        for cell in occupied.tolist():
+            writer.writerow([round(float(centers_x[cell]), 3), round(float(centers_y[cell]), 3),
+                             int(result['points'][cell]), int(result['persons'][cell])])
+
+def save_zones_csv(result, grid, output_file):
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(['zone', 'points', 'persons', 'entries', 'exits'])
+        for bit, name in enumerate(grid.zones):
+            inside = (grid.zone_bits & (np.int64(1) << bit)) != 0
+            writer.writerow([name, int(result['points'][inside].sum()), int(result['persons'][inside].sum()),
+                             int(result['entries'][bit]), int(result['exits'][bit])])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accumula le mappe di calore di punti e persone e conta ingressi e uscite dalle zone.")
+    parser.add_argument('output_prefix', type=str, help='Prefisso dei file CSV di output')
+    parser.add_argument('input_txt', nargs='+', help='Uno o più file TXT SSCOM5')
+    parser.add_argument('--zones', default=None, help='File JSON con le zone poligonali')
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION, help='Lato della cella in metri')
+    parser.add_argument('--extent', type=float, nargs=4, default=list(DEFAULT_EXTENT), metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'),
+                        help='Area coperta dalla griglia in metri')
+    parser.add_argument('--workers', type=int, default=1, help='Numero di processi per elaborare i file in parallelo')
+    args = parser.parse_args()
+
+    grid = Grid(args.extent, args.resolution, load_zones(args.zones))
+    result = accumulate_files(args.input_txt, grid, args.workers)
+    save_heatmap_csv(result, grid, f'{args.output_prefix}_heatmap.csv')
+    save_zones_csv(result, grid, f'{args.output_prefix}_zones.csv')
+    print(f"{int(result['points'].sum())} punti e {int(result['persons'].sum())} persone nella griglia {grid.nx} x {grid.ny}")
@@ -0,0 +1,53 @@
+import io
+import os
+from collections import deque
+
+# Parsing parallelo dei file SSCOM5: il file viene diviso in blocchi allineati all'inizio di una linea,
+# ogni blocco viene decodificato da un processo del pool e i risultati tornano nell'ordine del file
+# (che è anche l'ordine dei timestamp).
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+def chunk_ranges(file_path, chunk_size):
+    """Divide il file in intervalli di bytes [start, end) che iniziano e finiscono su un inizio linea."""
+    size = os.path.getsize(file_path)
+    ranges = []
+    with open(file_path, 'rb') as file:
+        start = 0
+        while start < size:
+            file.seek(min(start + chunk_size, size))
+            file.readline()  # completa la linea in cui è caduto il taglio
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def decode_range(file_path, start, end, decoder, encoding=None):
+    """Applica `decoder` a ogni linea del blocco e restituisce i risultati non None.
+
+    Con `encoding` le linee vengono passate come testo (newline universali, come `open(file, 'r')`),
+    altrimenti come bytes."""
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = io.BytesIO(file.read(end - start))
+    lines = io.TextIOWrapper(data, encoding=encoding) if encoding else data
+    return [result for result in map(decoder, lines) if result is not None]
+
+def map_lines(file_path, decoder, workers, encoding=None, chunk_size=None):
+    """Generatore dei risultati di `decoder` su tutte le linee del file, nell'ordine del file.
+
+    `decoder` deve essere una funzione definita a livello di modulo (serializzabile con pickle).
+    Al massimo `2 * workers` blocchi sono in memoria contemporaneamente."""
+    from concurrent.futures import ProcessPoolExecutor  # import costoso, serve solo con --workers > 1
+    if chunk_size is None:
+        chunk_size = os.path.getsize(file_path) // (workers * 4)
+        chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, end in chunk_ranges(file_path, chunk_size):
+            pending.append(executor.submit(decode_range, file_path, start, end, decoder, encoding))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -2,29 +2,36 @@ import struct
 import json
 import argparse
 import csv
+import re
 import os
+import textwrap
+import time as time_module
 
-#How to use the script : python pointCloud.py input.txt output.csv
+import columnWriters
+import parallelParse
+import stageProfiler
 
-# Funzioni di manipolazione del file TXT
+#How to use the script : python pointCloud.py input.txt output.csv [--dump-json intermediate.json] [--backend numpy] [--workers N] [--no-cache] [--follow] [--quarantine scarti.csv] [--format csv|parquet] [--precision N] [--profile] [--profile-json report.json]
+
+# Funzioni di manipolazione del file TXT (usate anche dal flusso storico di pointsPerson)
 def split_into_chunks(hex_string, chunk_size=1):
+    """Divide una stringa di bytes esadecimali separati da spazi in gruppi di `chunk_size` bytes."""
     bytes_list = hex_string.strip().split()
     return [' '.join(bytes_list[i:i+chunk_size]) for i in range(0, len(bytes_list), chunk_size)]
 
-def process_line(line):
-    try:
-        time = line[1:13]
-        hex_data = line.split(']')[1].strip()
-        chunks = split_into_chunks(hex_data, 1)
-
-        if len(chunks) < 24:
-            print(f"Linea troppo corta, viene skippata: {time}, Chunks: {chunks}")
-            return None
+def split_line(line, chunk_size=1):
+    """(time, chunks) di una linea del file TXT letta come testo: i bytes dopo ']' a gruppi di `chunk_size`."""
+    return line[1:13], split_into_chunks(line.split(']')[1], chunk_size)
 
-        return time, chunks
-    except Exception as e:
-        print(f"Errore durante l'elaborazione della linea: {line}. Errore: {e}")
+def process_line(line):
+    """(time, chunks da 1 byte) di una linea con almeno l'header del frame, None per le altre linee
+    (il motivo dello scarto lo registra `process_file`)."""
+    if ']' not in line:
         return None
+    time, chunks = split_line(line)
+    if len(chunks) < 24:
+        return None
+    return time, chunks
 
 def mappare(line):
     result = {}
@@ -69,22 +76,141 @@ def mappare(line):
         result['points'] = points
     return result if result else None
 
-def process_file(file_path):
+def process_file(file_path, quarantine=None):
+    """Linee del file TXT convertite con `mappare`. Le linee scartate finiscono in `quarantine`, con i
+    motivi di `frameValidation`; senza `quarantine` il riepilogo viene stampato una volta sola alla fine."""
+    import frameValidation  # frameValidation importa questo modulo
+    summary = quarantine is None
+    if summary:
+        quarantine = frameValidation.Quarantine()
     results = []
     with open(file_path, 'r') as file:
-        for line in file:
+        for number, line in enumerate(file, 1):
             if line.strip():
                 mapped_data = mappare(line)
                 if mapped_data:
                     results.append(mapped_data)
+                    continue
+                raw = line.encode('latin-1', 'replace')
+                quarantine.reject(number, frameValidation.validate_line(raw, strict=False)[0]
+                                  or frameValidation.SHORT_HEADER, raw)
+    if summary and quarantine.total:
+        print(quarantine.summary())
+    return results
+
+# Decoder binario: il payload esadecimale di ogni linea viene convertito in bytes una sola volta
+# e i record da 25 bytes dei punti vengono spacchettati direttamente in valori numerici.
+HEADER_SIZE = 24
+POINT_RECORD = struct.Struct('<fffBfff')  # x, y, z, v, SNR, POW, DPK
+POINT_FIELDS = ('x', 'y', 'z', 'v', 'SNR', 'POW', 'DPK')
+_HEX_START = re.compile(rb'[0-9A-Fa-f]{2}(?=\s|$)')
+
+def parse_raw_line(line):
+    """Estrae (time, prefisso, payload) da una linea SSCOM5 letta in modalità binaria.
+
+    Il prefisso è il testo di direzione (es. 'IN¡û¡ô') che precede il primo byte esadecimale."""
+    end = line.find(b']')
+    if end == -1:
+        return None
+    match = _HEX_START.search(line, end + 1)
+    if match is None:
+        return None
+    try:
+        payload = bytes.fromhex(line[match.start():].decode('ascii'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return line[1:13].decode('latin-1'), line[end + 1:match.start()].decode('latin-1'), payload
+
+def time_to_seconds(time):
+    """Secondi dalla mezzanotte di un timestamp SSCOM5 'HH:MM:SS.mmm'."""
+    hours, minutes, seconds = time.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+DAY_SECONDS = 24 * 3600
+
+def continuous_time(value, last, day=DAY_SECONDS):
+    """Tempo continuo di un'ora del giorno `value` che segue il tempo continuo `last` (None al primo frame).
+
+    Un salto indietro di più di mezza giornata è il passaggio della mezzanotte; un salto indietro più
+    piccolo (linee non in ordine) viene appiattito su `last`, così il tempo non torna mai indietro.
+    `day` è la durata del giorno nell'unità di `value` (secondi, o `sessionReplay.DAY_MS` per i ms)."""
+    if last is None:
+        return value
+    candidate = last // day * day + value
+    if candidate < last - day / 2:
+        candidate += day
+    return max(candidate, last)
+
+def decode_points(payload):
+    """Restituisce la lista di tuple (x, y, z, v, SNR, POW, DPK) contenute nel payload.
+
+    Come `mappare`, vengono letti tutti i record completi da 25 bytes dopo l'header: il controllo
+    su '02 00 00 00' di `mappare` confronta stringhe unite senza spazi e non scatta mai."""
+    count = (len(payload) - HEADER_SIZE) // POINT_RECORD.size
+    end = HEADER_SIZE + count * POINT_RECORD.size
+    return list(POINT_RECORD.iter_unpack(payload[HEADER_SIZE:end]))
+
+def decode_line(line):
+    """Decodifica una linea in (time, points) senza passare per le stringhe esadecimali."""
+    parsed = parse_raw_line(line)
+    if parsed is None:
+        return None
+    time, _, payload = parsed
+    if len(payload) < HEADER_SIZE:
+        return None
+    return time, decode_points(payload)
+
+def decode_file(file_path, profiler=stageProfiler.NULL_PROFILER, quarantine=None, strict=False):
+    """Generatore di (time, points) per tutte le linee valide di un file SSCOM5.
+
+    Le linee scartate vengono contate (vedi `frameValidation.iter_valid_frames`); con `strict` si
+    scartano anche i frame con LenFrame o PointL non coerenti con i bytes ricevuti."""
+    import frameValidation  # frameValidation importa questo modulo
+    for time, payload in frameValidation.iter_valid_frames(file_path, quarantine, strict, profiler):
+        yield time, decode_points(payload)
+
+def mapped_view(time, prefix, payload):
+    """Vista dizionario di un payload decodificato, identica all'output di `mappare`."""
+    chunks = [f'{byte:02X}' for byte in payload[:HEADER_SIZE]]
+    chunks[0] = prefix + chunks[0]
+    points = []
+    for counter, index in enumerate(range(HEADER_SIZE, len(payload) - POINT_RECORD.size + 1, POINT_RECORD.size), 1):
+        record = payload[index:index + POINT_RECORD.size].hex().upper()
+        points.append({
+            f'x{counter}': record[0:8],
+            f'y{counter}': record[8:16],
+            f'z{counter}': record[16:24],
+            f'v{counter}': record[24:26],
+            f'SNR{counter}': record[26:34],
+            f'POW{counter}': record[34:42],
+            f'DPK{counter}': record[42:50]
+        })
+    return {
+        'time': time,
+        'headers': chunks[:8],
+        'frame': chunks[8:12],
+        'TLV1': ''.join(chunks[16:20]),
+        'PointL': ''.join(chunks[20:24]),
+        'points': points
+    }
+
+def process_file_binary(file_path, quarantine=None):
+    """Come `process_file`, ma usa il decoder binario e legge il file in modalità binaria."""
+    import frameValidation
+    results = []
+    for line, time, payload in frameValidation.iter_valid_lines(file_path, quarantine, strict=False):
+        end = line.find(b']')
+        prefix = line[end + 1:_HEX_START.search(line, end + 1).start()].decode('latin-1')
+        results.append(mapped_view(time, prefix, payload))
     return results
 
 # Funzioni di manipolazione del JSON
 def function2(value):
+    """Float little-endian di 4 bytes esadecimali con 2 decimali; il valore resta com'è se non è convertibile."""
     try:
         float_value = struct.unpack('<f', bytes.fromhex(value))[0]
         return f"{float_value:.2f}"
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, struct.error):
         return value
 
 def transform_values(data):
@@ -156,14 +282,22 @@ def save_to_json(data, output_file):
     except Exception as e:
         print(f"Errore nella scrittura del file JSON: {e}")
 
-def save_averages_to_csv(averaged_data, output_file):
+AVERAGE_FIELDS = ['time', 'average_x', 'average_y', 'average_z']
+
+def write_averages(averaged_data, output_file, writer_format=None, precision=None):
+    """Scrive le righe delle medie a blocchi (vedi `columnWriters`) e restituisce il numero di righe;
+    il formato, CSV o Parquet, si ricava dall'estensione di `output_file` se non è indicato.
+
+    Gli errori di decodifica e di scrittura arrivano al chiamante."""
+    with columnWriters.open_writer(output_file, AVERAGE_FIELDS, writer_format, precision) as writer:
+        for columns in columnWriters.iter_column_blocks(averaged_data, AVERAGE_FIELDS):
+            writer.write(columns)
+    return writer.rows
+
+def save_averages_to_csv(averaged_data, output_file, writer_format=None, precision=None):
+    """Come `write_averages`, con il messaggio di esito stampato invece dell'eccezione."""
     try:
-        with open(output_file, 'w', newline='') as csvfile:
-            fieldnames = ['time', 'average_x', 'average_y', 'average_z']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=';')
-            writer.writeheader()
-            for row in averaged_data:
-                writer.writerow(row)
+        write_averages(averaged_data, output_file, writer_format, precision)
         print(f'Dati medi salvati in {output_file}')
     except Exception as e:
         print(f"Si è verificato un errore durante la scrittura del CSV: {e}")
@@ -199,20 +333,239 @@ def process_json_file(input_file, output_file):
     except Exception as e:
         print(f"Si è verificato un errore: {e}")
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Processa un file TXT, manipola i dati e salva in un file CSV con medie delle coordinate.")
+# Pipeline in streaming: una linea alla volta, senza file JSON intermedi.
+# Ogni stadio riceve e restituisce un iteratore di (time, points).
+def iter_stripped(frames):
+    """Tiene solo x, y, z di ogni punto (come `remove_fields`)."""
+    for time, points in frames:
+        yield time, [point[:3] for point in points]
+
+def iter_formatted(frames):
+    """Arrotonda le coordinate a stringhe con due decimali (come `transform_values`)."""
+    for time, points in frames:
+        yield time, [(f"{x:.2f}", f"{y:.2f}", f"{z:.2f}") for x, y, z in points]
+
+def entry_view(time, points):
+    """Entry JSON equivalente a quella prodotta da `process_json_file`."""
+    return {
+        'time': time,
+        'points': [{f'x{i}': x, f'y{i}': y, f'z{i}': z} for i, (x, y, z) in enumerate(points, 1)]
+    }
+
+def iter_json_dump(frames, output_file):
+    """Scrive le entry nel file JSON man mano che passano, con lo stesso formato di `save_to_json`."""
+    with open(output_file, 'w') as file:
+        file.write('[')
+        first = True
+        for time, points in frames:
+            file.write('\n' if first else ',\n')
+            file.write(textwrap.indent(json.dumps(entry_view(time, points), indent=4), '    '))
+            first = False
+            yield time, points
+        file.write(']' if first else '\n]')
+    print(f'Dati salvati in {output_file}')
+
+def iter_averages(frames):
+    """Calcola la media per frame con gli stessi filtri di `calculate_averages`."""
+    for time, points in frames:
+        total_x, total_y, total_z = 0.0, 0.0, 0.0
+        count = 0
+        for point in points:
+            x, y, z = (float(value) for value in point)
+            if -10 <= x <= 10 and -10 <= y <= 10 and -10 <= z <= 10:
+                total_x += x
+                total_y += y
+                total_z += z
+                count += 1
+        yield {
+            'time': time,
+            'average_x': round(total_x / count, 2) if count > 0 else None,
+            'average_y': round(total_y / count, 2) if count > 0 else None,
+            'average_z': round(total_z / count, 2) if count > 0 else None
+        }
+
+def stream_averages(file_path, json_file=None, workers=1, profiler=stageProfiler.NULL_PROFILER, quarantine=None, strict=False):
+    """Generatore delle righe CSV delle medie; se `json_file` è dato salva anche il JSON intermedio.
+
+    Con `workers > 1` le linee vengono decodificate in parallelo da un pool di processi
+    (nel profiling lettura e decodifica risultano allora un unico stadio). Con una `quarantine`
+    la decodifica resta sequenziale, perché le linee scartate vengono scritte nell'ordine del file."""
+    if workers > 1 and quarantine is None:
+        frames = profiler.wrap('decode', parallelParse.map_lines(file_path, decode_line, workers))
+    else:
+        frames = profiler.wrap('decode', decode_file(file_path, profiler, quarantine, strict), upstream='read')
+    frames = profiler.wrap('strip', iter_stripped(frames), upstream='decode')
+    frames = profiler.wrap('format', iter_formatted(frames), upstream='strip')
+    last = 'format'
+    if json_file:
+        frames = profiler.wrap('json_dump', iter_json_dump(frames, json_file), upstream=last)
+        last = 'json_dump'
+    return profiler.wrap('averages', iter_averages(frames), upstream=last)
+
+# Modalità follow: SSCOM5 continua ad aggiungere linee al file, quindi si decodificano solo le linee
+# nuove. L'offset dell'ultima linea completa viene salvato in un file accanto al CSV; una linea
+# ancora incompleta non viene consumata e verrà letta al giro successivo.
+def checkpoint_path(output_file):
+    return output_file + '.checkpoint.json'
+
+def load_checkpoint(input_file, output_file):
+    """Offset da cui riprendere; 0 se il checkpoint manca, è di un altro file o il file è stato troncato."""
+    try:
+        with open(checkpoint_path(output_file), 'r') as file:
+            checkpoint = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+    if checkpoint.get('input') != os.path.abspath(input_file) or not os.path.exists(output_file):
+        return 0
+    if os.path.getsize(input_file) < checkpoint.get('offset', 0):
+        return 0
+    return checkpoint['offset']
+
+def save_checkpoint(input_file, output_file, offset):
+    temporary = checkpoint_path(output_file) + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump({'input': os.path.abspath(input_file), 'offset': offset}, file)
+    os.replace(temporary, checkpoint_path(output_file))
+
+def iter_new_lines(file, position):
+    """Linee complete a partire da `position`; `position[0]` avanza solo dopo ogni linea terminata."""
+    for line in file:
+        if not line.endswith(b'\n'):
+            break
+        position[0] += len(line)
+        yield line
+
+def update_averages(input_file, output_file):
+    """Aggiunge al CSV le medie delle sole linee nuove del file; restituisce il numero di righe scritte."""
+    offset = load_checkpoint(input_file, output_file)
+    position = [offset]
+    written = 0
+    with open(input_file, 'rb') as infile, open(output_file, 'a' if offset else 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=AVERAGE_FIELDS, delimiter=';')
+        if not offset:
+            writer.writeheader()
+        infile.seek(offset)
+        lines = iter_new_lines(infile, position)
+        frames = (decoded for decoded in map(decode_line, lines) if decoded)
+        for row in iter_averages(iter_formatted(iter_stripped(frames))):
+            writer.writerow(row)
+            written += 1
+    save_checkpoint(input_file, output_file, position[0])
+    return written
+
+def follow_averages(input_file, output_file, interval=1.0):
+    """Aggiorna il CSV ogni `interval` secondi finché non viene interrotto (Ctrl+C)."""
+    try:
+        while True:
+            written = update_averages(input_file, output_file)
+            if written:
+                print(f'{written} nuove righe salvate in {output_file}')
+            time_module.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+CLI_DESCRIPTION = "Processa un file TXT, manipola i dati e salva in un file CSV con medie delle coordinate."
+
+def add_arguments(parser):
+    """Argomenti della riga di comando delle medie dei punti."""
     parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
     parser.add_argument('output_csv', type=str, help='Il file CSV di output per salvare i risultati finali')
+    parser.add_argument('--backend', choices=['python', 'numpy'], default=None,
+                        help="Backend per decodifica e medie: 'numpy' usa un array strutturato e operazioni vettoriali "
+                             "(default: la cache delle acquisizioni se NumPy è installato, altrimenti 'python')")
+    parser.add_argument('--dump-json', metavar='FILE', default=None,
+                        help='Salva anche il JSON intermedio (x, y, z arrotondati) nel file indicato')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Numero di processi per la decodifica parallela del file (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Non usare la cache delle acquisizioni decodificate (non usata anche con --backend o --workers)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Cartella della cache (default: $MS72SF1_CACHE_DIR o ~/.cache/ms72sf1)')
+    parser.add_argument('--follow', action='store_true',
+                        help='Segue il file mentre SSCOM5 lo scrive e aggiunge al CSV solo le righe nuove')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Secondi tra un controllo e il successivo in modalità --follow (default: 1)')
+    parser.add_argument('--quarantine', metavar='FILE', default=None,
+                        help='Controlla LenFrame e PointL di ogni frame e scrive le linee scartate, con il motivo, in questo CSV')
+    parser.add_argument('--format', choices=list(columnWriters.WRITERS), default=None,
+                        help="Formato dell'output: 'csv' o 'parquet' (richiede pyarrow); default dall'estensione del file")
+    parser.add_argument('--precision', type=int, default=None,
+                        help='Calcola le medie dalle coordinate non arrotondate e le scrive con N decimali (richiede NumPy)')
+    stageProfiler.add_arguments(parser)
 
-    args = parser.parse_args()
+def check_arguments(parser, args):
+    """Rifiuta con `parser.error` le combinazioni di opzioni che verrebbero ignorate."""
+    if args.follow:
+        for option, value in (('--quarantine', args.quarantine), ('--format', args.format),
+                              ('--precision', args.precision), ('--dump-json', args.dump_json)):
+            if value is not None:
+                parser.error(f'{option} non è supportata con --follow')
+    vectorized = '--precision' if args.precision is not None else '--backend numpy' if args.backend == 'numpy' else None
+    if vectorized and args.dump_json:
+        parser.error(f"--dump-json richiede il backend 'python' (non è supportata con {vectorized})")
+    if vectorized and args.workers > 1:
+        parser.error(f"--workers richiede il backend 'python' (non è supportata con {vectorized})")
+    if args.precision is not None and args.backend == 'python':
+        parser.error("--precision usa il backend NumPy (non è supportata con --backend python)")
+
+def run(args):
+    """Esegue il comando con gli argomenti di `add_arguments` (usato anche da `python -m ms72sf1 averages`)."""
+    profiler = stageProfiler.from_args(args)
+    quarantine = None
+    if args.quarantine and not args.follow:
+        import frameValidation
+        quarantine = frameValidation.Quarantine(args.quarantine)
+
+    precise = args.precision is not None and not args.follow
+    cache = None
+    # La cache sostituisce la decodifica: si usa solo se non è stato scelto un backend o più processi
+    if not args.follow and not args.no_cache and not args.dump_json and quarantine is None and not precise \
+            and args.backend is None and args.workers <= 1:
+        try:
+            import decodeCache
+            cache = decodeCache.DecodeCache(args.cache_dir)
+        except ImportError:
+            pass  # la cache richiede NumPy
 
-    json_intermediate_file = "intermediate.json"
-    processed_data = process_file(args.input_txt)
-    save_to_json(processed_data, json_intermediate_file)
+    if args.follow:
+        follow_averages(args.input_txt, args.output_csv, args.interval)
+    elif cache is not None:
+        import captureStore
+        with profiler.stage('cache'):
+            capture = cache.get_or_decode(args.input_txt)
+        averages = profiler.wrap('averages', captureStore.calculate_averages(capture))
+    elif args.backend == 'numpy' or precise:
+        import pointCloudNumpy
+        with profiler.stage('load_capture'):
+            times, offsets, points = pointCloudNumpy.load_capture(args.input_txt, quarantine=quarantine,
+                                                                  strict=quarantine is not None)
+        profiler.add('load_capture', items=len(times), size=os.path.getsize(args.input_txt))
+        with profiler.stage('averages'):
+            if precise:
+                averages = pointCloudNumpy.average_columns(times, offsets, points)
+            else:
+                averages = pointCloudNumpy.calculate_averages(times, offsets, points)
+        profiler.add('averages', items=len(times))
+    else:
+        averages = stream_averages(args.input_txt, args.dump_json, args.workers, profiler,
+                                   quarantine, strict=quarantine is not None)
 
-    if not check_if_json_is_empty(json_intermediate_file):
-        process_json_file(json_intermediate_file, json_intermediate_file)
-        with open(json_intermediate_file, 'r') as f:
-            transformed_data = json.load(f)
-        averaged_data = calculate_averages(transformed_data)
-        save_averages_to_csv(averaged_data, args.output_csv)
+    if not args.follow:
+        upstream = None if (args.backend == 'numpy' or precise) and cache is None else 'averages'
+        with profiler.stage('write_csv', upstream=upstream):
+            if precise:
+                columnWriters.write_table(averages, args.output_csv, AVERAGE_FIELDS, args.format, args.precision)
+                print(f'Dati medi salvati in {args.output_csv}')
+            else:
+                save_averages_to_csv(averages, args.output_csv, args.format)
+        if quarantine is not None:
+            quarantine.close()
+            print(quarantine.summary() or 'Nessuna linea scartata')
+        stageProfiler.finish(profiler, args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=CLI_DESCRIPTION)
+    add_arguments(parser)
+    args = parser.parse_args()
+    check_arguments(parser, args)
+    run(args)
@@ -0,0 +1,135 @@
+import numpy as np
+
+import frameValidation
+import pointCloud
+import pointsPerson
+
+# Backend NumPy per la nuvola di punti: un'intera acquisizione viene decodificata in un unico array
+# strutturato (25 bytes per punto, stesso layout del record radar) più gli offset dei frame.
+
+POINT_DTYPE = np.dtype([
+    ('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('v', 'u1'),
+    ('snr', '<f4'), ('pow', '<f4'), ('dpk', '<f4')
+])
+PERSON_DTYPE = np.dtype(pointsPerson.PERSON_DTYPE_FIELDS)
+
+def decode_capture(file_path, point_length=False, quarantine=None, strict=False, persons=False):
+    """Decodifica un file SSCOM5 in un dizionario di colonne: 'times', 'offsets' e 'points' (vedi
+    `load_capture`) e, con `persons=True`, anche 'frames' (CurrentFrame), 'person_offsets' e
+    'persons' (record del TLV2, come `pointsPerson.decode_persons_array`), cioè le colonne di
+    `captureStore`."""
+    times = []
+    counts = []
+    buffer = bytearray()
+    frames, person_counts, person_buffer = [], [], bytearray()
+    for time, payload in frameValidation.iter_valid_frames(file_path, quarantine, strict):
+        available = len(payload) - pointCloud.HEADER_SIZE
+        if point_length:
+            available = min(available, int.from_bytes(payload[20:24], 'little'))
+        count = available // POINT_DTYPE.itemsize
+        buffer += payload[pointCloud.HEADER_SIZE:pointCloud.HEADER_SIZE + count * POINT_DTYPE.itemsize]
+        times.append(time)
+        counts.append(count)
+        if persons:
+            start, end = pointsPerson.person_tlv_range(payload)
+            person_buffer += payload[start:end]
+            frames.append(int.from_bytes(payload[12:16], 'little'))
+            person_counts.append((end - start) // PERSON_DTYPE.itemsize)
+    capture = {
+        'times': np.array(times, dtype='U12'),
+        'offsets': counts_to_offsets(counts),
+        'points': np.frombuffer(bytes(buffer), dtype=POINT_DTYPE)
+    }
+    if persons:
+        capture['frames'] = np.array(frames, dtype=np.uint32)
+        capture['person_offsets'] = counts_to_offsets(person_counts)
+        capture['persons'] = np.frombuffer(bytes(person_buffer), dtype=PERSON_DTYPE)
+    return capture
+
+def load_capture(file_path, point_length=False, quarantine=None, strict=False):
+    """Decodifica un file SSCOM5 in (times, offsets, points).
+
+    `points[offsets[i]:offsets[i + 1]]` sono i punti del frame `i`, acquisito al tempo `times[i]`.
+    Con `point_length=True` i punti sono limitati a PointL, senza i bytes del TLV2 delle persone
+    (il default resta quello di `pointCloud.mappare`). `quarantine` e `strict` come in
+    `frameValidation.iter_valid_frames`."""
+    capture = decode_capture(file_path, point_length, quarantine, strict)
+    return capture['times'], capture['offsets'], capture['points']
+
+def counts_to_offsets(counts):
+    """Offset dei frame (`offsets[i]:offsets[i + 1]`) dal numero di elementi di ogni frame."""
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+def frame_index(offsets):
+    """Indice del frame di appartenenza per ogni punto."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+def segment_sum(values, offsets):
+    """Somma per frame con np.add.reduceat, con i frame vuoti a zero."""
+    if len(values) == 0:
+        return np.zeros(len(offsets) - 1, dtype=values.dtype)
+    starts = np.minimum(offsets[:-1], len(values) - 1)
+    sums = np.add.reduceat(values, starts)
+    sums[offsets[:-1] == offsets[1:]] = 0
+    return sums
+
+def round_like_format(values):
+    """Equivale a float(f"{v:.2f}") per ogni valore float32.
+
+    Il prodotto per 100 di un float32 convertito in float64 è esatto, quindi rint arrotonda
+    il valore esatto come fa la formattazione di stringa."""
+    with np.errstate(invalid='ignore'):
+        return np.rint(values.astype(np.float64) * 100) / 100
+
+def calculate_averages(times, offsets, points):
+    """Versione vettorizzata di `pointCloud.calculate_averages` con lo stesso output."""
+    coords = [round_like_format(points[axis]) for axis in ('x', 'y', 'z')]
+    mask = np.ones(len(points), dtype=bool)
+    for values in coords:
+        mask &= (values >= -10) & (values <= 10)
+    counts = segment_sum(mask.astype(np.int64), offsets)
+
+    # Le somme sono fatte nello stesso ordine sequenziale del ciclo Python, così la media arrotondata
+    # coincide al bit: i punti validi vengono raggruppati per posizione nel frame e sommati a colonne.
+    frames = frame_index(offsets)[mask]
+    ranks = np.arange(len(frames)) - np.repeat(np.cumsum(counts) - counts, counts)
+    order = np.argsort(ranks, kind='stable')
+    bounds = np.searchsorted(ranks[order], np.arange(counts.max(initial=0) + 1))
+    totals = []
+    for values in coords:
+        kept = values[mask][order]
+        frame_of = frames[order]
+        total = np.zeros(len(counts))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            total[frame_of[start:end]] += kept[start:end]
+        totals.append(total)
+
+    results = []
+    for i, time in enumerate(times.tolist()):
+        count = int(counts[i])
+        averages = [round(float(total[i]) / count, 2) if count > 0 else None for total in totals]
+        results.append({
+            'time': time,
+            'average_x': averages[0],
+            'average_y': averages[1],
+            'average_z': averages[2]
+        })
+    return results
+
+def average_columns(times, offsets, points):
+    """Medie per frame come colonne, senza arrotondamenti: coordinate float32 originali, stesso box
+    [-10, 10] di `calculate_averages`, NaN per i frame senza punti validi.
+
+    La precisione dell'output si sceglie poi nel writer (vedi `columnWriters`)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coords = [points[axis].astype(np.float64) for axis in ('x', 'y', 'z')]
+        mask = np.ones(len(points), dtype=bool)
+        for values in coords:
+            mask &= (values >= -10) & (values <= 10)  # NaN escluso dal confronto
+        counts = segment_sum(mask.astype(np.int64), offsets)
+        columns = {'time': times}
+        for key, values in zip(pointCloud.AVERAGE_FIELDS[1:], coords):
+            columns[key] = segment_sum(np.where(mask, values, 0.0), offsets) / counts
+    return columns
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import json
+
+import numpy as np
+
+import clustering
+import pointCloud
+import pointCloudNumpy
+
+# Riduzione della nuvola di punti per la conservazione a lungo termine, tra la decodifica e l'output:
+# decimazione temporale (un frame ogni N), filtro sui campi SNR e POW (che `remove_fields` scarta) e
+# downsampling a griglia di voxel in ogni frame (un punto per voxel occupato, nel centroide dei suoi punti).
+# Tutto lavora sugli array di `pointCloudNumpy.load_capture`, senza cicli per punto. Il report confronta
+# le medie per frame dei dati ridotti con quelle di `calculate_averages` sui dati completi.
+
+# HOW to use this script > python pointReduction.py <input.txt> [--voxel 0.2] [--min-snr 5] [--min-pow 20] [--step 2]
+#                          [--points-csv punti.csv] [--averages-csv medie.csv] [--report-json report.json]
+
+POINT_FIELDS = ['time', 'x', 'y', 'z', 'v', 'snr', 'pow', 'dpk']
+
+def select(offsets, points, mask):
+    """Tiene i punti con `mask` vera e ricalcola gli offset dei frame."""
+    counts = pointCloudNumpy.segment_sum(mask.astype(np.int64), offsets)
+    return pointCloudNumpy.counts_to_offsets(counts), points[mask]
+
+def decimate(offsets, points, step):
+    """Tiene un frame ogni `step`; restituisce (indici dei frame tenuti, offsets, points)."""
+    if step < 1:
+        raise ValueError(f"Passo di decimazione non valido: {step} (deve essere >= 1)")
+    kept = np.arange(0, len(offsets) - 1, step)
+    mask = pointCloudNumpy.frame_index(offsets) % step == 0
+    return kept, pointCloudNumpy.counts_to_offsets(np.diff(offsets)[kept]), points[mask]
+
+def signal_mask(points, min_snr=None, min_pow=None):
+    """Punti con SNR e potenza almeno pari alle soglie date (None = nessuna soglia)."""
+    mask = np.ones(len(points), dtype=bool)
+    if min_snr is not None:
+        mask &= points['snr'] >= min_snr
+    if min_pow is not None:
+        mask &= points['pow'] >= min_pow
+    return mask
+
+def voxel_grid(offsets, points, voxel):
+    """Un punto per ogni voxel di lato `voxel` occupato in un frame.
+
+    x, y, z e DPK sono le medie dei punti del voxel, SNR e POW i massimi. v è il byte grezzo del
+    record (non una velocità con segno confrontabile), quindi né il massimo né la media hanno senso:
+    si tiene il v del punto con SNR più alto del voxel. I punti devono avere coordinate finite
+    (vedi `clustering.valid_mask`)."""
+    if voxel <= 0:
+        raise ValueError(f"Lato del voxel non valido: {voxel} (deve essere > 0)")
+    frames = pointCloudNumpy.frame_index(offsets)
+    xyz = np.column_stack([points[axis].astype(np.float64) for axis in ('x', 'y', 'z')])
+    cells = np.floor(xyz / voxel).astype(np.int64)
+    groups, inverse, counts = np.unique(np.column_stack([frames, cells]), axis=0,
+                                        return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    reduced = np.zeros(len(groups), dtype=pointCloudNumpy.POINT_DTYPE)
+    for axis, column in zip(('x', 'y', 'z'), xyz.T):
+        reduced[axis] = np.bincount(inverse, weights=column, minlength=len(groups)) / counts
+    reduced['dpk'] = np.bincount(inverse, weights=points['dpk'], minlength=len(groups)) / counts
+    for field in ('snr', 'pow'):
+        reduced[field] = -np.inf
+        np.maximum.at(reduced[field], inverse, points[field])
+    # Ordinati per voxel e, nel voxel, per SNR: l'ultimo punto di ogni voxel è quello con SNR più alto
+    snr = np.nan_to_num(points['snr'].astype(np.float64), nan=-np.inf)
+    order = np.lexsort((snr, inverse))
+    reduced['v'] = points['v'][order[np.cumsum(counts) - 1]]
+    return pointCloudNumpy.counts_to_offsets(np.bincount(groups[:, 0], minlength=len(offsets) - 1)), reduced
+
+def reduce_capture(times, offsets, points, voxel=None, min_snr=None, min_pow=None, step=1):
+    """Applica decimazione, filtri e voxel grid; restituisce (times, offsets, points, kept) dove `kept`
+    sono gli indici dei frame originali rimasti.
+
+    I punti fuori dal box di `calculate_averages` (o non finiti) vengono sempre scartati: non entrano
+    comunque nelle medie."""
+    kept, offsets, points = decimate(offsets, points, step)
+    offsets, points = select(offsets, points, clustering.valid_mask(points) & signal_mask(points, min_snr, min_pow))
+    if voxel:
+        offsets, points = voxel_grid(offsets, points, voxel)
+    return times[kept], offsets, points, kept
+
+def average_array(averages):
+    """Medie di `calculate_averages` come array (frame, 3), con NaN dove il frame non ha punti validi."""
+    return np.array([[np.nan if row[key] is None else row[key] for key in pointCloud.AVERAGE_FIELDS[1:]]
+                     for row in averages], dtype=np.float64).reshape(-1, 3)
+
+def reduction_report(full, reduced, kept, full_averages=None, reduced_averages=None):
+    """Rapporto di compressione ed errore del centroide per frame rispetto ai dati completi.
+
+    `full` e `reduced` sono le terne (times, offsets, points). L'errore è la distanza euclidea tra
+    le medie arrotondate; `lost_frames` conta i frame tenuti che avevano una media e ora non più."""
+    if full_averages is None:
+        full_averages = pointCloudNumpy.calculate_averages(*full)
+    if reduced_averages is None:
+        reduced_averages = pointCloudNumpy.calculate_averages(*reduced)
+    expected = average_array(full_averages)[kept]
+    measured = average_array(reduced_averages)
+    both = ~np.isnan(expected).any(axis=1) & ~np.isnan(measured).any(axis=1)
+    errors = np.linalg.norm(expected[both] - measured[both], axis=1)
+    points, kept_points = len(full[2]), len(reduced[2])
+    record = pointCloudNumpy.POINT_DTYPE.itemsize
+    return {
+        'frames': len(full[0]),
+        'frames_kept': len(reduced[0]),
+        'points': points,
+        'points_kept': kept_points,
+        'bytes': points * record,
+        'bytes_kept': kept_points * record,
+        'compression_ratio': round(points / kept_points, 3) if kept_points else None,
+        'centroid_error_mean': round(float(errors.mean()), 4) if len(errors) else None,
+        'centroid_error_p95': round(float(np.percentile(errors, 95)), 4) if len(errors) else None,
+        'centroid_error_max': round(float(errors.max()), 4) if len(errors) else None,
+        'lost_frames': int((~np.isnan(expected).any(axis=1) & np.isnan(measured).any(axis=1)).sum())
+    }
+
+def save_points_csv(times, offsets, points, output_file):
+    """Un punto per riga, con i campi arrotondati a due decimali come nel resto del progetto."""
+    columns = [np.repeat(times, np.diff(offsets)).tolist()]
+    for field in POINT_FIELDS[1:]:
+        values = points[field]
+        columns.append(values.tolist() if field == 'v' else pointCloudNumpy.round_like_format(values).tolist())
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(POINT_FIELDS)
+        writer.writerows(zip(*columns))
+
+def add_arguments(parser):
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('--voxel', type=float, default=None, help='Lato dei voxel in metri (default: nessun voxel grid)')
+    parser.add_argument('--min-snr', type=float, default=None, help='SNR minimo dei punti')
+    parser.add_argument('--min-pow', type=float, default=None, help='Potenza (POW) minima dei punti')
+    parser.add_argument('--step', type=int, default=1, help='Tiene un frame ogni STEP (default: 1, tutti)')
+    parser.add_argument('--points-csv', default=None, help='Salva i punti ridotti in questo CSV')
+    parser.add_argument('--averages-csv', default=None, help='Salva le medie per frame dei punti ridotti in questo CSV')
+    parser.add_argument('--report-json', default=None, help='Salva il report della riduzione in JSON')
+
+def run(args):
+    full = pointCloudNumpy.load_capture(args.input_txt, point_length=True)
+    times, offsets, points, kept = reduce_capture(*full, args.voxel, args.min_snr, args.min_pow, args.step)
+    averages = pointCloudNumpy.calculate_averages(times, offsets, points)
+    report = reduction_report(full, (times, offsets, points), kept, reduced_averages=averages)
+    if args.points_csv:
+        save_points_csv(times, offsets, points, args.points_csv)
+    if args.averages_csv:
+        pointCloud.save_averages_to_csv(averages, args.averages_csv)
+    if args.report_json:
+        with open(args.report_json, 'w') as file:
+            json.dump(report, file, indent=4)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Riduce la nuvola di punti (decimazione, filtro SNR/POW, voxel grid) e misura l'errore sulle medie.")
+    add_arguments(parser)
+    run(parser.parse_args())
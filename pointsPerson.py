@@ -1,28 +1,39 @@
+import argparse
 import csv
+import functools
+import locale
 import struct
-import sys
-import re
 
+import columnWriters
+import frameValidation
+import parallelParse
+import pointCloud
+import stageProfiler
 
-# HOW to use this script > python pointsPerson.py <percorso_del_file_input.txt> <mode>
+# HOW to use this script > python pointsPerson.py <percorso_del_file_input.txt> [d2|d3|auto] [--workers N] [--output file.csv] [--format wide|long] [--no-cache] [--quarantine scarti.csv] [--precision N] [--profile]
 
-def split_into_chunks(hex_string, chunk_size=4):
-    """Splits a space-separated hex string into chunks of given size."""
-    bytes_list = hex_string.strip().split()
-    return [' '.join(bytes_list[i:i+chunk_size]) for i in range(0, len(bytes_list), chunk_size)]
+PERSON_FIELDS = ['ID', 'Q', 'X', 'Y', 'Z', 'Vx', 'Vy', 'Vz']
+MAX_PERSONS = 5
+COLUMNS_TO_REMOVE = {'FrameHeader1', 'FrameHeader2', 'LenFrame', 'CurrentFrame',
+                     'TLV1', 'AlwaysZero', 'Q'}
+TLV_HEADER = struct.Struct('<II')  # tipo, lunghezza
+PERSON_RECORD = struct.Struct('<IIffffff')  # ID, Q, X, Y, Z, Vx, Vy, Vz
+PERSON_DTYPE_FIELDS = [('id', '<u4'), ('q', '<u4'), ('x', '<f4'), ('y', '<f4'), ('z', '<f4'),
+                       ('vx', '<f4'), ('vy', '<f4'), ('vz', '<f4')]
+TLV_PERSONS = 2
+PERSON_TRACK_FIELDS = ['Time', 'Frame', 'NumPeople', 'ID', 'X', 'Y', 'Z', 'Vx', 'Vy', 'Vz']
+TRACK_PRECISION = 2  # decimali di default del formato 'long'
 
 def process_line(line):
-    """Processes a single line to extract time and hex data chunks."""
-    # Estrazione tempo
-    time = line[1:13]
-    
-    # Estrazione hex data
-    hex_data = line.split(']')[1].strip()
-    
-    # Split dati in 4 bytes
-    chunks = split_into_chunks(hex_data)
-    
-    return time, chunks
+    """Tempo e colonne da 4 bytes di una linea (vedi `pointCloud.split_line`)."""
+    return pointCloud.split_line(line, 4)
+
+def process_row(line):
+    """Riga CSV intermedia (time + chunks da 4 bytes) per una linea del file (None se manca il timestamp)."""
+    if ']' not in line:
+        return None
+    time, chunks = process_line(line)
+    return [time] + chunks
 
 def function1(value):
     """Funzione applicata alle colonne 'ID' per calcolare il numero di persone."""
@@ -37,14 +48,6 @@ def function1(value):
     except (ValueError, TypeError):
         return value
 
-def function2(value):
-    """Funzione applicata alle colonne 'Xn', 'Yn', 'Zn', 'Vxn', 'Vyn', 'Vzn'."""
-    try:
-        float_value = struct.unpack('<f', bytes.fromhex(value))[0]
-        return f"{float_value:.2f}"
-    except (ValueError, TypeError):
-        return value
-
 def function3(binary_str):
     """Converte una stringa binaria in un numero decimale."""
     try:
@@ -62,28 +65,46 @@ def remove_empty_lines(input_file, cleaned_file):
             if line.strip():
                 outfile.write(line)
 
-def process_txt_to_csv(input_file, intermediate_file, mode):
+@functools.lru_cache(maxsize=None)
+def intermediate_header(mode):
+    """Intestazione del CSV intermedio con le colonne da 4 bytes per la modalità d2 o d3."""
+    if mode == 'd2':
+        header = ['Time', 'TLV2', 'NumPeople']
+    else:  # mode == 'd3'
+        header = [
+            'Time', 'FrameHeader1', 'FrameHeader2', 'LenFrame', 'CurrentFrame',
+            'TLV1', 'AlwaysZero', 'TLV2', 'NumPeople'
+        ]
+    for i in range(1, MAX_PERSONS + 1):
+        header.extend(f'{field}{i}' for field in PERSON_FIELDS)
+    return tuple(header)
+
+def process_txt_to_csv(input_file, intermediate_file, mode, workers=1):
     with open(input_file, 'r') as infile, open(intermediate_file, 'w', newline='') as csvfile:
         csv_writer = csv.writer(csvfile, delimiter=';')
         
-        if mode == 'd2':
-            header = ['Time', 'TLV2', 'NumPeople']
-            for i in range(1, 6):  # Assumo di base al massimo 6 persone
-                header.extend([f'ID{i}', f'Q{i}', f'X{i}', f'Y{i}', f'Z{i}', f'Vx{i}', f'Vy{i}', f'Vz{i}'])
-        else:  # mode == 'd3'
-            header = [
-                'Time', 'FrameHeader1', 'FrameHeader2', 'LenFrame', 'CurrentFrame', 
-                'TLV1', 'AlwaysZero', 'TLV2', 'NumPeople'
-            ]
-            for i in range(1, 6):  # Assumo di base al massimo 6 persone
-                header.extend([f'ID{i}', f'Q{i}', f'X{i}', f'Y{i}', f'Z{i}', f'Vx{i}', f'Vy{i}', f'Vz{i}'])
-        
+        header = intermediate_header(mode)
         csv_writer.writerow(header)
         
-        for line in infile:
-            time, chunks = process_line(line)
-            row = [time] + chunks
-            csv_writer.writerow(row)
+        if workers > 1:
+            rows = parallelParse.map_lines(input_file, process_row, workers,
+                                           encoding=locale.getpreferredencoding(False))
+        else:
+            rows = map(process_row, infile)
+        for row in rows:
+            if row is not None:
+                csv_writer.writerow(row)
+
+def convert_field(field, value):
+    """Converte il valore di una colonna del CSV intermedio nel valore finale."""
+    if field.startswith('NumPeople'):
+        return function1(value)
+    elif field.startswith('ID'):
+        return function3(value)
+    elif field == 'TLV2':
+        return value[:2]
+    else:
+        return pointCloud.function2(value)
 
 def apply_functions_to_csv(input_file, output_file):
     with open(input_file, 'r') as infile:
@@ -92,22 +113,13 @@ def apply_functions_to_csv(input_file, output_file):
         fieldnames = reader.fieldnames
 
     non_empty_fieldnames = [field for field in fieldnames if any(row[field] for row in rows)]
-    columns_to_remove = {'FrameHeader1', 'FrameHeader2', 'LenFrame', 'CurrentFrame', 
-                         'TLV1', 'AlwaysZero', 'Q'}
-    final_fieldnames = [field for field in non_empty_fieldnames if field not in columns_to_remove]
+    final_fieldnames = [field for field in non_empty_fieldnames if field not in COLUMNS_TO_REMOVE]
 
     filtered_rows = [row for row in rows if row.get('ID1')]
 
     for row in filtered_rows:
         for field in final_fieldnames:
-            if field.startswith('NumPeople'):
-                row[field] = function1(row[field])
-            elif field.startswith('ID'):
-                row[field] = function3(row[field])
-            elif field == 'TLV2':
-                row[field] = row[field][:2]
-            else:
-                row[field] = function2(row[field])
+            row[field] = convert_field(field, row[field])
 
     with open(output_file, 'w', newline='') as outfile:
         writer = csv.DictWriter(outfile, fieldnames=final_fieldnames, delimiter=';')
@@ -116,41 +128,273 @@ def apply_functions_to_csv(input_file, output_file):
             filtered_row = {field: row.get(field, '') for field in final_fieldnames}
             writer.writerow(filtered_row)
 
+def tlv2_line(time, payload):
+    """Linea '[time] 02 00 00 00 ...' con i bytes del frame dal TLV2 delle persone in poi (None se manca).
+
+    Il TLV2 si trova saltando da un TLV all'altro con `frameParser.iter_tlvs`: cercare '02 00 00 00'
+    nel testo troverebbe anche un header con CurrentFrame o LenFrame uguale a 2."""
+    import frameParser
+    for tlv, start, _ in frameParser.iter_tlvs(payload):
+        if tlv == TLV_PERSONS:
+            return f"[{time}] {payload[start - TLV_HEADER.size:].hex(' ').upper()}\n"
+    return None
+
+def preprocess_line(line):
+    """Per il debug 2 tiene solo il timestamp e i bytes a partire dal TLV2 (None se mancano), vedi `tlv2_line`."""
+    parsed = pointCloud.parse_raw_line(line.encode('latin-1', 'replace'))
+    if parsed is None or len(parsed[2]) < pointCloud.HEADER_SIZE:
+        return None
+    return tlv2_line(parsed[0], parsed[2])
+
 def preprocess_file(input_file, output_file):
     """Processa il file in modo tale da prendere solo nel caso in cui abbiamo debug 2 i valori successvi a i byes 02 00 00 00."""
-    time_pattern = r'^\[(\d{2}:\d{2}:\d{2}\.\d{3})\]'
-    data_pattern = r'02 00 00 00'
-    
     with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
         for line in infile:
-            time_match = re.match(time_pattern, line)
-            if not time_match:
-                continue
-            
-            time_str = time_match.group(1)
-            data_start = line.find(data_pattern)
-            
-            if data_start == -1:
-                continue
-            
-            data_str = line[data_start:].strip()
-            outfile.write(f'[{time_str}] {data_str}\n')
+            preprocessed = preprocess_line(line)
+            if preprocessed:
+                outfile.write(preprocessed)
 
-if __name__ == "__main__":
-    input_txt_file = sys.argv[1]
-    mode = sys.argv[2]
-    intermediate_csv_file = 'output_chunks.csv'
-    output_csv_file = 'output_PointsPerson.csv'
-    cleaned_txt_file = 'cleaned_input.txt'
+# Pipeline in streaming: dal log grezzo al CSV finale in un solo passaggio, senza file temporanei.
+# Lo schema di output è fisso (MAX_PERSONS persone), quindi non serve leggere tutte le righe
+# per scoprire quali colonne sono vuote.
+@functools.lru_cache(maxsize=None)
+def output_fieldnames(mode):
+    """Colonne del CSV finale: quelle del CSV intermedio meno COLUMNS_TO_REMOVE."""
+    return tuple(field for field in intermediate_header(mode) if field not in COLUMNS_TO_REMOVE)
 
-    # Remove empty lines from the input file
-    remove_empty_lines(input_txt_file, cleaned_txt_file)
+def convert_line(line, mode):
+    """Converte una linea del log nella riga finale del CSV persone (None se non ci sono persone).
 
+    Le colonne delle persone assenti restano vuote."""
+    if ']' not in line:
+        return None
     if mode == 'd2':
-        preprocessed_txt_file = 'preprocessed_input.txt'
-        preprocess_file(cleaned_txt_file, preprocessed_txt_file)
-        process_txt_to_csv(preprocessed_txt_file, intermediate_csv_file, mode)
-    else:  # mode == 'd3'
-        process_txt_to_csv(cleaned_txt_file, intermediate_csv_file, mode)
+        line = preprocess_line(line)
+        if line is None:
+            return None
+    return convert_columns(line, mode)
+
+def convert_frame(line, time, payload, mode):
+    """Come `convert_line` per una linea già letta da `frameValidation.iter_valid_lines`, senza
+    decodificarla di nuovo per cercare il TLV2."""
+    if mode == 'd2':
+        line = tlv2_line(time, payload)
+        return None if line is None else convert_columns(line, mode)
+    return convert_columns(line.decode('latin-1'), mode)
+
+def convert_columns(line, mode):
+    """Riga finale da una linea già nel formato di `mode` (per il debug 2 quella di `preprocess_line`)."""
+    time, chunks = process_line(line)
+    values = dict(zip(intermediate_header(mode), [time] + chunks))
+    if not values.get('ID1'):
+        return None
+    return [convert_field(field, values[field]) if field in values else '' for field in output_fieldnames(mode)]
+
+def convert_checked_line(line, mode, strict=False):
+    """Come `convert_line`, ma prima controlla il frame con `frameValidation.validate_line`
+    (None per le linee non valide); usata dai processi della conversione parallela."""
+    if frameValidation.validate_line(line.encode('latin-1'), strict)[0] is not None:
+        return None
+    return convert_line(line, mode)
+
+def iter_kept(rows, profiler=stageProfiler.NULL_PROFILER):
+    """Salta le righe None (linee senza persone), contandole nel profiling."""
+    for row in rows:
+        if row:
+            yield row
+        else:
+            profiler.count('skipped_lines')
+
+def process_txt_to_person_csv(input_file, output_file, mode, workers=1, profiler=stageProfiler.NULL_PROFILER,
+                              quarantine=None, strict=False):
+    """Scrive il CSV finale delle persone leggendo il log una sola volta, riga per riga, e restituisce
+    la modalità usata.
+
+    Ogni linea viene prima controllata con `frameValidation`: le linee scartate vengono contate e, con
+    una `quarantine`, scritte nel suo file; `strict` come in `frameValidation.iter_valid_frames`. Con
+    una `quarantine` la conversione resta sequenziale, perché le linee scartate vengono scritte
+    nell'ordine del file. Con `mode` 'auto' la modalità si riconosce dai primi frame della stessa
+    lettura (`frameParser.peek_mode`); solo la conversione parallela legge prima l'inizio del file."""
+    import frameParser
+    with open(output_file, 'w', newline='') as outfile:
+        writer = csv.writer(outfile, delimiter=';')
+        if workers > 1 and quarantine is None:
+            if mode == 'auto':
+                mode = frameParser.detect_mode(input_file)
+            convert = functools.partial(convert_checked_line, mode=mode, strict=strict)
+            rows = profiler.wrap('convert', parallelParse.map_lines(input_file, convert, workers, encoding='latin-1'))
+        else:
+            lines = frameValidation.iter_valid_lines(input_file, quarantine, strict, profiler)
+            if mode == 'auto':
+                mode, lines = frameParser.peek_mode(lines)
+            rows = (convert_frame(line, time, payload, mode) for line, time, payload in lines)
+            rows = profiler.wrap('convert', iter_kept(rows, profiler), upstream='read')
+        writer.writerow(output_fieldnames(mode))
+        with profiler.stage('write_csv', upstream='convert'):
+            writer.writerows(rows)
+    return mode
+
+# Decoder tipizzato: il TLV2 viene letto direttamente dai bytes del frame, con un numero qualsiasi di persone.
+class Person:
+    """Una persona tracciata dal radar in un frame."""
+    __slots__ = ('id', 'q', 'x', 'y', 'z', 'vx', 'vy', 'vz')
+
+    def __init__(self, id, q, x, y, z, vx, vy, vz):
+        self.id = id
+        self.q = q
+        self.x = x
+        self.y = y
+        self.z = z
+        self.vx = vx
+        self.vy = vy
+        self.vz = vz
+
+    def __repr__(self):
+        return (f'Person(id={self.id}, q={self.q}, x={self.x:.2f}, y={self.y:.2f}, z={self.z:.2f}, '
+                f'vx={self.vx:.2f}, vy={self.vy:.2f}, vz={self.vz:.2f})')
+
+def person_tlv_range(payload):
+    """Restituisce (start, end) dei record persona nel frame, saltando i punti grazie a PointL."""
+    if len(payload) < pointCloud.HEADER_SIZE:
+        return 0, 0
+    point_length = int.from_bytes(payload[20:24], 'little')
+    offset = pointCloud.HEADER_SIZE + point_length
+    if offset + TLV_HEADER.size > len(payload):
+        return 0, 0
+    tlv, length = TLV_HEADER.unpack_from(payload, offset)
+    if tlv != TLV_PERSONS:
+        return 0, 0
+    start = offset + TLV_HEADER.size
+    count = min(length, len(payload) - start) // PERSON_RECORD.size
+    return start, start + count * PERSON_RECORD.size
+
+def decode_persons(payload):
+    """Lista di `Person` contenute in un frame binario (DEBUG 2 o DEBUG 3)."""
+    start, end = person_tlv_range(payload)
+    return [Person(*record) for record in PERSON_RECORD.iter_unpack(payload[start:end])]
+
+def decode_persons_array(payload):
+    """Come `decode_persons`, ma restituisce un array strutturato NumPy senza copiare i bytes."""
+    import numpy as np
+    dtype = np.dtype(PERSON_DTYPE_FIELDS)
+    start, end = person_tlv_range(payload)
+    return np.frombuffer(payload, dtype=dtype, count=(end - start) // dtype.itemsize, offset=start)
+
+def iter_person_frames(input_file, profiler=stageProfiler.NULL_PROFILER, quarantine=None, strict=False):
+    """Generatore di (time, frame, persons) per ogni linea del log SSCOM5, letto in modalità binaria.
+
+    `quarantine` e `strict` come in `frameValidation.iter_valid_frames`."""
+    for time, payload in frameValidation.iter_valid_frames(input_file, quarantine, strict, profiler):
+        yield time, int.from_bytes(payload[12:16], 'little'), decode_persons(payload)
+
+class PersonTrackWriter:
+    """Writer del formato lungo: una riga per persona, quindi nessun limite sul numero di persone.
+
+    Le righe vengono accumulate per colonne e scritte a blocchi (vedi `columnWriters`), in CSV o in
+    Parquet se `output_file` ha estensione .parquet; coordinate e velocità con `precision` decimali
+    (None = tutte le cifre)."""
+
+    def __init__(self, output_file, precision=TRACK_PRECISION):
+        self.writer = columnWriters.open_writer(output_file, PERSON_TRACK_FIELDS, precision=precision)
+        self.columns = {field: [] for field in PERSON_TRACK_FIELDS}
 
-    apply_functions_to_csv(intermediate_csv_file, output_csv_file)
+    def write(self, time, frame, persons):
+        """Aggiunge le persone di un frame."""
+        columns = self.columns
+        for person in persons:
+            for field, value in zip(PERSON_TRACK_FIELDS, (time, frame, len(persons), person.id, person.x, person.y,
+                                                          person.z, person.vx, person.vy, person.vz)):
+                columns[field].append(value)
+        if len(columns['Time']) >= columnWriters.BLOCK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.columns['Time']:
+            self.writer.write(self.columns)
+            self.columns = {field: [] for field in PERSON_TRACK_FIELDS}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def save_person_tracks_csv(frames, output_file, precision=TRACK_PRECISION):
+    """Scrive i (time, frame, persons) nel formato lungo con un `PersonTrackWriter`."""
+    with PersonTrackWriter(output_file, precision) as writer:
+        for time, frame, persons in frames:
+            writer.write(time, frame, persons)
+
+CLI_DESCRIPTION = "Estrae le coordinate delle persone da un file TXT SSCOM5 e le salva in CSV."
+
+def add_arguments(parser):
+    """Argomenti della riga di comando delle persone."""
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('mode', nargs='?', choices=['d2', 'd3', 'auto'], default='auto',
+                        help="Configurazione del radar: DEBUG 2, DEBUG 3 o 'auto' per riconoscerla dai frame (default)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Numero di processi per la decodifica parallela del file (solo formato 'wide', default: 1)")
+    parser.add_argument('--output', default='output_PointsPerson.csv', help='Il file CSV finale (default: output_PointsPerson.csv)')
+    parser.add_argument('--format', choices=['wide', 'long'], default='wide',
+                        help="'wide': una riga per frame (schema storico); 'long': una riga per persona con il decoder tipizzato")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Non usare la cache delle acquisizioni decodificate (solo formato 'long')")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Cartella della cache (solo formato 'long', default: $MS72SF1_CACHE_DIR o ~/.cache/ms72sf1)")
+    parser.add_argument('--quarantine', metavar='FILE', default=None,
+                        help='Controlla LenFrame e PointL di ogni frame e scrive le linee scartate, con il motivo, in questo CSV')
+    parser.add_argument('--precision', type=int, default=None,
+                        help=f"Decimali di coordinate e velocità (solo formato 'long', default: {TRACK_PRECISION})")
+    stageProfiler.add_arguments(parser)
+
+def check_arguments(parser, args):
+    """Rifiuta con `parser.error` le opzioni che il formato scelto ignorerebbe."""
+    if args.format == 'long' and args.workers > 1:
+        parser.error("--workers non è supportata con --format long")
+    if args.format == 'wide':
+        for option, value in (('--precision', args.precision), ('--no-cache', args.no_cache or None),
+                              ('--cache-dir', args.cache_dir)):
+            if value is not None:
+                parser.error(f"{option} non è supportata con --format wide (solo formato 'long')")
+
+def run(args):
+    """Esegue il comando con gli argomenti di `add_arguments` (usato anche da `python -m ms72sf1 persons`)."""
+    profiler = stageProfiler.from_args(args)
+    quarantine = frameValidation.Quarantine(args.quarantine) if args.quarantine else None
+    if args.format == 'long':
+        cache = None
+        if not args.no_cache and quarantine is None:
+            try:
+                import decodeCache
+                cache = decodeCache.DecodeCache(args.cache_dir)
+            except ImportError:
+                pass  # la cache richiede NumPy
+        if cache is not None:
+            import captureStore
+            with profiler.stage('cache'):
+                capture = cache.get_or_decode(args.input_txt)
+            frames = profiler.wrap('decode', captureStore.iter_person_frames(capture))
+        else:
+            frames = profiler.wrap('decode', iter_person_frames(args.input_txt, profiler, quarantine,
+                                                                strict=quarantine is not None), upstream='read')
+        with profiler.stage('write_csv', upstream='decode'):
+            save_person_tracks_csv(frames, args.output,
+                                   TRACK_PRECISION if args.precision is None else args.precision)
+    else:
+        process_txt_to_person_csv(args.input_txt, args.output, args.mode, args.workers, profiler, quarantine,
+                                  strict=quarantine is not None)
+    if quarantine is not None:
+        quarantine.close()
+        print(quarantine.summary() or 'Nessuna linea scartata')
+    stageProfiler.finish(profiler, args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=CLI_DESCRIPTION)
+    add_arguments(parser)
+    args = parser.parse_args()
+    check_arguments(parser, args)
+    run(args)
@@ -0,0 +1,226 @@
+import argparse
+import contextlib
+import os
+import socket
+import struct
+import sys
+import time as clock
+from datetime import datetime
+
+import pointCloud
+import streamIngest
+
+# Registrazione e riproduzione delle sessioni radar. Il registratore salva i frame binari così come arrivano
+# dal radar, con il loro timestamp, in un file compatto (circa un terzo del TXT esadecimale di SSCOM5).
+# Il replay legge un log TXT o una registrazione e rimette i frame in onda ai tempi dei timestamp
+# [HH:MM:SS.mmm]: a velocità reale, accelerata (--speed 10, 100) o il più veloce possibile (--speed 0).
+# Ogni frame ha un istante di uscita assoluto calcolato sull'orologio monotono dall'inizio del replay,
+# quindi i ritardi di un frame non si sommano ai successivi e non c'è deriva anche su ore di dati.
+
+# HOW to use this script > python sessionReplay.py replay <log.txt|sessione.rec> [--speed 1] [--listen 9000 | --pipe percorso|-]
+#                          python sessionReplay.py record <serial|tcp|pipe> <indirizzo> <sessione.rec> [--baudrate 115200]
+#                          python sessionReplay.py convert <log.txt> <sessione.rec>
+
+# File di registrazione: FILE_MAGIC, poi per ogni frame millisecondi dalla mezzanotte, lunghezza e bytes del frame
+FILE_MAGIC = b'MS72REC1'
+RECORD = struct.Struct('<II')
+DAY_MS = 24 * 3600 * 1000
+
+def time_to_ms(time):
+    return round(pointCloud.time_to_seconds(time) * 1000)
+
+def ms_to_time(milliseconds):
+    seconds, millis = divmod(milliseconds % DAY_MS, 1000)
+    return f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{millis:03d}'
+
+# Sorgenti: generatori di (time, payload)
+def is_recording(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+def recording_frames(file_path):
+    """Generatore di (time, payload) di una registrazione; un ultimo frame troncato (registrazione
+    interrotta) viene ignorato."""
+    with open(file_path, 'rb') as file:
+        if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{file_path} non è una registrazione MS72SF1")
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            milliseconds, length = RECORD.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+            yield ms_to_time(milliseconds), payload
+
+def session_frames(file_path):
+    """(time, payload) da una registrazione o da un log TXT SSCOM5, riconosciuti dai primi bytes."""
+    if is_recording(file_path):
+        return recording_frames(file_path)
+    return streamIngest.log_frames(file_path)
+
+# Registratore
+def record(frames, output_file, flush=False):
+    """Scrive i (time, payload) in una registrazione e restituisce il numero di frame.
+
+    Con `flush` ogni frame arriva subito su disco (registrazione dal vivo)."""
+    count = 0
+    with open(output_file, 'wb') as file:
+        file.write(FILE_MAGIC)
+        for time, payload in frames:
+            file.write(RECORD.pack(time_to_ms(time), len(payload)))
+            file.write(payload)
+            if flush:
+                file.flush()
+            count += 1
+    return count
+
+def live_frames(read):
+    """(time, payload) dei frame letti da uno stream, con l'ora di arrivo come timestamp."""
+    for payload in streamIngest.iter_raw_frames(read):
+        yield datetime.now().strftime('%H:%M:%S.%f')[:12], payload
+
+# Replay
+class Schedule:
+    """Rilascia i frame agli istanti dei loro timestamp divisi per `speed` (0 = senza attese).
+
+    Il passaggio della mezzanotte è riconosciuto da `pointCloud.continuous_time`. `max_lag` è il ritardo
+    massimo di uscita rispetto all'istante previsto; `skipped` i frame scartati dal consumatore;
+    `closed` indica che il consumatore ha chiuso la connessione o la pipe prima della fine."""
+
+    def __init__(self, speed=1.0, sleep=clock.sleep, monotonic=clock.monotonic):
+        if speed < 0:
+            raise ValueError(f"Velocità non valida: {speed} (deve essere >= 0)")
+        self.speed = speed
+        self.sleep = sleep
+        self.monotonic = monotonic
+        self.frames = 0
+        self.max_lag = 0.0
+        self.session_seconds = 0.0
+        self.skipped = 0
+        self.closed = False
+
+    def __call__(self, frames):
+        start = None
+        first_ms = None
+        last_ms = None
+        for time, payload in frames:
+            last_ms = pointCloud.continuous_time(time_to_ms(time), last_ms, DAY_MS)
+            if first_ms is None:
+                first_ms = last_ms
+            elapsed_ms = last_ms - first_ms
+            if self.speed:
+                if start is None:
+                    start = self.monotonic()
+                target = start + elapsed_ms / 1000 / self.speed
+                delay = target - self.monotonic()
+                if delay > 0:
+                    self.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            self.frames += 1
+            self.session_seconds = elapsed_ms / 1000
+            yield time, payload
+
+def replay(file_path, speed=1.0):
+    """Iteratore in-process dei frame decodificati (vedi `streamIngest.decode_frame`) ai tempi della sessione."""
+    for time, payload in Schedule(speed)(session_frames(file_path)):
+        yield streamIngest.decode_frame(payload, time)
+
+def replay_to(file_path, write, speed=1.0):
+    """Scrive i frame binari con `write(bytes)` ai tempi della sessione e restituisce lo Schedule (metriche).
+
+    I frame troncati (più corti di LenFrame) vengono saltati: in uno stream senza separatori di linea
+    il lettore prenderebbe i bytes del frame successivo per completarli. Se il consumatore chiude
+    la connessione o la pipe il replay si ferma senza errori."""
+    schedule = Schedule(speed)
+    try:
+        for _, payload in schedule(session_frames(file_path)):
+            if int.from_bytes(payload[8:12], 'little') > len(payload):
+                schedule.skipped += 1
+                continue
+            write(payload)
+    except (BrokenPipeError, ConnectionResetError):
+        schedule.closed = True
+        schedule.frames -= 1  # il frame della write fallita non è stato inviato
+    return schedule
+
+def serve(file_path, port, speed=1.0):
+    """Accetta una connessione TCP su `port` e le invia la sessione (es. per `streamIngest.py tcp`)."""
+    with socket.create_server(('', port)) as server:
+        connection, _ = server.accept()
+        with connection:
+            return replay_to(file_path, connection.sendall, speed)
+
+def to_pipe(file_path, path, speed=1.0):
+    """Scrive la sessione in una pipe (o su stdout con '-'), un frame alla volta."""
+    pipe = sys.stdout.buffer if path == '-' else open(path, 'wb')
+    try:
+        def write(payload):
+            pipe.write(payload)
+            pipe.flush()
+        schedule = replay_to(file_path, write, speed)
+    finally:
+        if pipe is not sys.stdout.buffer:
+            with contextlib.suppress(BrokenPipeError):
+                pipe.close()
+    if schedule.closed and pipe is sys.stdout.buffer:
+        # stdout è chiuso: lo si redirige su devnull così il flush all'uscita non dà errori
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return schedule
+
+def print_metrics(schedule):
+    closed = ', consumatore chiuso prima della fine' if schedule.closed else ''
+    print(f"{schedule.frames - schedule.skipped} frame inviati ({schedule.skipped} troncati saltati{closed}), "
+          f"ritardo massimo {schedule.max_lag * 1000:.1f} ms", file=sys.stderr)
+
+def add_arguments(parser):
+    commands = parser.add_subparsers(dest='command', required=True)
+    play = commands.add_parser('replay', help='Riproduce un log TXT o una registrazione')
+    play.add_argument('input_file', help='Log TXT SSCOM5 o registrazione .rec')
+    play.add_argument('--speed', type=float, default=1.0,
+                      help='Fattore di velocità: 1 = tempo reale, 10, 100..., 0 = il più veloce possibile')
+    output = play.add_mutually_exclusive_group()
+    output.add_argument('--listen', type=int, default=None, help='Invia i frame binari al primo client TCP su questa porta')
+    output.add_argument('--pipe', default=None, help="Scrive i frame binari in questa pipe ('-' per stdout)")
+    rec = commands.add_parser('record', help='Registra uno stream dal vivo')
+    rec.add_argument('source', choices=['serial', 'tcp', 'pipe'], help='Tipo di sorgente')
+    rec.add_argument('address', help="Porta seriale, host:porta o percorso della pipe ('-' per stdin)")
+    rec.add_argument('output_file', help='La registrazione da scrivere')
+    rec.add_argument('--baudrate', type=int, default=streamIngest.BAUDRATE, help='Baud rate della porta seriale (default: 115200)')
+    convert = commands.add_parser('convert', help='Converte un log TXT SSCOM5 in registrazione')
+    convert.add_argument('input_file', help='Il log TXT SSCOM5')
+    convert.add_argument('output_file', help='La registrazione da scrivere')
+
+def run(args):
+    if args.command == 'convert':
+        count = record(streamIngest.log_frames(args.input_file), args.output_file)
+        print(f"{count} frame salvati in {args.output_file} ({os.path.getsize(args.output_file) / 1e6:.2f} MB, "
+              f"TXT: {os.path.getsize(args.input_file) / 1e6:.2f} MB)")
+    elif args.command == 'record':
+        if args.source == 'serial':
+            read = streamIngest.open_serial(args.address, args.baudrate)
+        elif args.source == 'tcp':
+            read = streamIngest.open_tcp(args.address)
+        else:
+            read = streamIngest.open_pipe(args.address)
+        try:
+            record(live_frames(read), args.output_file, flush=True)
+        except KeyboardInterrupt:
+            pass
+    elif args.listen is not None:
+        schedule = serve(args.input_file, args.listen, args.speed)
+        print_metrics(schedule)
+    elif args.pipe is not None:
+        schedule = to_pipe(args.input_file, args.pipe, args.speed)
+        print_metrics(schedule)
+    else:
+        for frame in replay(args.input_file, args.speed):
+            print(f"{frame['time']} frame {frame['frame']}: {len(frame['points'])} punti, "
+                  f"{len(frame['persons'])} persone", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registra e riproduce sessioni del radar MS72SF1 ai tempi dei timestamp.")
+    add_arguments(parser)
+    run(parser.parse_args())
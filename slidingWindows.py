@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import csv
+import json
+
+import numpy as np
+
+import pointCloud
+
+# Statistiche su finestre scorrevoli (es. 1 s, 10 s, 1 min) per zona: occupazione media, posizione media,
+# velocità media e tempo di permanenza. Ogni finestra è un buffer circolare con le somme correnti: a ogni
+# frame si aggiunge il contributo del frame e si tolgono quelli usciti dalla finestra, senza ricalcolare.
+
+# HOW to use this script > python slidingWindows.py <input.txt> <finestre.csv> [--windows 1 10 60] [--zones zone.json]
+# zone.json: {"letto": [xmin, ymin, xmax, ymax], "porta": [...]}  (metri, coordinate del radar)
+
+DEFAULT_WINDOWS = (1.0, 10.0, 60.0)
+ROOM = 'stanza'  # zona di default: tutto il campo visivo
+MAX_FRAME_GAP = 1.0  # un frame non conta per più di un secondo di permanenza (es. dopo una pausa del log)
+INITIAL_CAPACITY = 64
+
+# Colonne del contributo di un frame per zona
+FRAMES, PERSONS, SUM_X, SUM_Y, SUM_Z, SUM_SPEED, DWELL = range(7)
+WINDOW_FIELDS = ['time', 'window', 'zone', 'frames', 'occupancy', 'x', 'y', 'z', 'speed', 'dwell']
+
+def load_zones(file_path=None):
+    """Zone rettangolari {nome: (xmin, ymin, xmax, ymax)}; senza file c'è solo la stanza intera."""
+    if file_path is None:
+        return {ROOM: (-np.inf, -np.inf, np.inf, np.inf)}
+    with open(file_path, 'r') as file:
+        zones = json.load(file)
+    for name, bounds in zones.items():
+        if len(bounds) != 4:
+            raise ValueError(f"Zona non valida: {name} (attesi xmin, ymin, xmax, ymax)")
+    return {name: tuple(float(value) for value in bounds) for name, bounds in zones.items()}
+
+class RingWindow:
+    """Finestra temporale su un buffer circolare di contributi (zone x colonne) con le somme correnti."""
+
+    def __init__(self, duration, shape):
+        if duration <= 0:
+            raise ValueError(f"Durata della finestra non valida: {duration} (deve essere > 0)")
+        self.duration = duration
+        self.times = np.zeros(INITIAL_CAPACITY)
+        self.values = np.zeros((INITIAL_CAPACITY,) + shape)
+        self.sums = np.zeros(shape)
+        self.start = 0
+        self.size = 0
+
+    def _grow(self):
+        """Raddoppia la capacità quando la finestra contiene più frame del previsto (raro)."""
+        order = (self.start + np.arange(self.size)) % len(self.times)
+        self.times = np.concatenate([self.times[order], np.zeros(len(self.times))])
+        self.values = np.concatenate([self.values[order], np.zeros_like(self.values)])
+        self.start = 0
+
+    def push(self, seconds, contribution):
+        if self.size == len(self.times):
+            self._grow()
+        end = (self.start + self.size) % len(self.times)
+        self.times[end] = seconds
+        self.values[end] = contribution
+        self.sums += contribution
+        self.size += 1
+        while self.size and self.times[self.start] <= seconds - self.duration:
+            self.sums -= self.values[self.start]
+            self.start = (self.start + 1) % len(self.times)
+            self.size -= 1
+
+    def clipped(self, column, seconds):
+        """Somme di una colonna di durate (ognuna termina all'istante del suo frame) senza la parte
+        che cade prima dell'inizio della finestra: solo il frame più vecchio può sporgere."""
+        if not self.size:
+            return self.sums[:, column]
+        oldest = self.values[self.start, :, column]
+        excess = np.maximum(oldest - (self.times[self.start] - (seconds - self.duration)), 0.0)
+        return self.sums[:, column] - excess
+
+class WindowAggregator:
+    """Aggiorna tutte le finestre con un frame alla volta e restituisce le righe delle statistiche."""
+
+    def __init__(self, windows=DEFAULT_WINDOWS, zones=None):
+        self.zones = zones or load_zones()
+        self.names = list(self.zones)
+        bounds = np.array([self.zones[name] for name in self.names], dtype=np.float64)
+        self.low = bounds[:, :2]
+        self.high = bounds[:, 2:]
+        self.windows = [RingWindow(float(duration), (len(self.names), 7)) for duration in windows]
+        self.last_seconds = None
+
+    def _seconds(self, time):
+        """Secondi continui dall'inizio dell'acquisizione, anche dopo la mezzanotte."""
+        return pointCloud.continuous_time(pointCloud.time_to_seconds(time), self.last_seconds)
+
+    def contribution(self, detections, elapsed):
+        """Contributo di un frame: per ogni zona numero di persone, somme di posizione e velocità,
+        e la durata del frame se la zona è occupata."""
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6) if len(detections) else np.zeros((0, 6))
+        xy = detections[:, :2]
+        inside = ((xy[None] >= self.low[:, None]) & (xy[None] < self.high[:, None])).all(axis=2)
+        speed = np.sqrt((detections[:, 3:] ** 2).sum(axis=1))
+        values = np.zeros((len(self.names), 7))
+        values[:, FRAMES] = 1
+        values[:, PERSONS] = inside.sum(axis=1)
+        values[:, SUM_X:SUM_Z + 1] = inside @ detections[:, :3]
+        values[:, SUM_SPEED] = inside @ speed
+        values[:, DWELL] = np.where(values[:, PERSONS] > 0, elapsed, 0.0)
+        return values
+
+    def update(self, time, detections):
+        """Aggiunge un frame con le rilevazioni (x, y, z, vx, vy, vz) e restituisce una riga per finestra e zona."""
+        seconds = self._seconds(time)
+        elapsed = 0.0 if self.last_seconds is None else min(seconds - self.last_seconds, MAX_FRAME_GAP)
+        self.last_seconds = seconds
+        values = self.contribution(detections, elapsed)
+        rows = []
+        for window in self.windows:
+            window.push(seconds, values)
+            dwell = window.clipped(DWELL, seconds).tolist()
+            for name, sums, zone_dwell in zip(self.names, window.sums.tolist(), dwell):
+                persons = sums[PERSONS]
+                means = [round(sums[column] / persons, 2) if persons > 0 else None
+                         for column in (SUM_X, SUM_Y, SUM_Z, SUM_SPEED)]
+                rows.append(dict(zip(WINDOW_FIELDS, [
+                    time, f'{window.duration:g}s', name, round(sums[FRAMES]),
+                    round(persons / sums[FRAMES], 2), *means, round(zone_dwell, 3)])))
+        return rows
+
+def iter_window_rows(frames, aggregator, every=0.0):
+    """Righe per ogni frame (time, detections); con `every` > 0 al massimo una volta ogni `every` secondi."""
+    last = None
+    for time, detections in frames:
+        rows = aggregator.update(time, detections)
+        if every and last is not None and aggregator.last_seconds - last < every:
+            continue
+        last = aggregator.last_seconds
+        yield from rows
+
+def person_frames(input_file):
+    """Generatore di (time, detections) dalle persone del TLV2."""
+    import pointsPerson
+    for time, _, persons in pointsPerson.iter_person_frames(input_file):
+        yield time, [(p.x, p.y, p.z, p.vx, p.vy, p.vz) for p in persons]
+
+def save_windows_to_csv(rows, output_file):
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=WINDOW_FIELDS, delimiter=';')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+async def write_windows(subscription, output_file, aggregator, every=0.0):
+    """Consumatore del bus di `frameBus`: aggiorna le finestre con le persone di ogni frame."""
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=WINDOW_FIELDS, delimiter=';')
+        writer.writeheader()
+        last = None
+        async for frame in subscription:
+            rows = aggregator.update(frame['time'], [(p.x, p.y, p.z, p.vx, p.vy, p.vz) for p in frame['persons']])
+            if every and last is not None and aggregator.last_seconds - last < every:
+                continue
+            last = aggregator.last_seconds
+            await asyncio.to_thread(writer.writerows, rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcola statistiche per zona su finestre temporali scorrevoli.")
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('output_csv', type=str, help='Il file CSV con le statistiche')
+    parser.add_argument('--windows', type=float, nargs='+', default=list(DEFAULT_WINDOWS), help='Durate delle finestre in secondi')
+    parser.add_argument('--zones', default=None, help='File JSON con le zone rettangolari')
+    parser.add_argument('--every', type=float, default=0.0, help='Scrive le statistiche al massimo ogni N secondi (default: ogni frame)')
+    args = parser.parse_args()
+    if any(duration <= 0 for duration in args.windows):
+        parser.error('--windows: le durate devono essere > 0')
+
+    aggregator = WindowAggregator(args.windows, load_zones(args.zones))
+    save_windows_to_csv(iter_window_rows(person_frames(args.input_txt), aggregator, args.every), args.output_csv)
@@ -0,0 +1,156 @@
+import contextlib
+import json
+import sys
+import time as clock
+
+# Misura degli stadi delle pipeline (lettura, decodifica, arrotondamento, scrittura...): tempo, numero di
+# elementi e bytes per stadio, contatori (es. linee saltate) e picco di memoria del processo.
+# Gli stadi sono generatori concatenati, quindi il tempo misurato attorno a next() comprende anche gli
+# stadi a monte: il tempo "esclusivo" di uno stadio si ottiene togliendo quello dello stadio `upstream`.
+# Senza --profile si usa NULL_PROFILER, che restituisce gli iteratori così come sono: nessun costo per linea.
+
+class Profiler:
+    """Raccoglie le metriche degli stadi di una esecuzione."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.started = clock.perf_counter()
+
+    def _stage(self, name, upstream):
+        if name not in self.stages:
+            self.stages[name] = {'seconds': 0.0, 'items': 0, 'bytes': 0, 'upstream': upstream}
+        return self.stages[name]
+
+    def wrap(self, name, iterable, size=None, upstream=None):
+        """Restituisce un iteratore che misura il tempo speso a produrre ogni elemento di `iterable`.
+
+        `size(item)`, se dato, viene sommato nei bytes dello stadio."""
+        return self._timed(self._stage(name, upstream), iterable, size)
+
+    @staticmethod
+    def _timed(stage, iterable, size):
+        iterator = iter(iterable)
+        timer = clock.perf_counter
+        while True:
+            start = timer()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage['seconds'] += timer() - start
+                return
+            stage['seconds'] += timer() - start
+            stage['items'] += 1
+            if size is not None:
+                stage['bytes'] += size(item)
+            yield item
+
+    @contextlib.contextmanager
+    def stage(self, name, upstream=None):
+        """Misura un blocco di codice (es. la scrittura del CSV che consuma gli stadi a monte)."""
+        stage = self._stage(name, upstream)
+        start = clock.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage['seconds'] += clock.perf_counter() - start
+
+    def add(self, name, items=0, size=0):
+        """Aggiunge elementi e bytes a uno stadio misurato con `stage()`."""
+        stage = self._stage(name, None)
+        stage['items'] += items
+        stage['bytes'] += size
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def _depth(self, name):
+        depth = 0
+        while name in self.stages and self.stages[name]['upstream'] in self.stages and depth < len(self.stages):
+            name = self.stages[name]['upstream']
+            depth += 1
+        return depth
+
+    def report(self):
+        """Metriche in forma di dizionario (serializzabile in JSON), con gli stadi in ordine di pipeline."""
+        stages = []
+        for name in sorted(self.stages, key=self._depth):
+            stage = self.stages[name]
+            upstream = self.stages.get(stage['upstream'])
+            exclusive = stage['seconds'] - (upstream['seconds'] if upstream else 0.0)
+            stages.append({
+                'name': name,
+                'seconds': round(stage['seconds'], 6),
+                'exclusive_seconds': round(max(exclusive, 0.0), 6),
+                'items': stage['items'],
+                'bytes': stage['bytes'],
+                'items_per_s': round(stage['items'] / stage['seconds'], 1) if stage['items'] and stage['seconds'] > 0 else None
+            })
+        return {
+            'total_seconds': round(clock.perf_counter() - self.started, 6),
+            'stages': stages,
+            'counters': dict(self.counters),
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+    def print_summary(self, file=None):
+        report = self.report()
+        file = file or sys.stderr
+        print(f"{'Stadio':20s} {'Tempo (s)':>10s} {'Esclusivo (s)':>14s} {'Elementi':>10s} {'MB':>8s} {'Elementi/s':>12s}", file=file)
+        for stage in report['stages']:
+            rate = f"{stage['items_per_s']:12.0f}" if stage['items_per_s'] is not None else f"{'-':>12s}"
+            print(f"{stage['name']:20s} {stage['seconds']:10.3f} {stage['exclusive_seconds']:14.3f} "
+                  f"{stage['items']:10d} {stage['bytes'] / 1e6:8.2f} {rate}", file=file)
+        for name, value in report['counters'].items():
+            print(f"{name}: {value}", file=file)
+        memory = f"{report['peak_rss_mb']:.1f} MB" if report['peak_rss_mb'] is not None else 'non disponibile'
+        print(f"Tempo totale: {report['total_seconds']:.3f} s, picco di memoria: {memory}", file=file)
+
+    def save(self, output_file):
+        with open(output_file, 'w') as file:
+            json.dump(self.report(), file, indent=4)
+
+class NullProfiler:
+    """Profiler disattivato: non misura niente e non aggiunge lavoro alle pipeline."""
+
+    def wrap(self, name, iterable, size=None, upstream=None):
+        return iterable
+
+    def stage(self, name, upstream=None):
+        return contextlib.nullcontext()
+
+    def add(self, name, items=0, size=0):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+def peak_rss_mb():
+    """Picco di memoria residente del processo in MB (None dove il modulo resource non esiste, es. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss è in KB su Linux e in bytes su macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def from_args(args):
+    """Profiler per gli argomenti --profile / --profile-json di uno script."""
+    return Profiler() if args.profile or args.profile_json else NULL_PROFILER
+
+def finish(profiler, args):
+    """Stampa il riepilogo e salva il report JSON se richiesto."""
+    if profiler is NULL_PROFILER:
+        return
+    profiler.print_summary()
+    if args.profile_json:
+        profiler.save(args.profile_json)
+
+def add_arguments(parser):
+    parser.add_argument('--profile', action='store_true',
+                        help='Misura tempo, elementi e bytes di ogni stadio e stampa un riepilogo')
+    parser.add_argument('--profile-json', metavar='FILE', default=None,
+                        help='Salva anche il report del profiling in JSON (implica --profile)')
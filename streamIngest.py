@@ -0,0 +1,128 @@
+import argparse
+import csv
+import os
+import socket
+import sys
+from datetime import datetime
+
+import frameParser
+import frameValidation
+import pointCloud
+
+# Acquisizione in tempo reale dal radar MS72SF1: i frame binari vengono letti da uno stream di bytes
+# (porta seriale, pipe o socket TCP), risincronizzati sull'header 01 02 03 04 05 06 07 08 e decodificati
+# man mano che arrivano, senza passare dal file TXT salvato da SSCOM5.
+
+# HOW to use this script > python streamIngest.py serial /dev/ttyUSB0 [--averages-csv medie.csv]
+#                          python streamIngest.py tcp localhost:9000
+#                          python streamIngest.py pipe -
+#                          python streamIngest.py replay <file.txt> --listen 9000 [--speed 1]   (per i test)
+
+FRAME_MAGIC = frameValidation.FRAME_MAGIC
+MAX_FRAME_SIZE = frameValidation.MAX_FRAME_SIZE
+BAUDRATE = 115200
+READ_SIZE = 4096
+
+def iter_raw_frames(read):
+    """Generatore dei frame binari completi letti con `read(n)`, che restituisce b'' a fine stream.
+
+    I bytes prima dell'header vengono scartati; se la lunghezza dichiarata non è plausibile
+    si riparte a cercare l'header dal byte successivo."""
+    buffer = bytearray()
+    while True:
+        start = buffer.find(FRAME_MAGIC)
+        if start == -1:
+            # Tiene gli ultimi bytes: l'header potrebbe essere a cavallo di due letture
+            del buffer[:max(0, len(buffer) - len(FRAME_MAGIC) + 1)]
+        else:
+            del buffer[:start]
+            if len(buffer) >= 12:
+                length = int.from_bytes(buffer[8:12], 'little')
+                if length < pointCloud.HEADER_SIZE or length > MAX_FRAME_SIZE:
+                    del buffer[:1]
+                    continue
+                if len(buffer) >= length:
+                    frame = bytes(buffer[:length])
+                    del buffer[:length]
+                    yield frame
+                    continue
+        data = read(READ_SIZE)
+        if not data:
+            return
+        buffer += data
+
+def decode_frame(payload, time=None):
+    """Decodifica un frame binario in un dizionario con nuvola di punti e persone (vedi `frameParser`).
+
+    La lunghezza dei punti viene presa da PointL, così i bytes del TLV2 non finiscono tra i punti."""
+    frame = frameParser.parse_frame(payload)
+    frame['time'] = time or datetime.now().strftime('%H:%M:%S.%f')[:12]
+    return frame
+
+def iter_stream(read):
+    """Generatore dei frame decodificati da uno stream, con il timestamp di arrivo."""
+    for payload in iter_raw_frames(read):
+        yield decode_frame(payload)
+
+# Sorgenti: ognuna restituisce una funzione read(n)
+def open_serial(port, baudrate=BAUDRATE):
+    import serial  # pyserial, necessario solo per la porta seriale
+    device = serial.Serial(port, baudrate=baudrate)
+    return lambda size: device.read(max(1, min(size, device.in_waiting)))
+
+def open_tcp(address):
+    host, port = address.rsplit(':', 1)
+    connection = socket.create_connection((host, int(port)))
+    return connection.recv
+
+def open_pipe(path):
+    fd = sys.stdin.fileno() if path == '-' else os.open(path, os.O_RDONLY)
+    return lambda size: os.read(fd, size)
+
+# Frame dei log SSCOM5, per il replay come stream binario (vedi `sessionReplay`)
+def log_frames(file_path):
+    """Generatore di (time, payload) dei frame radar contenuti in un file TXT SSCOM5."""
+    with open(file_path, 'rb') as file:
+        for line in file:
+            parsed = pointCloud.parse_raw_line(line)
+            if parsed and parsed[2].startswith(FRAME_MAGIC):
+                yield parsed[0], parsed[2]
+
+def save_live_averages(frames, output_file):
+    """Scrive le medie per frame nel CSV man mano che i frame arrivano."""
+    stream = ((frame['time'], frame['points']) for frame in frames)
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=pointCloud.AVERAGE_FIELDS, delimiter=';')
+        writer.writeheader()
+        for row in pointCloud.iter_averages(pointCloud.iter_formatted(pointCloud.iter_stripped(stream))):
+            writer.writerow(row)
+            csvfile.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Legge i frame del radar MS72SF1 da uno stream e li decodifica in tempo reale.")
+    parser.add_argument('source', choices=['serial', 'tcp', 'pipe', 'replay'], help='Tipo di sorgente')
+    parser.add_argument('address', help="Porta seriale, host:porta, percorso della pipe ('-' per stdin) o file TXT da riprodurre")
+    parser.add_argument('--baudrate', type=int, default=BAUDRATE, help='Baud rate della porta seriale (default: 115200)')
+    parser.add_argument('--averages-csv', default=None, help='Scrive le medie dei punti per frame in questo CSV')
+    parser.add_argument('--listen', type=int, default=9000, help='Porta TCP su cui riprodurre il log (solo replay)')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='Velocità del replay rispetto ai timestamp del log: 1 = tempo reale, 0 = il più veloce possibile (default, solo replay)')
+    args = parser.parse_args()
+
+    if args.source == 'replay':
+        import sessionReplay  # importa questo modulo: solo qui per evitare un import circolare
+        sessionReplay.serve(args.address, args.listen, args.speed)
+    else:
+        if args.source == 'serial':
+            read = open_serial(args.address, args.baudrate)
+        elif args.source == 'tcp':
+            read = open_tcp(args.address)
+        else:
+            read = open_pipe(args.address)
+
+        if args.averages_csv:
+            save_live_averages(iter_stream(read), args.averages_csv)
+        else:
+            for frame in iter_stream(read):
+                print(f"{frame['time']} frame {frame['frame']}: {len(frame['points'])} punti, "
+                      f"{len(frame['persons'])} persone", flush=True)
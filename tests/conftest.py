@@ -0,0 +1,64 @@
+import functools
+import os
+import sys
+
+import pytest
+
+# Test dei decoder e delle pipeline sui file di esempio in results/ e su acquisizioni sintetiche
+# generate con benchmarks/captureGenerator.py.
+
+# HOW to run the tests > python -m pytest -q   (dalla cartella principale del progetto)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import captureGenerator  # noqa: E402
+
+POINT_CLOUD_TXT = os.path.join(ROOT, 'results', 'pointCloud', '1 - radar generated file.TXT')
+POINT_CLOUD_MAPPED_JSON = os.path.join(ROOT, 'results', 'pointCloud', '2 - txt file mapped to.json')
+POINT_CLOUD_CLEANED_JSON = os.path.join(ROOT, 'results', 'pointCloud', '3 - cleaning & manipulation.json')
+POINT_CLOUD_CSV = os.path.join(ROOT, 'results', 'pointCloud', '4 - final results with average of points.csv')
+PERSONS_TXT = os.path.join(ROOT, 'results', 'pointsPersons', '1 - radar generated file.txt')
+PERSONS_CSV = os.path.join(ROOT, 'results', 'pointsPersons', '2 - output file info persons coordinates.csv')
+
+SAMPLE_REJECTED = {'no_payload': 1, 'short_header': 1}
+SAMPLE_FRAMES = 177
+
+def generate(path, mode='d2', frames=40, **options):
+    """Acquisizione sintetica di `frames` frame (a 2.5 frame al secondo) in `path`."""
+    captureGenerator.generate_capture(str(path), mode, hours=(frames + 0.5) / 2.5 / 3600, **options)
+    return str(path)
+
+@pytest.fixture
+def d2_capture(tmp_path):
+    return generate(tmp_path / 'd2.txt', 'd2', persons=3)
+
+@pytest.fixture
+def d3_capture(tmp_path):
+    return generate(tmp_path / 'd3.txt', 'd3', persons=3)
+
+def frame_times(start, count, step_ms=400):
+    """`count` timestamp SSCOM5 a partire da 'HH:MM:SS.mmm', ogni `step_ms` millisecondi (oltre la mezzanotte
+    l'orario riparte da 00:00:00)."""
+    hours, minutes, seconds = start.split(':')
+    first = (int(hours) * 3600 + int(minutes) * 60) * 1000 + round(float(seconds) * 1000)
+    times = []
+    for i in range(count):
+        milliseconds = (first + i * step_ms) % (24 * 3600 * 1000)
+        times.append(f'{milliseconds // 3600000:02d}:{milliseconds // 60000 % 60:02d}:'
+                     f'{milliseconds // 1000 % 60:02d}.{milliseconds % 1000:03d}')
+    return times
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Cartella della cache temporanea, così i test non toccano ~/.cache/ms72sf1."""
+    directory = tmp_path / 'cache'
+    monkeypatch.setenv('MS72SF1_CACHE_DIR', str(directory))
+    return str(directory)
+
+def latin1_open(monkeypatch, module):
+    """I flussi storici aprono i TXT in modalità testo con la codifica di sistema (su Windows cp1252):
+    con una codifica UTF-8 le frecce '¡û¡ô' di SSCOM5 non sono decodificabili, quindi `open` del
+    modulo viene sostituita da una che legge in latin-1."""
+    monkeypatch.setattr(module, 'open', functools.partial(open, encoding='latin-1'), raising=False)
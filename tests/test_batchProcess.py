@@ -0,0 +1,87 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+import batchProcess
+import pointCloud
+from conftest import POINT_CLOUD_CSV, POINT_CLOUD_TXT, PERSONS_TXT, SAMPLE_REJECTED, generate
+
+def read_rows(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+@pytest.fixture
+def inputs(tmp_path):
+    directory = tmp_path / 'input'
+    directory.mkdir()
+    shutil.copy(POINT_CLOUD_TXT, directory / 'sample.txt')
+    generate(directory / 'synthetic.txt', 'd3', persons=2)
+    return directory
+
+@pytest.mark.parametrize('workers, backend', [(1, 'python'), (2, 'python'), (1, 'numpy')])
+def test_batch_outputs_and_manifest(tmp_path, inputs, workers, backend):
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    output = tmp_path / 'output'
+    files = batchProcess.collect_inputs([str(inputs)])
+    manifest = batchProcess.run_batch(files, str(output), 'both', workers, backend)
+    assert (manifest['processed'], manifest['skipped'], manifest['errors']) == (2, 0, 0)
+    assert read_rows(output / 'sample_averages.csv') == read_rows(POINT_CLOUD_CSV)
+    entries = {os.path.basename(entry['input']): entry for entry in manifest['files']}
+    assert entries['sample.txt']['rejected_lines'] == SAMPLE_REJECTED
+    assert entries['sample.txt']['rejected_person_lines'] == SAMPLE_REJECTED
+    assert entries['synthetic.txt']['mode'] == 'd3'
+    assert not [name for name in os.listdir(output) if '.tmp' in name]
+
+def test_up_to_date_files_are_skipped(tmp_path, inputs):
+    output = str(tmp_path / 'output')
+    files = batchProcess.collect_inputs([str(inputs / '*.txt')])
+    batchProcess.run_batch(files, output)
+    manifest = batchProcess.run_batch(files, output)
+    assert manifest['skipped'] == 2
+    assert batchProcess.run_batch(files, output, force=True)['processed'] == 2
+
+def test_errors_are_recorded(tmp_path, inputs, monkeypatch):
+    """Un errore di un file finisce nel manifest, senza output parziali e senza fermare gli altri file."""
+    def failing(*args, **kwargs):
+        raise OSError('disco pieno')
+    monkeypatch.setattr(pointCloud, 'write_averages', failing)
+    output = tmp_path / 'output'
+    manifest = batchProcess.run_batch(batchProcess.collect_inputs([str(inputs)]), str(output))
+    assert manifest['errors'] == 2
+    assert all(entry['error'] == 'OSError: disco pieno' for entry in manifest['files'])
+    assert os.listdir(output) == []
+
+def test_same_name_in_different_directories(tmp_path):
+    """'giorno1/cap.txt' e 'giorno2/cap.txt' non si sovrascrivono: gli output seguono le cartelle."""
+    for day, seed in (('giorno1', 1), ('giorno2', 2)):
+        (tmp_path / 'input' / day).mkdir(parents=True)
+        generate(tmp_path / 'input' / day / 'cap.txt', frames=10 + seed, seed=seed)
+    output = tmp_path / 'output'
+    files = batchProcess.collect_inputs([str(tmp_path / 'input' / '*' / '*.txt')])
+    manifest = batchProcess.run_batch(files, str(output))
+    assert manifest['processed'] == 2
+    assert len(read_rows(output / 'giorno1' / 'cap_averages.csv')) == 12
+    assert len(read_rows(output / 'giorno2' / 'cap_averages.csv')) == 13
+
+def test_colliding_outputs_are_rejected(tmp_path):
+    directory = tmp_path / 'input'
+    directory.mkdir()
+    generate(directory / 'cap.txt', frames=10)
+    generate(directory / 'cap.TXT', frames=10)
+    output = tmp_path / 'output'
+    with pytest.raises(ValueError):
+        batchProcess.run_batch(batchProcess.collect_inputs([str(directory)]), str(output))
+    assert not output.exists()
+
+def test_collect_inputs(tmp_path, inputs):
+    shutil.copy(PERSONS_TXT, inputs / 'persons.TXT')
+    (inputs / 'notes.csv').write_text('')
+    files = batchProcess.collect_inputs([str(inputs), str(inputs / 'sample.txt')])
+    assert [os.path.basename(path) for path in files] == ['persons.TXT', 'sample.txt', 'synthetic.txt']
+
+def test_invalid_job(tmp_path):
+    with pytest.raises(ValueError):
+        batchProcess.run_batch([], str(tmp_path), job='tutto')
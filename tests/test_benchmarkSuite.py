@@ -0,0 +1,13 @@
+import benchmarkSuite
+
+def test_run_suite_reports_every_case(capsys):
+    names = ['pointCloud.stream_averages', 'pointsPerson.process_txt_to_person_csv[d3]']
+    params = {'points': 5, 'persons': 2, 'rate': 2.5, 'hours': 0.002, 'malformed': 0.01, 'seed': 0}
+    report = benchmarkSuite.run_suite(params, names)
+    assert [result['name'] for result in report['results']] == names
+    assert sorted(report['inputs']) == ['d2', 'd3']
+    for result in report['results']:
+        assert result['seconds'] > 0 and result['lines_per_s'] > 0
+        if result['peak_rss_mb'] is not None:
+            assert result['case_rss_mb'] == round(result['peak_rss_mb'] - result['baseline_rss_mb'], 1) >= 0
+    assert len(capsys.readouterr().out.splitlines()) == len(names)
@@ -0,0 +1,43 @@
+import pytest
+
+import captureGenerator
+import pointCloud
+import pointsPerson
+from conftest import frame_times, generate
+
+@pytest.mark.parametrize('mode', ['d2', 'd3'])
+def test_generated_frames_decode(tmp_path, mode):
+    """Ogni linea è un frame con PointL corretto e le persone richieste nel TLV2."""
+    source = generate(tmp_path / 'capture.txt', mode, frames=40, persons=3, points=8, seed=1)
+    frames = list(pointsPerson.iter_person_frames(source))
+    assert [frame for _, frame, _ in frames] == list(range(40))
+    assert [time for time, _, _ in frames] == frame_times('10:00:00.000', 40)
+    assert all(len(persons) == 3 for _, _, persons in frames)
+    with open(source, 'rb') as file:
+        for line in file:
+            payload = pointCloud.parse_raw_line(line)[2]
+            assert int.from_bytes(payload[8:12], 'little') == len(payload)
+            point_length = int.from_bytes(payload[20:24], 'little')
+            assert pointsPerson.person_tlv_range(payload)[0] == pointCloud.HEADER_SIZE + point_length + 8
+            assert point_length % pointCloud.POINT_RECORD.size == 0
+            assert mode == 'd2' or point_length == 0
+
+def test_malformed_lines_are_not_frames(tmp_path):
+    source = generate(tmp_path / 'capture.txt', frames=300, malformed=0.1, seed=2)
+    frames = list(pointsPerson.iter_person_frames(source))
+    assert 200 < len(frames) < 300
+    assert len({time for time, _, _ in frames}) == len(frames)
+
+def test_build_frame_points():
+    points = [(1.0, 2.0, 0.5, 3, 10.0, 20.0, 1.5), (-1.0, 0.25, 1.0, 0, 5.0, 30.0, 2.0)]
+    payload = captureGenerator.build_frame(7, points, [], 'd2')
+    assert pointCloud.decode_points(payload[:pointCloud.HEADER_SIZE + 50]) == points
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_averages_backends_match_on_synthetic_capture(tmp_path, workers):
+    """Con frame malformati e frame senza punti validi Python, NumPy e processi paralleli coincidono."""
+    pytest.importorskip('numpy')
+    import pointCloudNumpy
+    source = generate(tmp_path / 'capture.txt', frames=300, malformed=0.05, points=8, seed=3)
+    expected = list(pointCloudNumpy.calculate_averages(*pointCloudNumpy.load_capture(source)))
+    assert list(pointCloud.stream_averages(source, workers=workers)) == expected
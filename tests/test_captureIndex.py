@@ -0,0 +1,77 @@
+import shutil
+
+import captureIndex
+import frameParser
+import pointCloud
+from conftest import POINT_CLOUD_TXT, SAMPLE_FRAMES, generate
+
+def test_incremental_build_matches_full_build(tmp_path, d2_capture):
+    """L'indice aggiornato mentre il file cresce (anche con una linea incompleta) è identico a
+    quello costruito in una volta sola."""
+    with open(d2_capture, 'rb') as file:
+        data = file.read()
+    growing = tmp_path / 'growing.txt'
+    added = 0
+    for end in (len(data) // 4, len(data) // 4 + 7, len(data) // 2, len(data)):
+        growing.write_bytes(data[:end])
+        added += captureIndex.update_index(str(growing))
+    assert added == 40
+    assert captureIndex.update_index(str(growing)) == 0
+    full = tmp_path / 'full.txt'
+    shutil.copy(d2_capture, full)
+    captureIndex.update_index(str(full))
+    with open(captureIndex.index_path(str(growing)), 'rb') as a, open(captureIndex.index_path(str(full)), 'rb') as b:
+        assert a.read() == b.read()
+
+def test_replaced_file_is_reindexed(tmp_path):
+    source = generate(tmp_path / 'capture.txt', frames=30, seed=1)
+    captureIndex.update_index(source)
+    generate(tmp_path / 'capture.txt', frames=20, seed=2)
+    assert captureIndex.update_index(source) == 20
+    with captureIndex.CaptureIndex(source) as index:
+        assert len(index) == 20
+
+def test_sample_time_range(tmp_path):
+    source = shutil.copy(POINT_CLOUD_TXT, tmp_path)
+    with captureIndex.CaptureIndex(source) as index:
+        assert len(index) == SAMPLE_FRAMES
+        start, stop = index.time_range('11:27:13.023')
+        assert stop - start == 1
+        assert index.time_range('11:27:13', '11:28:23') == (0, SAMPLE_FRAMES)
+    frames = list(captureIndex.iter_time_range(source, '11:27:13.023', '11:27:20'))
+    expected = [time for time, _ in frameParser.iter_frames(POINT_CLOUD_TXT) if '11:27:13.023' <= time < '11:27:21']
+    assert [time for time, _ in frames] == expected
+
+def test_time_range_whole_second(tmp_path):
+    """Un orario senza millisecondi vale per tutto il secondo: a 2.5 frame al secondo sono 2 frame."""
+    source = generate(tmp_path / 'capture.txt', frames=40)
+    with captureIndex.CaptureIndex(source) as index:
+        assert [index.record(i)[0] % 1000 for i in range(*index.time_range('10:00:01'))] == [200, 600]
+        assert len(range(*index.time_range('10:00:01.200'))) == 1
+        assert len(range(*index.time_range('10:00:01', '10:00:02'))) == 5
+
+def test_midnight_crossing(tmp_path):
+    source = generate(tmp_path / 'capture.txt', frames=40, start='23:59:50.000')
+    with captureIndex.CaptureIndex(source) as index:
+        times = [index.record(i)[0] for i in range(len(index))]
+        assert times == sorted(times)
+        assert times[-1] - times[0] == 39 * 400
+        start, stop = index.time_range('23:59:59', '00:00:01')
+        lines = list(index.lines(start, stop))
+    parsed = [pointCloud.parse_raw_line(line)[0] for line in lines]
+    assert parsed[0] == '23:59:59.200' and parsed[-1] == '00:00:01.600'
+    assert len(parsed) == 7
+
+def test_frame_positions_matches_linear_scan(tmp_path):
+    """I numeri di frame ripartono a ogni avvio del radar: due acquisizioni in un solo file."""
+    first = generate(tmp_path / 'first.txt', frames=30, seed=1, start='10:00:00.000')
+    second = generate(tmp_path / 'second.txt', frames=20, seed=2, start='11:00:00.000')
+    source = tmp_path / 'capture.txt'
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        source.write_bytes(a.read() + b.read())
+    with captureIndex.CaptureIndex(str(source)) as index:
+        for frame in (0, 5, 19, 20, 29, 30):
+            expected = [i for i in range(len(index)) if index.record(i)[2] == frame]
+            assert index.frame_positions(frame) == expected
+        assert len(index.frame_positions(5)) == 2
+        assert index.frame_positions(30) == []
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import captureStore  # noqa: E402
+import decodeCache  # noqa: E402
+import frameValidation  # noqa: E402
+import pointCloud  # noqa: E402
+import pointCloudNumpy  # noqa: E402
+import pointsPerson  # noqa: E402
+import streamIngest  # noqa: E402
+from conftest import (POINT_CLOUD_CLEANED_JSON, POINT_CLOUD_MAPPED_JSON, POINT_CLOUD_TXT,  # noqa: E402
+                      SAMPLE_FRAMES, SAMPLE_REJECTED)
+
+def assert_same_capture(capture, expected):
+    for name in captureStore.COLUMNS:
+        assert np.asarray(capture[name]).tobytes() == np.asarray(expected[name]).tobytes(), name
+
+def sample_head(path, lines):
+    """Copia delle prime `lines` linee del file di esempio."""
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        path.write_bytes(b''.join(file.readlines()[:lines]))
+    return str(path)
+
+def test_capture_from_txt_matches_decoders():
+    capture = captureStore.capture_from_txt(POINT_CLOUD_TXT)
+    times, offsets, points = pointCloudNumpy.load_capture(POINT_CLOUD_TXT)
+    assert capture['times'].tolist() == times.tolist()
+    assert capture['offsets'].tolist() == offsets.tolist()
+    assert capture['points'].tobytes() == points.tobytes()
+    persons = [person for _, payload in streamIngest.log_frames(POINT_CLOUD_TXT)
+               for person in pointsPerson.decode_persons(payload)]
+    assert capture['persons']['x'].tolist() == [np.float32(person.x) for person in persons]
+    assert capture['person_offsets'][-1] == len(persons)
+
+def test_decode_capture_matches_capture_columns(d2_capture):
+    """Con `persons=True` il decoder NumPy restituisce tutte le colonne di captureStore."""
+    for source in (POINT_CLOUD_TXT, d2_capture):
+        assert_same_capture(pointCloudNumpy.decode_capture(source, persons=True), captureStore.capture_from_txt(source))
+
+def test_write_and_open_roundtrip(tmp_path):
+    capture = captureStore.capture_from_txt(POINT_CLOUD_TXT)
+    path = tmp_path / 'capture.capture'
+    captureStore.write_capture(str(path), capture, source='sample.txt', rejected={'short_header': 2})
+    opened = captureStore.open_capture(str(path))
+    assert_same_capture(opened, capture)
+    assert opened['meta']['frames'] == len(capture['times'])
+    assert opened['meta']['rejected'] == {'short_header': 2}
+
+def test_block_averages_match_stream_averages():
+    capture = captureStore.capture_from_txt(POINT_CLOUD_TXT)
+    expected = list(pointCloud.stream_averages(POINT_CLOUD_TXT))
+    assert list(captureStore.calculate_averages(capture, frames_per_block=7)) == expected
+
+@pytest.mark.parametrize('source', [POINT_CLOUD_MAPPED_JSON, POINT_CLOUD_CLEANED_JSON])
+def test_capture_from_json_matches_averages(source):
+    capture = captureStore.capture_from_json(source)
+    expected = list(pointCloud.stream_averages(POINT_CLOUD_TXT))
+    assert list(captureStore.calculate_averages(capture)) == expected
+
+def test_person_frames_match_decoder():
+    capture = captureStore.capture_from_txt(POINT_CLOUD_TXT)
+    frames = list(pointsPerson.iter_person_frames(POINT_CLOUD_TXT))
+    assert len(frames) == len(capture['times'])
+    for (time, frame, persons), (expected_time, expected_frame, expected) in \
+            zip(captureStore.iter_person_frames(capture), frames):
+        assert (time, frame) == (expected_time, expected_frame)
+        assert [repr(person) for person in persons] == [repr(person) for person in expected]
+
+def test_decode_cache_hit_and_miss(tmp_path, capsys):
+    cache = decodeCache.DecodeCache(str(tmp_path / 'cache'))
+    missed = cache.get_or_decode(POINT_CLOUD_TXT)
+    miss_output = capsys.readouterr().out
+    hit = cache.get_or_decode(POINT_CLOUD_TXT)
+    hit_output = capsys.readouterr().out
+    assert_same_capture(hit, missed)
+    assert_same_capture(hit, captureStore.capture_from_txt(POINT_CLOUD_TXT))
+    assert len(hit['times']) == SAMPLE_FRAMES
+    assert hit['meta']['rejected'] == SAMPLE_REJECTED
+    assert miss_output.splitlines()[-1] == hit_output.strip() == frameValidation.summarize(SAMPLE_REJECTED)
+
+def test_decode_cache_detects_changed_file(tmp_path):
+    source = sample_head(tmp_path / 'capture.txt', 20)
+    cache = decodeCache.DecodeCache(str(tmp_path / 'cache'))
+    first = cache.get_or_decode(source)
+    sample_head(tmp_path / 'capture.txt', 30)
+    second = cache.get_or_decode(source)
+    assert len(first['times']) < len(second['times'])
+    assert cache.key(source).endswith(f'-v{decodeCache.DECODER_VERSION}')
+
+def test_decode_cache_eviction(tmp_path):
+    cache = decodeCache.DecodeCache(str(tmp_path / 'cache'), max_bytes=1)
+    sources = [sample_head(tmp_path / f'capture{i}.txt', 10 + i) for i in range(3)]
+    for source in sources:
+        cache.get_or_decode(source)
+    assert list(cache.index['entries']) == [cache.key(sources[-1])]
+    assert list(cache.index['files']) == [os.path.abspath(sources[-1])]
+
+def test_decode_cache_merges_concurrent_indexes(tmp_path):
+    """Due cache aperte sulla stessa cartella non si cancellano le voci a vicenda nell'indice."""
+    directory = str(tmp_path / 'cache')
+    first, second = decodeCache.DecodeCache(directory), decodeCache.DecodeCache(directory)
+    sources = [sample_head(tmp_path / f'capture{i}.txt', 10 + i) for i in range(2)]
+    lock = os.path.join(directory, 'index.lock')
+    open(lock, 'w').close()
+    os.utime(lock, (0, 0))  # lock lasciato da un processo interrotto
+    first.get_or_decode(sources[0])
+    second.get_or_decode(sources[1])
+    index = decodeCache.DecodeCache(directory).index
+    assert sorted(index['entries']) == sorted(first.key(source) for source in sources)
+    assert sorted(index['files']) == sorted(os.path.abspath(source) for source in sources)
+    assert sorted(os.listdir(directory)) == sorted(['index.json'] + list(index['entries']))
+
+def test_decode_cache_lock_timeout(tmp_path):
+    lock = tmp_path / 'index.lock'
+    with decodeCache._locked(str(lock)):
+        assert lock.exists()
+        with pytest.raises(TimeoutError):
+            with decodeCache._locked(str(lock), timeout=0):
+                pass
+    assert not lock.exists()
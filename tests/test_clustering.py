@@ -0,0 +1,81 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import clustering  # noqa: E402
+import pointCloudNumpy  # noqa: E402
+import streamIngest  # noqa: E402
+from conftest import POINT_CLOUD_TXT  # noqa: E402
+
+def brute_force_dbscan(frames, xyz, eps, min_samples):
+    """DBSCAN con la matrice completa delle distanze, frame per frame.
+
+    Come `clustering.dbscan`, un punto di bordo va nel cluster con il punto core di indice minore
+    tra quelli dei cluster vicini, e i cluster sono numerati nell'ordine del loro primo punto."""
+    labels = np.full(len(xyz), clustering.NOISE)
+    for frame in np.unique(frames):
+        members = np.flatnonzero(frames == frame)
+        distances = np.sqrt(((xyz[members, None] - xyz[None, members]) ** 2).sum(axis=2))
+        close = distances <= eps
+        core = close.sum(axis=1) >= min_samples
+        roots = np.full(len(members), -1)
+        for seed in np.flatnonzero(core):
+            if roots[seed] != -1:
+                continue
+            roots[seed] = seed
+            stack = [seed]
+            while stack:
+                point = stack.pop()
+                for neighbor in np.flatnonzero(close[point] & core):
+                    if roots[neighbor] == -1:
+                        roots[neighbor] = seed
+                        stack.append(neighbor)
+        for point in np.flatnonzero(~core):
+            neighbors = roots[close[point] & core]
+            if len(neighbors):
+                roots[point] = neighbors.min()
+        numbers = {}
+        for point, root in enumerate(roots):
+            if root != -1:
+                labels[members[point]] = numbers.setdefault(root, len(numbers))
+    return labels
+
+@pytest.mark.parametrize('seed', range(4))
+def test_dbscan_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 60, 8)
+    frames = np.repeat(np.arange(len(counts)), counts)
+    centers = rng.uniform(-3, 3, (len(frames), 3))
+    xyz = np.where(rng.random((len(frames), 1)) < 0.7, np.round(centers), centers) + rng.normal(0, 0.15, centers.shape)
+    labels = clustering.dbscan(frames, xyz, eps=0.3, min_samples=3)
+    assert labels.tolist() == brute_force_dbscan(frames, xyz, 0.3, 3).tolist()
+
+def test_dbscan_empty():
+    assert len(clustering.dbscan(np.zeros(0, dtype=np.int64), np.zeros((0, 3)))) == 0
+
+def test_point_length_excludes_persons():
+    """Con `point_length` restano i soli punti di TLV1, come in `streamIngest.decode_frame`."""
+    _, offsets, points = pointCloudNumpy.load_capture(POINT_CLOUD_TXT, point_length=True)
+    frames = [streamIngest.decode_frame(payload, time)['points']
+              for time, payload in streamIngest.log_frames(POINT_CLOUD_TXT)]
+    assert np.diff(offsets).tolist() == [len(frame) for frame in frames]
+    assert repr(points.tolist()) == repr([point for frame in frames for point in frame])
+
+def test_cluster_capture_statistics():
+    times, offsets, points = pointCloudNumpy.load_capture(POINT_CLOUD_TXT, point_length=True)
+    labels, clusters = clustering.cluster_capture(times, offsets, points)
+    frames = pointCloudNumpy.frame_index(offsets)
+    assert len(clusters['frame']) > 0
+    for i in range(len(clusters['frame'])):
+        members = (frames == clusters['frame'][i]) & (labels == clusters['cluster'][i])
+        assert members.sum() == clusters['count'][i]
+        assert clusters['x'][i] == pytest.approx(points['x'][members].astype(np.float64).mean())
+        assert clusters['snr_max'][i] == pytest.approx(points['snr'][members].max())
+        assert clusters['time'][i] == times[clusters['frame'][i]]
+
+def test_points_outside_box_are_noise():
+    points = [(0.0, 0.0, 1.0, 0, 5.0, 1.0, 0.0)] * 3 + [(50.0, 0.0, 1.0, 0, 5.0, 1.0, 0.0)] * 3 \
+        + [(float('nan'), 0.0, 1.0, 0, 5.0, 1.0, 0.0)]
+    labels, clusters = clustering.cluster_frame(points)
+    assert labels.tolist() == [0, 0, 0] + [clustering.NOISE] * 4
+    assert clusters['count'].tolist() == [3]
@@ -0,0 +1,48 @@
+import csv
+
+import pytest
+
+import columnWriters
+
+def read_rows(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+def test_format_column():
+    assert columnWriters.format_column([1.5, None, float('nan'), 0.1 + 0.2, 'a', 3]) == \
+           ['1.5', '', '', '0.30000000000000004', 'a', '3']
+    assert columnWriters.format_column([1.005, 2.0], precision=2) == ['1.00', '2.00']
+
+def test_float32_shortest_repr():
+    np = pytest.importorskip('numpy')
+    values = np.array([0.1, np.nan, -1.25], dtype=np.float32)
+    assert columnWriters.format_column(values) == ['0.1', '', '-1.25']
+
+def test_csv_blocks_match_dict_writer(tmp_path):
+    """Stesso file di csv.DictWriter, anche con più blocchi."""
+    fields = ['time', 'value']
+    rows = [{'time': f'10:00:{i:02d}.000', 'value': i / 3 if i % 4 else None} for i in range(50)]
+    expected = tmp_path / 'expected.csv'
+    with open(expected, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields, delimiter=';')
+        writer.writeheader()
+        writer.writerows({**row, 'value': '' if row['value'] is None else repr(row['value'])} for row in rows)
+    output = tmp_path / 'output.csv'
+    with columnWriters.open_writer(str(output), fields) as writer:
+        for columns in columnWriters.iter_column_blocks(rows, fields, block_rows=7):
+            writer.write(columns)
+    assert writer.rows == 50
+    assert output.read_bytes() == expected.read_bytes()
+
+def test_parquet_roundtrip(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    output = tmp_path / 'table.parquet'
+    columns = {'time': ['a', 'b', 'c'], 'value': [1.234, None, 3.0]}
+    assert columnWriters.write_table(columns, str(output), precision=1) == 3
+    assert parquet.read_table(output).to_pydict() == {'time': ['a', 'b', 'c'], 'value': [1.2, None, 3.0]}
+
+def test_resolve_format():
+    assert columnWriters.resolve_format('medie.PARQUET') == 'parquet'
+    assert columnWriters.resolve_format('medie.csv') == 'csv'
+    with pytest.raises(ValueError):
+        columnWriters.resolve_format('medie.csv', 'xlsx')
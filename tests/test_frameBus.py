@@ -0,0 +1,44 @@
+import asyncio
+import csv
+
+import frameBus
+import streamIngest
+from conftest import POINT_CLOUD_TXT, SAMPLE_FRAMES
+
+def read_rows(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+def test_block_policy_delivers_every_frame(tmp_path, capsys):
+    """Con 'block' e code corte nessun frame viene perso: il CSV è quello dell'acquisizione diretta."""
+    output = tmp_path / 'averages.csv'
+    metrics = asyncio.run(frameBus.run_log(POINT_CLOUD_TXT, str(output), 2, frameBus.BLOCK))
+    assert all(m['published'] == m['received'] == SAMPLE_FRAMES and m['dropped'] == 0 for m in metrics)
+    expected = tmp_path / 'expected.csv'
+    frames = (streamIngest.decode_frame(payload, time) for time, payload in streamIngest.log_frames(POINT_CLOUD_TXT))
+    streamIngest.save_live_averages(frames, str(expected))
+    assert read_rows(output) == read_rows(expected)
+    assert len(capsys.readouterr().out.splitlines()) == SAMPLE_FRAMES
+
+def test_drop_oldest_keeps_latest_frames():
+    async def scenario():
+        bus = frameBus.FrameBus()
+        subscription = bus.subscribe('lento', maxsize=3)
+        for frame in range(10):
+            await bus.publish(frame)
+        await bus.close()
+        return [frame async for frame in subscription], subscription.metrics()
+
+    received, metrics = asyncio.run(scenario())
+    assert received == [8, 9]  # la chiusura prende il posto del frame più vecchio
+    assert metrics['dropped'] == 8
+    assert metrics['max_lag'] == 3
+
+def test_windows_consumer(tmp_path):
+    """Con --windows-csv un terzo consumatore scrive una riga per frame, finestra e zona."""
+    import slidingWindows
+    windows = tmp_path / 'windows.csv'
+    asyncio.run(frameBus.run_log(POINT_CLOUD_TXT, str(tmp_path / 'averages.csv'), 100, frameBus.BLOCK, str(windows)))
+    rows = read_rows(windows)
+    assert rows[0] == slidingWindows.WINDOW_FIELDS
+    assert len(rows) - 1 == SAMPLE_FRAMES * len(slidingWindows.DEFAULT_WINDOWS)
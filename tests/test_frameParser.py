@@ -0,0 +1,74 @@
+import csv
+
+import frameParser
+import frameValidation
+import pointCloud
+import pointsPerson
+import streamIngest
+from conftest import POINT_CLOUD_TXT, SAMPLE_FRAMES, generate
+
+def read_rows(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+def fields(person):
+    return tuple(getattr(person, field) for field in pointsPerson.Person.__slots__)
+
+def test_parse_frame_matches_decoders(d2_capture):
+    """Punti limitati a PointL e persone del TLV2 come i decoder di pointCloud e pointsPerson."""
+    frames = 0
+    for time, payload in streamIngest.log_frames(d2_capture):
+        frame = frameParser.parse_frame(payload)
+        point_length = int.from_bytes(payload[20:24], 'little')
+        assert frame['points'] == pointCloud.decode_points(payload[:pointCloud.HEADER_SIZE + point_length])
+        assert list(map(fields, frame['persons'])) == list(map(fields, pointsPerson.decode_persons(payload)))
+        assert frame['frame'] == frames
+        frames += 1
+    assert frames == 40
+
+def test_unknown_tlv_is_skipped():
+    """Un TLV sconosciuto prima del TLV2 viene saltato grazie alla sua lunghezza."""
+    import captureGenerator
+    payload = captureGenerator.build_frame(7, [], [(1, 1, 0.5, 1.0, 1.5, 0.0, 0.0, 0.0)], 'd3')
+    extra = pointsPerson.TLV_HEADER.pack(9, 4) + b'\xff' * 4
+    length = (len(payload) + len(extra)).to_bytes(4, 'little')
+    frame = frameParser.parse_frame(payload[:8] + length + payload[12:24] + extra + payload[24:])
+    assert frame['frame'] == 7
+    assert frame['mode'] == frameParser.DEBUG3
+    assert len(frame['persons']) == 1
+
+def test_detect_mode(tmp_path, d2_capture, d3_capture):
+    assert frameParser.detect_mode(d2_capture) == frameParser.DEBUG2
+    assert frameParser.detect_mode(d3_capture) == frameParser.DEBUG3
+    assert frameParser.detect_mode(POINT_CLOUD_TXT) == frameParser.DEBUG2
+
+def test_process_file_matches_separate_pipelines(tmp_path, d2_capture):
+    """Una sola passata: persone come `save_person_tracks_csv`, medie come la pipeline di pointCloud
+    con i soli punti di TLV1."""
+    averages = tmp_path / 'averages.csv'
+    persons = tmp_path / 'persons.csv'
+    frameParser.process_file(d2_capture, str(averages), str(persons))
+    expected_persons = tmp_path / 'expected_persons.csv'
+    pointsPerson.save_person_tracks_csv(pointsPerson.iter_person_frames(d2_capture), str(expected_persons))
+    assert read_rows(persons) == read_rows(expected_persons)
+
+    expected_averages = tmp_path / 'expected_averages.csv'
+    frames = ((time, frame['points']) for time, frame in frameParser.iter_frames(d2_capture))
+    pointCloud.save_averages_to_csv(
+        pointCloud.iter_averages(pointCloud.iter_formatted(pointCloud.iter_stripped(frames))), str(expected_averages))
+    assert read_rows(averages) == read_rows(expected_averages)
+    assert len(read_rows(averages)) == 41
+
+def test_parse_line_skips_lines_without_frame():
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        parsed = [frameParser.parse_line(line) for line in file if line.strip()]
+    assert sum(result is not None for result in parsed) == SAMPLE_FRAMES
+
+def test_iter_frames_quarantine(tmp_path):
+    source = generate(tmp_path / 'capture.txt', frames=200, malformed=0.1, seed=2)
+    quarantine = frameValidation.Quarantine()
+    frames = list(frameParser.iter_frames(source, quarantine, strict=True))
+    with open(source, 'rb') as file:
+        lines = sum(1 for line in file if line.strip())
+    assert len(frames) + quarantine.total == lines
+    assert quarantine.total > 0
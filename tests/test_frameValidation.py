@@ -0,0 +1,75 @@
+import csv
+
+import pytest
+
+import captureGenerator
+import frameValidation
+import pointCloud
+from conftest import POINT_CLOUD_TXT, SAMPLE_FRAMES, SAMPLE_REJECTED
+
+POINT = (0.5, 1.0, 1.5, 3, 10.0, 20.0, 0.1)
+PERSON = (1, 1, 0.5, 1.0, 1.5, 0.0, 0.0, 0.0)
+
+def frame(points=1, persons=1):
+    return captureGenerator.build_frame(1, [POINT] * points, [PERSON] * persons)
+
+def with_length(payload, length):
+    return payload[:8] + length.to_bytes(4, 'little') + payload[12:]
+
+def with_point_length(payload, point_length):
+    return payload[:20] + point_length.to_bytes(4, 'little') + payload[24:]
+
+def line(payload):
+    return captureGenerator.format_line('10:00:00.000', payload)
+
+@pytest.mark.parametrize('text, reason', [
+    (b'10:00:00.000 senza parentesi\n', frameValidation.NO_TIMESTAMP),
+    (b'[10:00:00.000]IN\n', frameValidation.NO_PAYLOAD),
+    (line(b'AT+STOP\r\n'), frameValidation.SHORT_HEADER),
+    (line(b'\x00' + frame()[1:]), frameValidation.BAD_MAGIC),
+    (line(with_length(frame(), 10)), frameValidation.BAD_LENGTH),
+    (line(with_length(frame(), frameValidation.MAX_FRAME_SIZE + 1)), frameValidation.BAD_LENGTH),
+    (line(frame()[:-5]), frameValidation.TRUNCATED),
+    (line(with_point_length(frame(), 24)), frameValidation.BAD_POINT_LENGTH),
+    (line(with_point_length(frame(points=2), 150)), frameValidation.BAD_POINT_LENGTH),
+    (line(frame()), None),
+    (line(frame(points=0, persons=0)), None),
+])
+def test_reason_codes(text, reason):
+    assert frameValidation.validate_line(text)[0] == reason
+
+def test_non_strict_only_checks_header():
+    """Senza `strict` passano anche i frame troncati, come con i decoder storici."""
+    assert frameValidation.validate_line(line(frame()[:-5]), strict=False)[0] is None
+    assert frameValidation.validate_line(line(b'AT+STOP\r\n'), strict=False)[0] == frameValidation.SHORT_HEADER
+
+def test_quarantine_file(tmp_path):
+    source = tmp_path / 'capture.txt'
+    lines = [line(frame()), b'\n', line(frame()[:-5]), line(b'AT+STOP\r\n'), line(frame())]
+    source.write_bytes(b''.join(lines))
+    output = tmp_path / 'quarantine.csv'
+    with frameValidation.Quarantine(str(output)) as quarantine:
+        frames = list(frameValidation.iter_valid_frames(str(source), quarantine))
+    assert len(frames) == 2
+    assert quarantine.counts == {frameValidation.TRUNCATED: 1, frameValidation.SHORT_HEADER: 1}
+    assert quarantine.summary() == '2 linee scartate (short_header: 1, truncated: 1)'
+    with open(output, 'r', newline='') as file:
+        rows = list(csv.reader(file, delimiter=';'))
+    assert rows[0] == frameValidation.QUARANTINE_FIELDS
+    assert [row[:2] for row in rows[1:]] == [['3', frameValidation.TRUNCATED], ['4', frameValidation.SHORT_HEADER]]
+    assert rows[2][2] == lines[3].rstrip(b'\r\n').decode('latin-1')
+
+def test_summary_printed_without_quarantine(capsys):
+    frames = list(frameValidation.iter_valid_frames(POINT_CLOUD_TXT))
+    assert len(frames) == SAMPLE_FRAMES
+    assert capsys.readouterr().out.strip() == frameValidation.summarize(SAMPLE_REJECTED)
+
+def test_sample_frames_are_valid_in_strict_mode():
+    quarantine = frameValidation.Quarantine()
+    for time, payload in frameValidation.iter_valid_frames(POINT_CLOUD_TXT, quarantine):
+        assert len(payload) >= int.from_bytes(payload[8:12], 'little') >= pointCloud.HEADER_SIZE
+    assert quarantine.counts == SAMPLE_REJECTED
+
+def test_summarize():
+    assert frameValidation.summarize({}) == ''
+    assert frameValidation.summarize({'b': 2, 'a': 1}) == '3 linee scartate (a: 1, b: 2)'
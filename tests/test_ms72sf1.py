@@ -0,0 +1,62 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ms72sf1
+from ms72sf1 import cli
+from conftest import POINT_CLOUD_CLEANED_JSON, POINT_CLOUD_CSV, POINT_CLOUD_MAPPED_JSON, POINT_CLOUD_TXT, ROOT
+
+def read_rows(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+def test_every_api_name_resolves():
+    pytest.importorskip('numpy')
+    for name in ms72sf1.__all__:
+        assert callable(getattr(ms72sf1, name)), name
+    with pytest.raises(AttributeError):
+        ms72sf1.non_esiste
+
+def test_import_does_not_load_numpy():
+    code = 'import sys, ms72sf1; ms72sf1.stream_averages; print("numpy" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+def test_import_from_another_directory(tmp_path):
+    """Il package trova i moduli della radice anche fuori dalla radice e tramite un link simbolico."""
+    link = tmp_path / 'site'
+    link.mkdir()
+    (link / 'ms72sf1').symlink_to(os.path.join(ROOT, 'ms72sf1'))
+    output = tmp_path / 'averages.csv'
+    environment = {**os.environ, 'PYTHONPATH': str(link)}
+    subprocess.run([sys.executable, '-m', 'ms72sf1', 'averages', POINT_CLOUD_TXT, str(output), '--backend', 'python'],
+                   cwd=tmp_path, env=environment, capture_output=True, check=True)
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_cli_averages(tmp_path, cache_dir):
+    output = tmp_path / 'averages.csv'
+    assert cli.main(['averages', POINT_CLOUD_TXT, str(output), '--backend', 'python']) == 0
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_cli_rejects_ignored_options(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(['averages', POINT_CLOUD_TXT, str(tmp_path / 'a.csv'), '--follow', '--precision', '2'])
+
+def test_cli_json_averages(tmp_path):
+    output = tmp_path / 'averages.csv'
+    cli.main(['json-averages', POINT_CLOUD_CLEANED_JSON, str(output)])
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_cli_to_json(tmp_path):
+    output = tmp_path / 'mapped.json'
+    cli.main(['to-json', POINT_CLOUD_TXT, str(output)])
+    with open(output, 'r') as file, open(POINT_CLOUD_MAPPED_JSON, 'r') as reference:
+        assert json.load(file) == [entry for entry in json.load(reference) if entry]
+
+def test_cli_unknown_command(capsys):
+    assert cli.main(['sconosciuto']) == 2
+    assert 'Comando sconosciuto' in capsys.readouterr().err
@@ -0,0 +1,75 @@
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import occupancyHeatmap  # noqa: E402
+import pointCloudNumpy  # noqa: E402
+import pointsPerson  # noqa: E402
+from conftest import POINT_CLOUD_TXT  # noqa: E402
+
+def capture_line(time, frame_number, persons):
+    """Linea SSCOM5 con un frame DEBUG 3 (nessun punto) e le persone indicate nel TLV2."""
+    person_bytes = b''.join(pointsPerson.PERSON_RECORD.pack(*person) for person in persons)
+    length = 24 + pointsPerson.TLV_HEADER.size + len(person_bytes)
+    payload = (struct.pack('<8sIIII', bytes(range(1, 9)), length, frame_number, 1, 0)
+               + pointsPerson.TLV_HEADER.pack(pointsPerson.TLV_PERSONS, len(person_bytes)) + person_bytes)
+    return b'[' + time.encode('ascii') + b']IN\xa1\xfb\xa1\xf4' + payload.hex(' ').upper().encode('ascii') + b' \n'
+
+def test_point_in_polygon():
+    square = [[0, 0], [2, 0], [2, 2], [0, 2]]
+    triangle = [[0, 0], [2, 0], [0, 2]]
+    x = np.array([1.0, 3.0, 0.5, 1.5])
+    y = np.array([1.0, 1.0, 0.5, 1.5])
+    assert occupancyHeatmap.point_in_polygon(x, y, square).tolist() == [True, False, True, True]
+    assert occupancyHeatmap.point_in_polygon(x, y, triangle).tolist() == [False, False, True, False]
+
+def test_grid_cells_and_histogram():
+    grid = occupancyHeatmap.Grid(extent=(0, 0, 1, 1), resolution=0.5)
+    x = [0.1, 0.6, 0.6, 1.5, float('nan')]
+    y = [0.1, 0.1, 0.9, 0.1, 0.1]
+    assert grid.cells(x, y).tolist() == [0, 1, 3, -1, -1]
+    assert grid.histogram(x, y).tolist() == [1, 1, 0, 1]
+
+def test_accumulate_file_matches_decoders():
+    zones = {'sinistra': [[-5, -5], [0, -5], [0, 5], [-5, 5]]}
+    grid = occupancyHeatmap.Grid(zones=zones)
+    result = occupancyHeatmap.accumulate_file(POINT_CLOUD_TXT, grid)
+    _, _, points = pointCloudNumpy.load_capture(POINT_CLOUD_TXT, point_length=True)
+    persons = [person for _, _, frame in pointsPerson.iter_person_frames(POINT_CLOUD_TXT) for person in frame]
+    assert result['points'].sum() == (grid.cells(points['x'], points['y']) >= 0).sum()
+    assert result['persons'].sum() == len(persons)
+    merged = occupancyHeatmap.accumulate_files([POINT_CLOUD_TXT, POINT_CLOUD_TXT], grid, workers=2)
+    for key in result:
+        assert merged[key].tolist() == (2 * result[key]).tolist()
+
+def test_entries_and_exits(tmp_path):
+    """Una persona entra nella zona, esce, rientra e sparisce dal TLV2 dentro la zona."""
+    lines = [capture_line(f'10:00:0{i}.000', i, [(7, 1, x, 0.0, 1.5, 0.0, 0.0, 0.0)])
+             for i, x in enumerate([-1.0, 1.0, -1.0, 1.0])]
+    lines.append(capture_line('10:00:05.000', 5, []))
+    source = tmp_path / 'capture.txt'
+    source.write_bytes(b''.join(lines))
+    zones = tmp_path / 'zone.json'
+    zones.write_text('{"destra": [0, -5, 5, 5]}')  # rettangolo xmin, ymin, xmax, ymax
+    grid = occupancyHeatmap.Grid(zones=occupancyHeatmap.load_zones(str(zones)))
+    result = occupancyHeatmap.accumulate_file(str(source), grid)
+    assert result['entries'].tolist() == [2]
+    assert result['exits'].tolist() == [2]
+
+def test_file_is_decoded_once(monkeypatch, d2_capture):
+    """Punti e persone escono dalla stessa decodifica, senza rileggere il file con `pointsPerson`."""
+    zones = {'sinistra': [[-5, -5], [0, -5], [0, 5], [-5, 5]]}
+    grid = occupancyHeatmap.Grid(zones=zones)
+    calls = []
+    decode_capture = pointCloudNumpy.decode_capture
+    monkeypatch.setattr(pointCloudNumpy, 'decode_capture', lambda *args, **kwargs: calls.append(args) or
+                        decode_capture(*args, **kwargs))
+    monkeypatch.setattr(pointsPerson, 'iter_person_frames', None)
+    result = occupancyHeatmap.accumulate_file(d2_capture, grid)
+    monkeypatch.undo()
+    assert len(calls) == 1
+    persons = [person for _, _, frame in pointsPerson.iter_person_frames(d2_capture) for person in frame]
+    expected = grid.histogram([person.x for person in persons], [person.y for person in persons])
+    assert result['persons'].tolist() == expected.tolist()
@@ -0,0 +1,20 @@
+import parallelParse
+import pointCloud
+from conftest import POINT_CLOUD_TXT
+
+def test_chunk_ranges_start_at_line_boundaries():
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        data = file.read()
+    ranges = parallelParse.chunk_ranges(POINT_CLOUD_TXT, 4096)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(data[start - 1:start] == b'\n' for start, _ in ranges[1:])
+
+def test_map_lines_keeps_file_order():
+    """Con blocchi piccoli i risultati dei processi tornano nell'ordine delle linee del file
+    (confronto con `repr`: alcuni punti del file di esempio hanno coordinate NaN)."""
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        expected = [result for result in map(pointCloud.decode_line, file) if result is not None]
+    results = parallelParse.map_lines(POINT_CLOUD_TXT, pointCloud.decode_line, 2, chunk_size=4096)
+    assert repr(list(results)) == repr(expected)
@@ -0,0 +1,243 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import frameValidation
+import pointCloud
+from conftest import (POINT_CLOUD_CLEANED_JSON, POINT_CLOUD_CSV, POINT_CLOUD_MAPPED_JSON, POINT_CLOUD_TXT,
+                      ROOT, SAMPLE_FRAMES, SAMPLE_REJECTED, latin1_open)
+
+def read_rows(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+def parse(*argv):
+    parser = argparse.ArgumentParser()
+    pointCloud.add_arguments(parser)
+    args = parser.parse_args([str(arg) for arg in argv])
+    pointCloud.check_arguments(parser, args)
+    return args
+
+def same(a, b):
+    """Uguaglianza con NaN == NaN: alcuni record del radar hanno coordinate non valide."""
+    return a == b or (a != a and b != b)
+
+def test_decode_line_matches_mappare():
+    """Il decoder binario legge gli stessi punti delle stringhe esadecimali di `mappare`."""
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        lines = [line for line in file if line.strip()]
+    decoded = 0
+    for line in lines:
+        result = pointCloud.decode_line(line)
+        mapped = pointCloud.mappare(line.decode('latin-1'))
+        if result is None:
+            continue
+        time, points = result
+        assert mapped['time'] == time
+        assert len(mapped['points']) == len(points)
+        for i, (point, values) in enumerate(zip(mapped['points'], points), 1):
+            raw = bytes.fromhex(''.join(point[f'{field}{i}'] for field in pointCloud.POINT_FIELDS))
+            assert all(same(a, b) for a, b in zip(pointCloud.POINT_RECORD.unpack(raw), values))
+        decoded += 1
+    assert decoded == SAMPLE_FRAMES
+
+def test_legacy_helpers():
+    """Gli helper storici sono condivisi con pointsPerson (colonne da 4 bytes)."""
+    line = '[10:00:00.000] 01 02 03 04 05 06 07 08 09 \n'
+    assert pointCloud.split_line(line, 4) == ('10:00:00.000', ['01 02 03 04', '05 06 07 08', '09'])
+    assert pointCloud.function2('00 00 C0 3F') == '1.50'
+    assert pointCloud.function2('00 00') == '00 00'  # meno di 4 bytes: il valore resta com'è
+
+def test_process_file_binary_matches_mapped_json():
+    with open(POINT_CLOUD_MAPPED_JSON, 'r') as file:
+        reference = json.load(file)
+    assert pointCloud.process_file_binary(POINT_CLOUD_TXT) == [entry for entry in reference if entry]
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_legacy_process_file_quarantine(monkeypatch, capsys, binary):
+    """Le linee scartate dal flusso storico hanno gli stessi motivi del decoder binario, senza una
+    stampa per linea."""
+    latin1_open(monkeypatch, pointCloud)
+    process = pointCloud.process_file_binary if binary else pointCloud.process_file
+    quarantine = frameValidation.Quarantine()
+    assert len(process(POINT_CLOUD_TXT, quarantine)) == SAMPLE_FRAMES
+    assert quarantine.counts == SAMPLE_REJECTED
+    assert capsys.readouterr().out == ''
+    process(POINT_CLOUD_TXT)
+    assert capsys.readouterr().out.strip() == frameValidation.summarize(SAMPLE_REJECTED)
+
+def test_legacy_json_flow(tmp_path, monkeypatch):
+    """TXT -> JSON -> JSON pulito -> CSV come negli esempi di results/pointCloud."""
+    latin1_open(monkeypatch, pointCloud)
+    mapped = tmp_path / 'mapped.json'
+    cleaned = tmp_path / 'cleaned.json'
+    output = tmp_path / 'averages.csv'
+    pointCloud.save_to_json(pointCloud.process_file(POINT_CLOUD_TXT), str(mapped))
+    pointCloud.process_json_file(str(mapped), str(cleaned))
+    with open(cleaned, 'r') as file, open(POINT_CLOUD_CLEANED_JSON, 'r') as reference:
+        assert json.load(file) == json.load(reference)
+    with open(cleaned, 'r') as file:
+        pointCloud.save_averages_to_csv(pointCloud.calculate_averages(json.load(file)), str(output))
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_numpy_backend_matches_reference(tmp_path):
+    pytest.importorskip('numpy')
+    import pointCloudNumpy
+    output = tmp_path / 'averages.csv'
+    times, offsets, points = pointCloudNumpy.load_capture(POINT_CLOUD_TXT)
+    assert len(times) == len(offsets) - 1 == SAMPLE_FRAMES
+    pointCloud.save_averages_to_csv(pointCloudNumpy.calculate_averages(times, offsets, points), str(output))
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_stream_averages_matches_reference(tmp_path, workers):
+    output = tmp_path / 'averages.csv'
+    pointCloud.save_averages_to_csv(pointCloud.stream_averages(POINT_CLOUD_TXT, workers=workers), str(output))
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_write_averages_raises(tmp_path):
+    rows = pointCloud.write_averages(pointCloud.stream_averages(POINT_CLOUD_TXT), str(tmp_path / 'averages.csv'))
+    assert rows == SAMPLE_FRAMES
+    with pytest.raises(OSError):
+        pointCloud.write_averages(pointCloud.stream_averages(POINT_CLOUD_TXT), str(tmp_path / 'missing' / 'a.csv'))
+
+def test_stream_averages_quarantine(tmp_path):
+    output = tmp_path / 'averages.csv'
+    quarantine = frameValidation.Quarantine()
+    pointCloud.save_averages_to_csv(pointCloud.stream_averages(POINT_CLOUD_TXT, quarantine=quarantine, strict=True),
+                                    str(output))
+    assert quarantine.counts == SAMPLE_REJECTED
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_dump_json_matches_cleaned_json(tmp_path):
+    dump = tmp_path / 'dump.json'
+    list(pointCloud.stream_averages(POINT_CLOUD_TXT, json_file=str(dump)))
+    with open(dump, 'r') as file, open(POINT_CLOUD_CLEANED_JSON, 'r') as reference:
+        assert json.load(file) == json.load(reference)
+
+def test_continuous_time_rollover():
+    day = pointCloud.DAY_SECONDS
+    assert pointCloud.continuous_time(10.0, None) == 10.0
+    assert pointCloud.continuous_time(5.0, day - 1.0) == day + 5.0
+    assert pointCloud.continuous_time(99.0, 100.0) == 100.0  # linee non in ordine: il tempo non torna indietro
+    assert pointCloud.continuous_time(3.0, 2 * day + 10.0) == 2 * day + 10.0
+    assert pointCloud.continuous_time(3.0, 2 * day - 1.0) == 2 * day + 3.0
+
+@pytest.mark.parametrize('options', [(), ('--no-cache',), ('--no-cache', '--backend', 'numpy')])
+def test_cli_cache_matches_reference(tmp_path, cache_dir, options):
+    """Prima esecuzione (cache vuota), seconda (dalla cache) e senza cache danno lo stesso CSV."""
+    pytest.importorskip('numpy')
+    for output in ('first.csv', 'second.csv'):
+        subprocess.run([sys.executable, 'pointCloud.py', POINT_CLOUD_TXT, str(tmp_path / output), *options],
+                       cwd=ROOT, check=True)
+        assert read_rows(tmp_path / output) == read_rows(POINT_CLOUD_CSV)
+
+@pytest.mark.parametrize('options', [('--backend', 'python'), ('--backend', 'numpy'), ('--workers', '2')])
+def test_cli_explicit_backend_skips_cache(tmp_path, cache_dir, options):
+    """Un backend o più processi scelti esplicitamente non vengono sostituiti dalla cache."""
+    pytest.importorskip('numpy')
+    output = tmp_path / 'averages.csv'
+    subprocess.run([sys.executable, 'pointCloud.py', POINT_CLOUD_TXT, str(output), *options],
+                   cwd=ROOT, check=True, capture_output=True)
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+    assert not os.path.exists(cache_dir)
+
+@pytest.mark.parametrize('options', [(), ('--backend', 'numpy')])
+def test_cli_quarantine_file(tmp_path, cache_dir, options):
+    pytest.importorskip('numpy')
+    output = tmp_path / 'averages.csv'
+    quarantine = tmp_path / 'quarantine.csv'
+    subprocess.run([sys.executable, 'pointCloud.py', POINT_CLOUD_TXT, str(output), '--quarantine', str(quarantine),
+                    *options], cwd=ROOT, check=True, capture_output=True)
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+    rows = read_rows(quarantine)
+    assert rows[0] == frameValidation.QUARANTINE_FIELDS
+    assert sorted(row[1] for row in rows[1:]) == sorted(SAMPLE_REJECTED)
+
+def test_cli_precision_uses_unrounded_coordinates(tmp_path, cache_dir):
+    np = pytest.importorskip('numpy')
+    import pointCloudNumpy
+    output = tmp_path / 'averages.csv'
+    subprocess.run([sys.executable, 'pointCloud.py', POINT_CLOUD_TXT, str(output), '--precision', '4'],
+                   cwd=ROOT, check=True, capture_output=True)
+    rows = read_rows(output)[1:]
+    times, offsets, points = pointCloudNumpy.load_capture(POINT_CLOUD_TXT)
+    assert [row[0] for row in rows] == times.tolist()
+    for row, start, end in zip(rows, offsets[:-1], offsets[1:]):
+        frame = points[start:end]
+        with np.errstate(invalid='ignore'):
+            xyz = np.column_stack([frame[axis].astype(np.float64) for axis in ('x', 'y', 'z')])
+            xyz = xyz[(np.abs(xyz) <= 10).all(axis=1)]
+        if len(xyz):
+            assert [float(value) for value in row[1:]] == pytest.approx(xyz.mean(axis=0).tolist(), abs=1e-4)
+        else:
+            assert row[1:] == ['', '', '']
+
+def test_parquet_output(tmp_path):
+    pytest.importorskip('numpy')
+    parquet = pytest.importorskip('pyarrow.parquet')
+    output = tmp_path / 'averages.parquet'
+    pointCloud.save_averages_to_csv(pointCloud.stream_averages(POINT_CLOUD_TXT), str(output))
+    table = parquet.read_table(output).to_pydict()
+    reference = read_rows(POINT_CLOUD_CSV)[1:]
+    assert table['time'] == [row[0] for row in reference]
+    assert table['average_x'] == [float(row[1]) if row[1] else None for row in reference]
+
+def test_follow_appends_only_new_lines(tmp_path):
+    """La modalità follow, con il file scritto a pezzi e una linea incompleta, dà lo stesso CSV."""
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        data = file.read()
+    source = tmp_path / 'live.txt'
+    output = tmp_path / 'averages.csv'
+    cut = data.index(b'\n', len(data) // 3) + 1
+    for end in (cut + 50, len(data) * 2 // 3, len(data)):
+        source.write_bytes(data[:end])
+        pointCloud.update_averages(str(source), str(output))
+    assert pointCloud.update_averages(str(source), str(output)) == 0
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+
+def test_follow_restarts_on_truncated_file(tmp_path):
+    source = tmp_path / 'live.txt'
+    output = tmp_path / 'averages.csv'
+    shutil.copy(POINT_CLOUD_TXT, source)
+    pointCloud.update_averages(str(source), str(output))
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        head = b''.join(file.readlines()[:10])
+    source.write_bytes(head)
+    pointCloud.update_averages(str(source), str(output))
+    rows = read_rows(output)
+    assert rows[0] == ['time', 'average_x', 'average_y', 'average_z']
+    assert len(rows) == 1 + sum(1 for line in head.splitlines() if pointCloud.decode_line(line))
+
+@pytest.mark.parametrize('options', [
+    ('--follow', '--quarantine', 'q.csv'),
+    ('--follow', '--format', 'parquet'),
+    ('--follow', '--dump-json', 'dump.json'),
+    ('--precision', '3', '--dump-json', 'dump.json'),
+    ('--backend', 'numpy', '--workers', '2'),
+    ('--precision', '3', '--backend', 'python'),
+])
+def test_check_arguments_rejects_ignored_options(options):
+    with pytest.raises(SystemExit):
+        parse('input.txt', 'output.csv', *options)
+
+def test_check_arguments_accepts_supported_options():
+    assert parse('input.txt', 'output.csv', '--backend', 'numpy', '--precision', '3').precision == 3
+    assert parse('input.txt', 'output.csv', '--workers', '2', '--dump-json', 'dump.json').workers == 2
+
+def test_profile_does_not_change_output(tmp_path, cache_dir):
+    output = tmp_path / 'averages.csv'
+    report = tmp_path / 'profile.json'
+    subprocess.run([sys.executable, 'pointCloud.py', POINT_CLOUD_TXT, str(output), '--no-cache',
+                    '--profile-json', str(report)], cwd=ROOT, check=True, capture_output=True)
+    assert read_rows(output) == read_rows(POINT_CLOUD_CSV)
+    with open(report, 'r') as file:
+        stages = {stage['name']: stage for stage in json.load(file)['stages']}
+    assert stages['decode']['items'] == stages['averages']['items'] == SAMPLE_FRAMES
+    assert stages['read']['bytes'] == os.path.getsize(POINT_CLOUD_TXT)
@@ -0,0 +1,68 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import pointCloudNumpy  # noqa: E402
+import pointReduction  # noqa: E402
+
+def random_points(rng, counts):
+    points = np.zeros(sum(counts), dtype=pointCloudNumpy.POINT_DTYPE)
+    for axis in ('x', 'y', 'z'):
+        points[axis] = rng.uniform(-1, 1, len(points))
+    points['v'] = rng.integers(0, 256, len(points))
+    points['snr'] = rng.uniform(0, 20, len(points))
+    points['pow'] = rng.uniform(0, 60, len(points))
+    points['dpk'] = rng.uniform(0, 5, len(points))
+    return pointCloudNumpy.counts_to_offsets(counts), points
+
+def test_voxel_grid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    counts = [40, 0, 25, 60]
+    offsets, points = random_points(rng, counts)
+    reduced_offsets, reduced = pointReduction.voxel_grid(offsets, points, 0.5)
+    for frame in range(len(counts)):
+        voxels = {}
+        for point in points[offsets[frame]:offsets[frame + 1]]:
+            key = tuple(np.floor(np.array([point['x'], point['y'], point['z']], dtype=np.float64) / 0.5).astype(int))
+            voxels.setdefault(key, []).append(point)
+        expected = []
+        for key in sorted(voxels):
+            members = voxels[key]
+            best = max(members, key=lambda point: point['snr'])
+            expected.append((*(np.mean([float(p[axis]) for p in members]) for axis in ('x', 'y', 'z')),
+                             best['v'], max(p['snr'] for p in members), max(p['pow'] for p in members),
+                             np.mean([float(p['dpk']) for p in members])))
+        got = reduced[reduced_offsets[frame]:reduced_offsets[frame + 1]]
+        assert len(got) == len(expected)
+        for point, values in zip(got.tolist(), expected):
+            assert point == pytest.approx(values, rel=1e-6)
+
+def test_voxel_v_ignores_nan_snr():
+    points = np.zeros(3, dtype=pointCloudNumpy.POINT_DTYPE)
+    points['v'] = [10, 20, 30]
+    points['snr'] = [5.0, np.nan, 4.0]
+    _, reduced = pointReduction.voxel_grid(np.array([0, 3]), points, 1.0)
+    assert reduced['v'].tolist() == [10]
+
+def test_decimate():
+    offsets = pointCloudNumpy.counts_to_offsets([2, 3, 1, 4, 0])
+    points = np.zeros(10, dtype=pointCloudNumpy.POINT_DTYPE)
+    points['v'] = np.arange(10)
+    kept, new_offsets, kept_points = pointReduction.decimate(offsets, points, 2)
+    assert kept.tolist() == [0, 2, 4]
+    assert new_offsets.tolist() == [0, 2, 3, 3]
+    assert kept_points['v'].tolist() == [0, 1, 5]
+    with pytest.raises(ValueError):
+        pointReduction.decimate(offsets, points, 0)
+
+def test_reduce_capture_report(d2_capture):
+    full = pointCloudNumpy.load_capture(d2_capture, point_length=True)
+    times, offsets, points, kept = pointReduction.reduce_capture(*full, voxel=0.2, min_snr=5, step=2)
+    assert times.tolist() == full[0][::2].tolist()
+    assert (points['snr'] >= 5).all()
+    report = pointReduction.reduction_report(full, (times, offsets, points), kept)
+    assert report['frames_kept'] == 20
+    assert report['points_kept'] == len(points) < report['points']
+    assert report['bytes_kept'] == len(points) * pointCloudNumpy.POINT_DTYPE.itemsize
+    assert report['compression_ratio'] == round(report['points'] / len(points), 3)
+    assert report['centroid_error_mean'] <= report['centroid_error_p95'] <= report['centroid_error_max']
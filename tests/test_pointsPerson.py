@@ -0,0 +1,170 @@
+import argparse
+import csv
+import subprocess
+import sys
+
+import pytest
+
+import frameValidation
+import pointsPerson
+from conftest import PERSONS_CSV, PERSONS_TXT, ROOT, SAMPLE_REJECTED, generate, latin1_open
+
+COORDINATES = ('X', 'Y', 'Z', 'Vx', 'Vy', 'Vz')
+
+def parse(*argv):
+    parser = argparse.ArgumentParser()
+    pointsPerson.add_arguments(parser)
+    args = parser.parse_args([str(arg) for arg in argv])
+    pointsPerson.check_arguments(parser, args)
+    return args
+
+def read_dicts(path):
+    with open(path, 'r', newline='') as file:
+        return list(csv.DictReader(file, delimiter=';'))
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_legacy_flow_matches_reference(tmp_path, monkeypatch, workers):
+    """preprocess_file -> process_txt_to_csv -> apply_functions_to_csv come negli esempi di results/pointsPersons."""
+    latin1_open(monkeypatch, pointsPerson)
+    monkeypatch.setattr(pointsPerson.locale, 'getpreferredencoding', lambda do_setlocale=True: 'latin-1')
+    cleaned = tmp_path / 'cleaned.txt'
+    intermediate = tmp_path / 'intermediate.csv'
+    output = tmp_path / 'output.csv'
+    pointsPerson.preprocess_file(PERSONS_TXT, str(cleaned))
+    pointsPerson.process_txt_to_csv(str(cleaned), str(intermediate), 'd2', workers)
+    pointsPerson.apply_functions_to_csv(str(intermediate), str(output))
+    with open(output, 'r', newline='') as file, open(PERSONS_CSV, 'r', newline='') as reference:
+        assert list(csv.reader(file, delimiter=';')) == list(csv.reader(reference, delimiter=';'))
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_streaming_wide_matches_reference(tmp_path, workers):
+    """Il CSV in streaming ha sempre MAX_PERSONS persone e celle vuote dove lo storico scriveva 'None'."""
+    output = tmp_path / 'output.csv'
+    pointsPerson.process_txt_to_person_csv(PERSONS_TXT, str(output), 'd2', workers)
+    rows = read_dicts(output)
+    reference = read_dicts(PERSONS_CSV)
+    assert len(rows) == len(reference)
+    for row, expected in zip(rows, reference):
+        assert {field: row[field] for field in expected} == \
+               {field: '' if value == 'None' else value for field, value in expected.items()}
+
+@pytest.mark.parametrize('source, mode', [('sample', 'd2'), ('d2', 'd2'), ('d3', 'd3')])
+def test_wide_and_long_formats_agree(tmp_path, source, mode):
+    """Stesse persone nei due formati (l'ID del formato wide è quello storico di `function3`, non confrontabile).
+
+    Le acquisizioni sintetiche contengono il frame con CurrentFrame 2, cioè '02 00 00 00' nell'header."""
+    source = PERSONS_TXT if source == 'sample' else generate(tmp_path / 'capture.txt', source, persons=3)
+    wide = tmp_path / 'wide.csv'
+    long = tmp_path / 'long.csv'
+    assert pointsPerson.process_txt_to_person_csv(source, str(wide), 'auto') == mode
+    pointsPerson.save_person_tracks_csv(pointsPerson.iter_person_frames(source), str(long))
+    expected = []
+    for row in read_dicts(wide):
+        for i in range(1, int(row['NumPeople']) + 1):
+            expected.append([row['Time'], row['NumPeople']] + [row[f'{field}{i}'] for field in COORDINATES])
+    tracks = read_dicts(long)
+    assert expected
+    assert [[track['Time'], track['NumPeople']] + [track[field] for field in COORDINATES] for track in tracks] == expected
+
+def test_auto_mode_reads_the_file_once(tmp_path, d2_capture, monkeypatch):
+    """La modalità si riconosce dai frame della lettura principale, senza `frameParser.detect_mode`."""
+    import frameParser
+    monkeypatch.setattr(frameParser, 'detect_mode', None)
+    output = tmp_path / 'auto.csv'
+    reference = tmp_path / 'd2.csv'
+    pointsPerson.run(parse(d2_capture, 'auto', '--output', output))
+    pointsPerson.process_txt_to_person_csv(d2_capture, str(reference), 'd2')
+    assert output.read_bytes() == reference.read_bytes()
+
+def test_person_track_writer_rows(tmp_path, d2_capture):
+    """Il writer a blocchi scrive una riga per persona con TRACK_PRECISION decimali."""
+    output = tmp_path / 'long.csv'
+    frames = list(pointsPerson.iter_person_frames(d2_capture))
+    pointsPerson.save_person_tracks_csv(frames, str(output))
+    with open(output, 'r', newline='') as file:
+        rows = list(csv.reader(file, delimiter=';'))
+    expected = [[time, str(frame), str(len(persons)), str(person.id)] +
+                [f'{value:.2f}' for value in (person.x, person.y, person.z, person.vx, person.vy, person.vz)]
+                for time, frame, persons in frames for person in persons]
+    assert rows[0] == pointsPerson.PERSON_TRACK_FIELDS
+    assert rows[1:] == expected
+
+def test_decode_persons_array_matches_decode_persons():
+    np = pytest.importorskip('numpy')
+    import streamIngest
+    for _, payload in streamIngest.log_frames(PERSONS_TXT):
+        persons = pointsPerson.decode_persons(payload)
+        array = pointsPerson.decode_persons_array(payload)
+        assert array['id'].tolist() == [person.id for person in persons]
+        assert np.array_equal(array['x'], np.array([person.x for person in persons], dtype=np.float32))
+
+def test_long_format_quarantine(tmp_path):
+    output = tmp_path / 'output.csv'
+    quarantine = tmp_path / 'quarantine.csv'
+    expected = tmp_path / 'expected.csv'
+    subprocess.run([sys.executable, 'pointsPerson.py', PERSONS_TXT, '--format', 'long', '--output', str(output),
+                    '--quarantine', str(quarantine)], cwd=ROOT, check=True, capture_output=True)
+    pointsPerson.save_person_tracks_csv(pointsPerson.iter_person_frames(PERSONS_TXT), str(expected))
+    assert read_dicts(output) == read_dicts(expected)
+    assert sorted(row['reason'] for row in read_dicts(quarantine)) == sorted(SAMPLE_REJECTED)
+
+def test_wide_format_quarantine(tmp_path):
+    output = tmp_path / 'output.csv'
+    quarantine = tmp_path / 'quarantine.csv'
+    subprocess.run([sys.executable, 'pointsPerson.py', PERSONS_TXT, '--output', str(output), '--quarantine',
+                    str(quarantine)], cwd=ROOT, check=True, capture_output=True)
+    rows = read_dicts(output)
+    reference = read_dicts(PERSONS_CSV)
+    assert len(rows) == len(reference)
+    assert sorted(row['reason'] for row in read_dicts(quarantine)) == sorted(SAMPLE_REJECTED)
+
+@pytest.mark.parametrize('strict', [True, False])
+def test_truncated_frame_is_quarantined(tmp_path, d3_capture, strict):
+    """Un frame troncato nel mezzo del TLV2 non deve far fallire la conversione nel formato wide:
+    con `strict` viene scartato, altrimenti le colonne incomplete restano come nel testo."""
+    with open(d3_capture, 'rb') as file:
+        lines = file.readlines()
+    lines[0] = lines[0][:lines[0].rindex(b' ', 0, len(lines[0]) * 2 // 3)] + b'\n'
+    source = tmp_path / 'truncated.txt'
+    source.write_bytes(b''.join(lines))
+    output = tmp_path / 'output.csv'
+    quarantine = frameValidation.Quarantine()
+    pointsPerson.process_txt_to_person_csv(str(source), str(output), 'd3', quarantine=quarantine, strict=strict)
+    assert quarantine.counts == ({frameValidation.TRUNCATED: 1} if strict else {})
+    assert len(read_dicts(output)) == len(lines) - strict
+
+@pytest.mark.parametrize('options', [
+    ('--format', 'long', '--workers', '2'),
+    ('--precision', '3'),
+    ('--format', 'wide', '--no-cache'),
+    ('--cache-dir', 'cache'),
+])
+def test_check_arguments_rejects_ignored_options(options):
+    with pytest.raises(SystemExit):
+        parse('input.txt', *options)
+
+def test_check_arguments_accepts_supported_options():
+    assert parse('input.txt', '--workers', '2', '--quarantine', 'q.csv').workers == 2
+    args = parse('input.txt', '--format', 'long', '--precision', '3', '--no-cache', '--cache-dir', 'cache')
+    assert args.precision == 3
+
+def test_profile_does_not_change_output(tmp_path):
+    import stageProfiler
+    profiled = tmp_path / 'profiled.csv'
+    plain = tmp_path / 'plain.csv'
+    profiler = stageProfiler.Profiler()
+    pointsPerson.process_txt_to_person_csv(PERSONS_TXT, str(profiled), 'd2', profiler=profiler)
+    pointsPerson.process_txt_to_person_csv(PERSONS_TXT, str(plain), 'd2')
+    assert read_dicts(profiled) == read_dicts(plain)
+    stages = {stage['name']: stage for stage in profiler.report()['stages']}
+    assert stages['convert']['items'] == len(read_dicts(plain))
+    assert stages['read']['items'] == stages['convert']['items'] + profiler.counters['skipped_lines']
+
+def test_cli_detects_mode(tmp_path, d3_capture):
+    """Senza modalità lo script la riconosce dai frame: DEBUG 3 per un log senza punti."""
+    detected = tmp_path / 'detected.csv'
+    explicit = tmp_path / 'explicit.csv'
+    subprocess.run([sys.executable, 'pointsPerson.py', d3_capture, '--output', str(detected)], cwd=ROOT, check=True)
+    pointsPerson.process_txt_to_person_csv(d3_capture, str(explicit), 'd3')
+    assert read_dicts(detected) == read_dicts(explicit)
+    assert len(read_dicts(detected)) == 40
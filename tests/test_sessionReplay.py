@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+import frameParser
+import sessionReplay
+import streamIngest
+
+class FakeClock:
+    """Orologio monotono finto: `sleep` fa avanzare il tempo invece di attendere."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def chunked_reader(data, size):
+    stream = io.BytesIO(data)
+    return lambda _: stream.read(size)
+
+def test_record_roundtrip(tmp_path, d2_capture):
+    frames = list(streamIngest.log_frames(d2_capture))
+    recording = tmp_path / 'session.rec'
+    assert sessionReplay.record(frames, str(recording)) == len(frames)
+    assert sessionReplay.is_recording(str(recording))
+    assert list(sessionReplay.session_frames(str(recording))) == frames
+    assert not sessionReplay.is_recording(d2_capture)
+    assert list(sessionReplay.session_frames(d2_capture)) == frames
+
+def test_recording_truncated_tail_is_ignored(tmp_path, d2_capture):
+    frames = list(streamIngest.log_frames(d2_capture))
+    recording = tmp_path / 'session.rec'
+    sessionReplay.record(frames, str(recording))
+    data = recording.read_bytes()
+    recording.write_bytes(data[:-10])
+    assert list(sessionReplay.recording_frames(str(recording))) == frames[:-1]
+
+def test_recording_frames_rejects_other_files(d2_capture):
+    with pytest.raises(ValueError):
+        list(sessionReplay.recording_frames(d2_capture))
+
+def test_schedule_waits_for_timestamps():
+    clock = FakeClock()
+    schedule = sessionReplay.Schedule(speed=2, sleep=clock.sleep, monotonic=clock.monotonic)
+    frames = [('10:00:00.000', b'a'), ('10:00:01.000', b'b'), ('10:00:03.000', b'c')]
+    released = []
+    for time, payload in schedule(frames):
+        released.append((clock.now - 100.0, payload))
+    assert released == [(0.0, b'a'), (0.5, b'b'), (1.5, b'c')]
+    assert schedule.frames == 3
+    assert schedule.session_seconds == 3.0
+
+def test_schedule_crosses_midnight():
+    clock = FakeClock()
+    schedule = sessionReplay.Schedule(speed=1, sleep=clock.sleep, monotonic=clock.monotonic)
+    list(schedule([('23:59:59.500', b'a'), ('00:00:00.250', b'b')]))
+    assert clock.sleeps == [pytest.approx(0.75)]
+    assert schedule.session_seconds == pytest.approx(0.75)
+
+def test_schedule_out_of_order_frame_does_not_wait_a_day():
+    clock = FakeClock()
+    schedule = sessionReplay.Schedule(speed=1, sleep=clock.sleep, monotonic=clock.monotonic)
+    list(schedule([('10:00:01.000', b'a'), ('10:00:00.600', b'b'), ('10:00:01.400', b'c')]))
+    assert clock.sleeps == [pytest.approx(0.4)]
+    assert schedule.session_seconds == pytest.approx(0.4)
+
+def test_schedule_records_lag():
+    clock = FakeClock()
+
+    def slow_sleep(seconds):
+        clock.sleep(seconds + 0.2)  # il sistema si sveglia in ritardo
+
+    schedule = sessionReplay.Schedule(speed=1, sleep=slow_sleep, monotonic=clock.monotonic)
+    list(schedule([('10:00:00.000', b'a'), ('10:00:01.000', b'b'), ('10:00:01.100', b'c')]))
+    assert clock.sleeps == [pytest.approx(1.2)]
+    assert schedule.max_lag == pytest.approx(0.1)
+
+def test_schedule_rejects_negative_speed():
+    with pytest.raises(ValueError):
+        sessionReplay.Schedule(speed=-1)
+
+def test_replay_to_skips_truncated_frames(tmp_path, d2_capture):
+    frames = list(streamIngest.log_frames(d2_capture))
+    frames[3] = (frames[3][0], frames[3][1][:-10])
+    recording = tmp_path / 'session.rec'
+    sessionReplay.record(frames, str(recording))
+    written = []
+    schedule = sessionReplay.replay_to(str(recording), written.append, speed=0)
+    assert schedule.skipped == 1
+    assert written == [payload for i, (_, payload) in enumerate(frames) if i != 3]
+    assert list(streamIngest.iter_raw_frames(chunked_reader(b''.join(written), 64))) == written
+
+def test_replay_to_stops_on_closed_consumer(d2_capture):
+    written = []
+
+    def write(payload):
+        if len(written) == 3:
+            raise BrokenPipeError
+        written.append(payload)
+
+    schedule = sessionReplay.replay_to(d2_capture, write, speed=0)
+    assert schedule.closed
+    assert schedule.frames == 3
+
+def test_replay_decodes_frames(d2_capture):
+    replayed = list(sessionReplay.replay(d2_capture, speed=0))
+    parsed = list(frameParser.iter_frames(d2_capture))
+    assert [frame['time'] for frame in replayed] == [time for time, _ in parsed]
+    assert [frame['points'] for frame in replayed] == [frame['points'] for _, frame in parsed]
+
+def test_to_pipe(tmp_path, d2_capture):
+    output = tmp_path / 'pipe.bin'
+    schedule = sessionReplay.to_pipe(d2_capture, str(output), speed=0)
+    assert not schedule.closed
+    assert output.read_bytes() == b''.join(payload for _, payload in streamIngest.log_frames(d2_capture))
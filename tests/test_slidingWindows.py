@@ -0,0 +1,66 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import pointCloud  # noqa: E402
+import slidingWindows  # noqa: E402
+from conftest import frame_times  # noqa: E402
+
+def person(x, y, vx=0.0, vy=0.0):
+    return (x, y, 1.5, vx, vy, 0.0)
+
+def test_window_sums_match_brute_force():
+    rng = np.random.default_rng(0)
+    zones = {'sinistra': (-5.0, -5.0, 0.0, 5.0), 'destra': (0.0, -5.0, 5.0, 5.0)}
+    aggregator = slidingWindows.WindowAggregator(windows=(2.0,), zones=zones)
+    history = []
+    for time in frame_times('10:00:00.000', 80):
+        detections = [person(*rng.uniform(-4, 4, 2), *rng.uniform(-1, 1, 2)) for _ in range(rng.integers(0, 4))]
+        seconds = pointCloud.time_to_seconds(time)
+        history.append((seconds, detections))
+        rows = aggregator.update(time, detections)
+        window = [(s, d) for s, d in history if s > seconds - 2.0]
+        for row in rows:
+            xmin, _, xmax, _ = zones[row['zone']]
+            inside = [p for _, d in window for p in d if xmin <= p[0] < xmax]
+            assert row['frames'] == len(window)
+            assert row['occupancy'] == round(len(inside) / len(window), 2)
+            if inside:
+                assert row['x'] == pytest.approx(np.mean([p[0] for p in inside]), abs=0.006)
+                assert row['speed'] == pytest.approx(np.mean([np.hypot(p[3], p[4]) for p in inside]), abs=0.006)
+            else:
+                assert row['x'] is None
+
+def test_midnight_rollover():
+    """Dopo la mezzanotte la finestra contiene ancora i frame del giorno prima."""
+    aggregator = slidingWindows.WindowAggregator(windows=(10.0,))
+    for time in frame_times('23:59:55.000', 25):
+        rows = aggregator.update(time, [person(0.5, 0.5)])
+    assert time == '00:00:04.600'
+    assert rows[0]['frames'] == 25
+    assert rows[0]['dwell'] == pytest.approx(9.6)
+
+def test_every_limits_rows():
+    aggregator = slidingWindows.WindowAggregator(windows=(1.0,))
+    frames = [(time, [person(0.5, 0.5)]) for time in frame_times('10:00:00.000', 30)]
+    rows = list(slidingWindows.iter_window_rows(frames, aggregator, every=2.0))
+    assert [row['time'] for row in rows] == ['10:00:00.000', '10:00:02.000', '10:00:04.000', '10:00:06.000',
+                                             '10:00:08.000', '10:00:10.000']
+def test_ring_window_rejects_non_positive_duration():
+    for duration in (0, -1):
+        with pytest.raises(ValueError):
+            slidingWindows.RingWindow(duration, (1, 7))
+    with pytest.raises(ValueError):
+        slidingWindows.WindowAggregator(windows=(1.0, 0.0))
+
+def test_dwell_is_clipped_to_window():
+    """Con una persona sempre presente la permanenza nella finestra non supera la sua durata."""
+    aggregator = slidingWindows.WindowAggregator(windows=(1.0, 10.0))
+    dwell = {}
+    for time in frame_times('10:00:00.000', 60):
+        for row in aggregator.update(time, [person(0.5, 0.5)]):
+            dwell.setdefault(row['window'], []).append(row['dwell'])
+    assert max(dwell['1s']) == pytest.approx(1.0)
+    assert dwell['1s'][-1] == pytest.approx(1.0)
+    assert max(dwell['10s']) == pytest.approx(10.0)
+
@@ -0,0 +1,43 @@
+import io
+import json
+
+import stageProfiler
+
+def test_wrap_counts_items_and_bytes():
+    profiler = stageProfiler.Profiler()
+    lines = profiler.wrap('read', [b'abc', b'de'], size=len)
+    lengths = profiler.wrap('decode', (len(line) for line in lines), upstream='read')
+    assert list(lengths) == [3, 2]
+    stages = {stage['name']: stage for stage in profiler.report()['stages']}
+    assert [stage['name'] for stage in profiler.report()['stages']] == ['read', 'decode']
+    assert (stages['read']['items'], stages['read']['bytes']) == (2, 5)
+    assert stages['decode']['items'] == 2
+    assert stages['decode']['exclusive_seconds'] <= stages['decode']['seconds']
+
+def test_null_profiler_returns_iterable_unchanged():
+    rows = [1, 2, 3]
+    assert stageProfiler.NULL_PROFILER.wrap('read', rows) is rows
+    with stageProfiler.NULL_PROFILER.stage('write_csv'):
+        stageProfiler.NULL_PROFILER.count('skipped_lines')
+
+def test_counters_and_summary(tmp_path):
+    profiler = stageProfiler.Profiler()
+    profiler.count('skipped_lines')
+    profiler.count('skipped_lines', 2)
+    with profiler.stage('write_csv'):
+        pass
+    profiler.add('write_csv', items=4, size=10)
+    summary = io.StringIO()
+    profiler.print_summary(summary)
+    assert 'skipped_lines: 3' in summary.getvalue()
+    report = tmp_path / 'profile.json'
+    profiler.save(str(report))
+    with open(report, 'r') as file:
+        saved = json.load(file)
+    assert saved['counters'] == {'skipped_lines': 3}
+    assert saved['stages'][0]['items'] == 4
+
+def test_peak_rss():
+    """None dove il modulo resource non esiste (Windows)."""
+    peak = stageProfiler.peak_rss_mb()
+    assert peak is None or peak > 0
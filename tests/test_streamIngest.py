@@ -0,0 +1,50 @@
+import csv
+import io
+
+import pointCloud
+import streamIngest
+from conftest import POINT_CLOUD_CSV, POINT_CLOUD_TXT, SAMPLE_FRAMES
+
+def chunked_reader(data, size):
+    stream = io.BytesIO(data)
+    return lambda _: stream.read(size)
+
+def sample_payloads():
+    return [payload for _, payload in streamIngest.log_frames(POINT_CLOUD_TXT)]
+
+def test_log_frames_sample():
+    assert len(sample_payloads()) == SAMPLE_FRAMES
+
+def test_iter_raw_frames_resyncs():
+    """Frame letti a pezzi, con bytes spuri e un header con lunghezza non plausibile in mezzo."""
+    payloads = sample_payloads()
+    bogus = streamIngest.FRAME_MAGIC + (10).to_bytes(4, 'little')
+    data = b'rumore' + payloads[0] + bogus + payloads[1] + b'\x01\x02\x03' + b''.join(payloads[2:])
+    for size in (1, 7, 4096):
+        assert list(streamIngest.iter_raw_frames(chunked_reader(data, size))) == payloads
+
+def test_iter_raw_frames_drops_incomplete_tail():
+    payloads = sample_payloads()
+    data = b''.join(payloads) + payloads[0][:30]
+    assert list(streamIngest.iter_raw_frames(chunked_reader(data, 100))) == payloads
+
+def test_decode_frame_stops_at_point_length():
+    """Solo i record entro PointL sono punti: il resto del frame è il TLV2 delle persone.
+
+    Confronto con `repr`: alcuni punti del file di esempio hanno coordinate NaN."""
+    with open(POINT_CLOUD_TXT, 'rb') as file:
+        decoded = [result for result in map(pointCloud.decode_line, file) if result]
+    for (time, points), (log_time, payload) in zip(decoded, streamIngest.log_frames(POINT_CLOUD_TXT)):
+        frame = streamIngest.decode_frame(payload, log_time)
+        count = int.from_bytes(payload[20:24], 'little') // pointCloud.POINT_RECORD.size
+        assert frame['time'] == time
+        assert repr(frame['points']) == repr(points[:count])
+
+def test_live_averages_sample(tmp_path):
+    """Una riga per frame (le medie usano solo i punti entro PointL, quindi differiscono dal CSV storico)."""
+    output = tmp_path / 'averages.csv'
+    frames = (streamIngest.decode_frame(payload, time) for time, payload in streamIngest.log_frames(POINT_CLOUD_TXT))
+    streamIngest.save_live_averages(frames, str(output))
+    with open(output, 'r', newline='') as file, open(POINT_CLOUD_CSV, 'r', newline='') as reference:
+        assert [row[0] for row in csv.reader(file, delimiter=';')] == \
+               [row[0] for row in csv.reader(reference, delimiter=';')]
@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import tracker  # noqa: E402
+from conftest import frame_times  # noqa: E402
+
+def walk(start, velocity, frames, dt=0.4):
+    return [np.array(start) + np.array(velocity) * dt * i for i in range(frames)]
+
+@pytest.mark.parametrize('assignment', tracker.ASSIGNMENTS)
+def test_two_targets_keep_their_ids(assignment):
+    """Due persone che si incrociano: ogni traccia resta sulla sua persona."""
+    if assignment == 'hungarian':
+        pytest.importorskip('scipy')
+    rng = np.random.default_rng(0)
+    first = walk((-2.0, 0.0, 1.5), (0.8, 0.1, 0.0), 30)
+    second = walk((2.0, 0.5, 1.5), (-0.8, 0.0, 0.0), 30)
+    model = tracker.Tracker(assignment=assignment)
+    owners = {}
+    for time, a, b in zip(frame_times('10:00:00.000', 30), first, second):
+        detections = np.array([a, b]) + rng.normal(0, 0.03, (2, 3))
+        order = rng.permutation(2)  # l'ordine delle rilevazioni non conta
+        for track, x, y, z, *_ in model.step(time, detections[order]):
+            person = int(np.argmin([np.linalg.norm(np.array((x, y, z)) - p) for p in (a, b)]))
+            owners.setdefault(track, set()).add(person)
+    assert len(owners) == 2
+    assert all(len(persons) == 1 for persons in owners.values())
+
+def test_velocity_is_estimated():
+    model = tracker.Tracker()
+    for time, position in zip(frame_times('10:00:00.000', 20), walk((0.0, 0.0, 1.0), (0.5, -0.25, 0.0), 20)):
+        tracks = model.step(time, [position])
+    _, _, _, _, vx, vy, vz = tracks[0]
+    assert (vx, vy, vz) == pytest.approx((0.5, -0.25, 0.0), abs=0.05)
+
+def test_track_closes_after_misses():
+    model = tracker.Tracker(max_misses=2)
+    for time in frame_times('10:00:00.000', 3):
+        model.step(time, [(0.0, 0.0, 1.0)])
+    for time in frame_times('10:00:01.200', 3):
+        assert model.step(time, []) == []
+    assert not model.active.any()
+    assert model.step('10:00:02.400', [(0.0, 0.0, 1.0)]) == []  # nuova traccia, non ancora confermata
+    assert model.next_id == 2
+
+def test_midnight_elapsed():
+    model = tracker.Tracker()
+    model.step('23:59:59.800', [(0.0, 0.0, 1.0)])
+    assert model._elapsed('00:00:00.200') == pytest.approx(0.4)
+
+def test_out_of_order_line_is_not_a_new_day():
+    model = tracker.Tracker()
+    model.step('10:00:01.000', [(0.0, 0.0, 1.0)])
+    assert model._elapsed('10:00:00.600') == 0.0
+    assert model._elapsed('10:00:01.400') == pytest.approx(0.4)
+
+def test_invalid_assignment():
+    with pytest.raises(ValueError):
+        tracker.Tracker(assignment='optimal')
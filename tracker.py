@@ -0,0 +1,194 @@
+import argparse
+import csv
+
+import numpy as np
+
+import pointCloud
+
+# Tracker multi-target in linea: ogni traccia è un filtro di Kalman a velocità costante (x, y, z, vx, vy, vz).
+# A ogni frame le tracce vengono predette, associate alle rilevazioni più vicine entro un gate e aggiornate;
+# le rilevazioni non associate aprono nuove tracce. Lo stato di tutte le tracce sta in array preallocati,
+# quindi il costo per frame non dipende da quanto è lunga l'acquisizione.
+
+# HOW to use this script > python tracker.py <input.txt> <tracce.csv> [--source persons|clusters] [--assignment greedy|hungarian]
+
+DEFAULT_MAX_TRACKS = 32
+DEFAULT_GATE = 1.0            # metri tra posizione predetta e rilevazione
+DEFAULT_MAX_MISSES = 5        # frame senza rilevazioni prima di chiudere una traccia
+DEFAULT_MIN_HITS = 2          # rilevazioni necessarie per confermare una traccia
+DEFAULT_PROCESS_NOISE = 1.0   # varianza dell'accelerazione (m/s^2)^2
+DEFAULT_MEASUREMENT_NOISE = 0.05  # varianza della posizione misurata (m^2)
+INITIAL_VELOCITY_VARIANCE = 1.0
+ASSIGNMENTS = ('greedy', 'hungarian')
+TRACK_FIELDS = ['time', 'frame', 'track', 'x', 'y', 'z', 'vx', 'vy', 'vz']
+
+def greedy_assignment(cost):
+    """Coppie (traccia, rilevazione) scelte in ordine di costo crescente; i costi infiniti sono esclusi."""
+    tracks, detections = [], []
+    used_tracks, used_detections = set(), set()
+    for index in np.argsort(cost, axis=None).tolist():
+        track, detection = divmod(index, cost.shape[1])
+        if not np.isfinite(cost[track, detection]):
+            break
+        if track in used_tracks or detection in used_detections:
+            continue
+        used_tracks.add(track)
+        used_detections.add(detection)
+        tracks.append(track)
+        detections.append(detection)
+    return np.array(tracks, dtype=np.int64), np.array(detections, dtype=np.int64)
+
+def hungarian_assignment(cost):
+    """Assegnamento ottimo con scipy (necessario solo per questa opzione), poi filtrato dal gate."""
+    from scipy.optimize import linear_sum_assignment
+    finite = np.where(np.isfinite(cost), cost, 1e9)
+    tracks, detections = linear_sum_assignment(finite)
+    keep = np.isfinite(cost[tracks, detections])
+    return tracks[keep], detections[keep]
+
+class Tracker:
+    """Tracker a velocità costante con un numero massimo di tracce fissato alla creazione."""
+
+    def __init__(self, max_tracks=DEFAULT_MAX_TRACKS, gate=DEFAULT_GATE, max_misses=DEFAULT_MAX_MISSES,
+                 min_hits=DEFAULT_MIN_HITS, process_noise=DEFAULT_PROCESS_NOISE,
+                 measurement_noise=DEFAULT_MEASUREMENT_NOISE, assignment='greedy'):
+        if assignment not in ASSIGNMENTS:
+            raise ValueError(f"Assegnamento non valido: {assignment} (ammessi: {', '.join(ASSIGNMENTS)})")
+        self.gate = gate
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.assign = greedy_assignment if assignment == 'greedy' else hungarian_assignment
+        self.state = np.zeros((max_tracks, 6))
+        self.covariance = np.zeros((max_tracks, 6, 6))
+        self.ids = np.full(max_tracks, -1, dtype=np.int64)
+        self.hits = np.zeros(max_tracks, dtype=np.int64)
+        self.misses = np.zeros(max_tracks, dtype=np.int64)
+        self.active = np.zeros(max_tracks, dtype=bool)
+        self.next_id = 0
+        self.last_time = None
+
+    def _elapsed(self, time):
+        """Secondi dal frame precedente, anche a cavallo della mezzanotte (vedi `pointCloud.continuous_time`)."""
+        seconds = pointCloud.continuous_time(pointCloud.time_to_seconds(time), self.last_time)
+        elapsed = 0.0 if self.last_time is None else seconds - self.last_time
+        self.last_time = seconds
+        return elapsed
+
+    def predict(self, dt):
+        slots = np.flatnonzero(self.active)
+        if len(slots) == 0 or dt == 0:
+            return
+        transition = np.eye(6)
+        transition[:3, 3:] = dt * np.eye(3)
+        noise = np.zeros((6, 6))
+        noise[:3, :3] = dt ** 4 / 4 * np.eye(3)
+        noise[:3, 3:] = noise[3:, :3] = dt ** 3 / 2 * np.eye(3)
+        noise[3:, 3:] = dt ** 2 * np.eye(3)
+        self.state[slots] = self.state[slots] @ transition.T
+        self.covariance[slots] = transition @ self.covariance[slots] @ transition.T + self.process_noise * noise
+
+    def correct(self, slots, positions):
+        """Aggiornamento di Kalman con la misura della sola posizione, per tutte le tracce insieme."""
+        covariance = self.covariance[slots]
+        innovation = covariance[:, :3, :3] + self.measurement_noise * np.eye(3)
+        gain = covariance[:, :, :3] @ np.linalg.inv(innovation)
+        residual = positions - self.state[slots, :3]
+        self.state[slots] += (gain @ residual[:, :, None])[:, :, 0]
+        self.covariance[slots] = covariance - gain @ covariance[:, :3, :]
+
+    def start(self, detections):
+        """Apre nuove tracce per le rilevazioni, finché ci sono posti liberi."""
+        slots = np.flatnonzero(~self.active)[:len(detections)]
+        detections = detections[:len(slots)]
+        self.state[slots] = 0.0
+        self.state[slots, :detections.shape[1]] = detections
+        self.covariance[slots] = np.diag([self.measurement_noise] * 3 + [INITIAL_VELOCITY_VARIANCE] * 3)
+        self.ids[slots] = np.arange(self.next_id, self.next_id + len(slots))
+        self.next_id += len(slots)
+        self.hits[slots] = 1
+        self.misses[slots] = 0
+        self.active[slots] = True
+
+    def step(self, time, detections):
+        """Elabora un frame. `detections` ha una riga per rilevazione: (x, y, z) o (x, y, z, vx, vy, vz),
+        la velocità è usata solo per inizializzare le nuove tracce.
+
+        Restituisce le tracce confermate aggiornate in questo frame: lista di (id, x, y, z, vx, vy, vz)."""
+        detections = np.asarray(detections, dtype=np.float64) if len(detections) else np.zeros((0, 3))
+        self.predict(self._elapsed(time))
+        slots = np.flatnonzero(self.active)
+        matched_slots = np.zeros(0, dtype=np.int64)
+        unmatched = np.ones(len(detections), dtype=bool)
+        if len(slots) and len(detections):
+            cost = np.sqrt(((self.state[slots, None, :3] - detections[None, :, :3]) ** 2).sum(axis=2))
+            cost[cost > self.gate] = np.inf
+            tracks, matches = self.assign(cost)
+            matched_slots = slots[tracks]
+            self.correct(matched_slots, detections[matches, :3])
+            unmatched[matches] = False
+
+        missed = np.setdiff1d(slots, matched_slots)
+        self.hits[matched_slots] += 1
+        self.misses[matched_slots] = 0
+        self.misses[missed] += 1
+        closed = missed[(self.misses[missed] > self.max_misses) | (self.hits[missed] < self.min_hits)]
+        self.active[closed] = False
+        self.start(detections[unmatched])
+
+        confirmed = matched_slots[self.hits[matched_slots] >= self.min_hits]
+        confirmed = confirmed[np.argsort(self.ids[confirmed])]
+        return [(track, *values) for track, values in zip(self.ids[confirmed].tolist(), self.state[confirmed].tolist())]
+
+def person_detections(input_file):
+    """Generatore di (time, frame, detections) dalle persone del TLV2 (posizione e velocità)."""
+    import pointsPerson
+    for time, frame, persons in pointsPerson.iter_person_frames(input_file):
+        yield time, frame, [(p.x, p.y, p.z, p.vx, p.vy, p.vz) for p in persons]
+
+def cluster_detections(input_file, eps=None, min_samples=None):
+    """Generatore di (time, frame, detections) dai centroidi dei cluster di `clustering`."""
+    import clustering
+    import pointCloudNumpy
+    times, offsets, points = pointCloudNumpy.load_capture(input_file, point_length=True)
+    _, clusters = clustering.cluster_capture(times, offsets, points, eps or clustering.DEFAULT_EPS,
+                                             min_samples or clustering.DEFAULT_MIN_SAMPLES)
+    centroids = np.column_stack([clusters['x'], clusters['y'], clusters['z']])
+    bounds = np.searchsorted(clusters['frame'], np.arange(len(times) + 1))
+    for i, time in enumerate(times.tolist()):
+        yield time, i, centroids[bounds[i]:bounds[i + 1]]
+
+def iter_tracks(frames, tracker):
+    """Righe del CSV delle tracce per ogni frame (time, frame, detections)."""
+    for time, frame, detections in frames:
+        for values in tracker.step(time, detections):
+            row = dict(zip(TRACK_FIELDS, [time, frame, values[0]]))
+            row.update((field, round(value, 2)) for field, value in zip(TRACK_FIELDS[3:], values[1:]))
+            yield row
+
+def save_tracks_to_csv(rows, output_file):
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=TRACK_FIELDS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Associa le rilevazioni tra i frame e assegna un ID stabile a ogni traccia.")
+    parser.add_argument('input_txt', type=str, help='Il file TXT di input da elaborare')
+    parser.add_argument('output_csv', type=str, help='Il file CSV con le tracce')
+    parser.add_argument('--source', choices=['persons', 'clusters'], default='persons',
+                        help='Rilevazioni da tracciare: persone del radar (DEBUG 2) o cluster della nuvola di punti')
+    parser.add_argument('--assignment', choices=ASSIGNMENTS, default='greedy', help="Algoritmo di associazione ('hungarian' richiede scipy)")
+    parser.add_argument('--gate', type=float, default=DEFAULT_GATE, help='Distanza massima tra traccia predetta e rilevazione, in metri')
+    parser.add_argument('--max-tracks', type=int, default=DEFAULT_MAX_TRACKS, help='Numero massimo di tracce contemporanee')
+    parser.add_argument('--max-misses', type=int, default=DEFAULT_MAX_MISSES, help='Frame senza rilevazioni prima di chiudere una traccia')
+    args = parser.parse_args()
+
+    tracker = Tracker(max_tracks=args.max_tracks, gate=args.gate, max_misses=args.max_misses, assignment=args.assignment)
+    if args.source == 'persons':
+        frames = person_detections(args.input_txt)
+    else:
+        frames = cluster_detections(args.input_txt)
+    save_tracks_to_csv(iter_tracks(frames, tracker), args.output_csv)
+    print(f"{tracker.next_id} tracce aperte")